@@ -1,60 +1,111 @@
 #!/usr/bin/env python
-"""重建BM25数据库"""
+"""重建BM25数据库
+
+REBUILD_MODE=incremental（默认）：节点保存在 docstore.json 中，只重新解析新增/修改的文件，
+                                  删除的文件直接移除节点，然后由全部节点重建 BM25 统计
+REBUILD_MODE=full：删除整个数据库后全量重建
+分词器版本（规则 / jieba / 领域词典）与清单中记录的不同时，即使文件未变也重建 BM25 统计
+"""
 import os
 import shutil
 from pathlib import Path
 from dotenv import load_dotenv
 from llama_index.core import SimpleDirectoryReader
 from llama_index.core.node_parser import SimpleNodeParser
+from llama_index.core.storage.docstore import SimpleDocumentStore
 from llama_index.retrievers.bm25 import BM25Retriever
-import jieba
+
+from src.contextual_retrieval.bm25_index import BM25Index
+from src.contextual_retrieval.manifest import IngestManifest, MANIFEST_FILE_NAME, collect_input_files
+from src.contextual_retrieval.tokenizer import chinese_tokenizer, save_dictionary, tokenize_batch, tokenizer_version
 
 load_dotenv()
 
 ROOT = Path(__file__).resolve().parents[0]
 DATA_DIR = Path(os.getenv("DATA_DIR", ROOT / "data" / "防洪预案"))
 BM25_DB_PATH = os.getenv("BM25_DB_PATH")
+REBUILD_MODE = os.getenv("REBUILD_MODE", "incremental")
+DOCSTORE_FILE_NAME = "docstore.json"
+
+manifest_path = os.path.join(BM25_DB_PATH, MANIFEST_FILE_NAME)
+docstore_path = os.path.join(BM25_DB_PATH, DOCSTORE_FILE_NAME)
+full_rebuild = (REBUILD_MODE == "full"
+                or not Path(manifest_path).exists()
+                or not Path(docstore_path).exists())
 
 print("=" * 70)
-print("重建BM25数据库")
+print("重建BM25数据库" + ("（全量）" if full_rebuild else "（增量）"))
 print("=" * 70)
 print(f"数据目录: {DATA_DIR}")
 print(f"BM25数据库路径: {BM25_DB_PATH}")
 
-# 清毒旧数据库
-if Path(BM25_DB_PATH).exists():
-    print(f"\n删除旧数据库: {BM25_DB_PATH}")
-    shutil.rmtree(BM25_DB_PATH)
+# 比对文件指纹（全量模式下清单为空，所有文件视为新增）
+manifest = IngestManifest(manifest_path)
+if full_rebuild:
+    manifest.clear()
+diff = manifest.diff(collect_input_files(str(DATA_DIR)))
+print(f"\n文件变化: {diff.summary()}")
+tokenizer_changed = not full_rebuild and manifest.tokenizer_version != tokenizer_version()
+if tokenizer_changed:
+    print(f"分词器版本变化: {manifest.tokenizer_version or 'unknown'} -> {tokenizer_version()}，重建BM25统计")
+
+if not full_rebuild and not tokenizer_changed and not diff.to_ingest and not diff.removed:
+    print("\n无文件变化，跳过重建")
+    raise SystemExit(0)
 
-# 加载文档
-print("\n加载文档...")
-loader = SimpleDirectoryReader(str(DATA_DIR), recursive=True)
-documents = loader.load_data()
-print(f"已加载: {len(documents)} 个文档")
+docstore = (SimpleDocumentStore() if full_rebuild
+            else SimpleDocumentStore.from_persist_path(docstore_path))
 
-# 将documents转换为nodes
+# 移除修改/删除文件的旧节点
+for file_path in diff.to_delete:
+    for node_id in manifest.node_ids(file_path):
+        docstore.delete_document(node_id, raise_error=False)
+    manifest.remove(file_path)
+
+# 解析新增/修改文件为节点
 print("\n解析文档为节点...")
 parser = SimpleNodeParser.from_defaults()
-nodes = parser.get_nodes_from_documents(documents)
-print(f"已生成: {len(nodes)} 个节点")
+for file_path in diff.to_ingest:
+    fingerprint = manifest.fingerprint(file_path)
+    documents = SimpleDirectoryReader(input_files=[file_path]).load_data()
+    nodes = parser.get_nodes_from_documents(documents)
+    docstore.add_documents(nodes)
+    manifest.update(file_path, [n.node_id for n in nodes], fingerprint)
+    print(f"  + {file_path}: {len(documents)} 个文档 -> {len(nodes)} 个节点")
 
-# 自定义中文分词函数
-def chinese_tokenizer(text):
-    """增强型中文分词器"""
-    tokens = list(jieba.cut_for_search(text))
-    return tokens
+nodes = [docstore.get_node(node_id) for node_id in manifest.all_node_ids()]
+print(f"节点总数: {len(nodes)}")
 
-# 创建BM25索引
+# 创建BM25索引（与检索端 SemanticBM25Retriever 使用同一分词器）
 print("\n构建BM25索引...")
+bm25_index = BM25Index.from_tokens(
+    tokenize_batch([node.get_content() for node in nodes]),
+    [node.node_id for node in nodes],
+    tokenizer_version=tokenizer_version(),
+)
+# llama-index 格式保留给实验脚本
 bm25_retriever = BM25Retriever.from_defaults(
     nodes=nodes,
     similarity_top_k=3,
     tokenizer=chinese_tokenizer
 )
 
-# 保存到磁盘
+# 先写到临时目录再整体替换，中断时旧索引保持可用
+tmp_path = BM25_DB_PATH.rstrip("/\\") + ".tmp"
+if Path(tmp_path).exists():
+    shutil.rmtree(tmp_path)
 print(f"\n保存BM25索引到: {BM25_DB_PATH}")
-bm25_retriever.persist(BM25_DB_PATH)
+bm25_retriever.persist(tmp_path)
+bm25_index.save(tmp_path, nodes)
+save_dictionary(tmp_path)
+docstore.persist(os.path.join(tmp_path, DOCSTORE_FILE_NAME))
+manifest.path = os.path.join(tmp_path, MANIFEST_FILE_NAME)
+manifest.tokenizer_version = tokenizer_version()
+manifest.save()
+
+if Path(BM25_DB_PATH).exists():
+    shutil.rmtree(BM25_DB_PATH)
+os.replace(tmp_path, BM25_DB_PATH)
 
 print("\n" + "=" * 70)
 print("BM25数据库重建完成！")
@@ -1,43 +1,53 @@
 #!/usr/bin/env python
-"""重建向量数据库"""
+"""重建向量数据库
+
+REBUILD_MODE=incremental（默认）：按 ingest_manifest.json 只删除/重嵌入新增、修改、删除的文件
+REBUILD_MODE=full：删除整个数据库后全量重建
+"""
 import os
 import shutil
 from pathlib import Path
 from dotenv import load_dotenv
 from llama_index.core import SimpleDirectoryReader, VectorStoreIndex
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from llama_index.core.node_parser import SentenceSplitter
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.core import StorageContext
 import chromadb
 
+from src.contextual_retrieval.embedding import get_embed_model
+from src.contextual_retrieval.manifest import IngestManifest, MANIFEST_FILE_NAME, collect_input_files
+
 load_dotenv()
 
 ROOT = Path(__file__).resolve().parents[0]
 DATA_DIR = Path(os.getenv("DATA_DIR", ROOT / "data" / "防洪预案"))
 VECTOR_DB_PATH = os.getenv("VECTOR_DB_PATH")
 COLLECTION_NAME = os.getenv("COLLECTION_NAME", "default")
+REBUILD_MODE = os.getenv("REBUILD_MODE", "incremental")
+
+manifest_path = os.path.join(VECTOR_DB_PATH, MANIFEST_FILE_NAME)
+full_rebuild = REBUILD_MODE == "full" or not Path(manifest_path).exists()
 
 print("=" * 70)
-print("重建向量数据库")
+print("重建向量数据库" + ("（全量）" if full_rebuild else "（增量）"))
 print("=" * 70)
 print(f"数据目录: {DATA_DIR}")
 print(f"向量数据库路径: {VECTOR_DB_PATH}")
 print(f"集合名: {COLLECTION_NAME}")
 
 # 清毒旧数据库
-if Path(VECTOR_DB_PATH).exists():
+if full_rebuild and Path(VECTOR_DB_PATH).exists():
     print(f"\n删除旧数据库: {VECTOR_DB_PATH}")
     shutil.rmtree(VECTOR_DB_PATH)
 
-# 加载文档
-print("\n加载文档...")
-loader = SimpleDirectoryReader(str(DATA_DIR), recursive=True)
-documents = loader.load_data()
-print(f"已加载: {len(documents)} 个文档")
+# 比对文件指纹
+manifest = IngestManifest(manifest_path)
+diff = manifest.diff(collect_input_files(str(DATA_DIR)))
+print(f"\n文件变化: {diff.summary()}")
 
 # 初始化向量存储和索引
 print("\n初始化向量数据库...")
-embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-zh-v1.5", device="cpu")
+embed_model = get_embed_model()
 
 # 创建 Chroma 客户端
 client = chromadb.PersistentClient(path=VECTOR_DB_PATH)
@@ -46,16 +56,34 @@ collection = client.get_or_create_collection(COLLECTION_NAME)
 # 创建向量存储
 vector_store = ChromaVectorStore(chroma_collection=collection)
 storage_context = StorageContext.from_defaults(vector_store=vector_store)
+index = VectorStoreIndex(nodes=[], storage_context=storage_context, embed_model=embed_model)
+# 与 VectorStoreIndex.from_documents 默认切分一致
+parser = SentenceSplitter()
+
+# 删除已删除文件的节点
+for file_path in diff.removed:
+    node_ids = manifest.node_ids(file_path)
+    if node_ids:
+        collection.delete(ids=node_ids)
+    manifest.remove(file_path)
+    manifest.save()
+    print(f"  - {file_path}: 删除 {len(node_ids)} 个节点")
+
+# 新增/修改文件：先删旧节点，再嵌入新节点；逐文件落盘清单
+for file_path in diff.to_ingest:
+    fingerprint = manifest.fingerprint(file_path)
+    old_ids = manifest.node_ids(file_path)
+    if old_ids:
+        collection.delete(ids=old_ids)
+
+    documents = SimpleDirectoryReader(input_files=[file_path]).load_data()
+    nodes = parser.get_nodes_from_documents(documents)
+    index.insert_nodes(nodes)
 
-# 创建索引
-print("构建索引...")
-index = VectorStoreIndex.from_documents(
-    documents,
-    storage_context=storage_context,
-    embed_model=embed_model,
-    show_progress=True
-)
+    manifest.update(file_path, [n.node_id for n in nodes], fingerprint)
+    manifest.save()
+    print(f"  + {file_path}: {len(documents)} 个文档 -> {len(nodes)} 个节点")
 
 print("\n" + "=" * 70)
-print("向量数据库重建完成！")
+print(f"向量数据库重建完成！集合内节点数: {collection.count()}")
 print("=" * 70)
@@ -0,0 +1,342 @@
+"""
+属性层查询基准：src/attribute_store/store.py
+合成 N 条属性事实（默认 100 万：1 万个设施 × 字段 × 来源页），写入旧表结构（无 entity_key、无索引），对比：
+  - 原 query_facts：每次新建连接 + entity_name LIKE '%x%'（全表扫描）
+  - 打开 AttributeStore：旧库迁移耗时（补列、回填 entity_key、建索引）
+  - AttributeStore.query_facts：线程常驻连接 + entity_key 精确索引查找
+  - AttributeStore LIKE 兜底（只给出实体名片段时，走 field 索引后逐行匹配）
+输出每种方式的单次查询延迟 p50 / p99（ms）。
+
+--ingest：入库耗时对比（按页分组，每页 --page-facts 条）
+  - 原 build_attribute_store：每页调用一次 insert_facts（新建连接、逐条 execute、每页提交）
+  - bulk_insert：跨所有页面的生成器流式写入，单事务 executemany
+
+--fts：全文检索（evidence_text 等列 jieba 分词后写入 FTS5）
+  - 同步耗时（水位线增量，首次为全量）
+  - search_facts（BM25 排序）vs evidence_text LIKE '%词%' 全表扫描，单次延迟 p50 / p99
+
+--range：数值范围查询（库容类字段的单位随机写成 万m³ / 亿m³ / 立方米 / 万方）
+  - 原做法：按 field 取出全部事实，在 Python 里折算单位再过滤（query_facts 无法表达区间）
+  - query_range：入库时已折算 value_canonical，(field, value_canonical, …) 索引区间扫描
+  两种方式的结果逐条比对；另外核对 query_router 对若干阈值 / 区间问法的解析与路由
+
+用法：
+  python scripts/bench_attribute_store.py
+  python scripts/bench_attribute_store.py --fts --facts 100000
+  python scripts/bench_attribute_store.py --facts 200000 --queries 500
+  python scripts/bench_attribute_store.py --ingest --facts 200000
+  python scripts/bench_attribute_store.py --range --facts 200000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.attribute_store.extract import FIELD_PATTERNS
+from src.attribute_store.store import FACT_COLUMNS, INSERT_SQL, AttributeStore, _fact_row
+from src.attribute_store.units import canonicalize
+from src.tools.query_router import extract_range_condition, route_query
+
+FIELDS = [name for name, _ in FIELD_PATTERNS]
+CONDITIONS = [None, "汛期", "非汛期", "设计", "校核"]
+
+# 改造前的表结构
+LEGACY_SCHEMA = """
+CREATE TABLE attributes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    entity_name TEXT, field TEXT, value REAL, value_text TEXT, unit TEXT, comparator TEXT,
+    condition TEXT, source_doc TEXT, source_page TEXT, source_clause TEXT, evidence_text TEXT,
+    confidence REAL,
+    UNIQUE(entity_name, field, value_text, unit, condition, source_doc, source_page)
+);
+"""
+
+
+def legacy_query_facts(db_path, field=None, entity_name=None, condition=None, limit=5):
+    """原实现：每次新建连接，实体名 LIKE 模糊匹配"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        sql = "SELECT * FROM attributes WHERE 1=1"
+        params: list = []
+        if field:
+            sql += " AND field = ?"
+            params.append(field)
+        if entity_name:
+            sql += " AND entity_name LIKE ?"
+            params.append(f"%{entity_name}%")
+        if condition:
+            sql += " AND condition LIKE ?"
+            params.append(f"%{condition}%")
+        sql += " ORDER BY confidence DESC, id DESC LIMIT ?"
+        params.append(limit)
+        return [dict(r) for r in conn.execute(sql, params).fetchall()]
+    finally:
+        conn.close()
+
+
+def legacy_insert_facts(db_path, facts):
+    """原实现：每次调用新建连接，逐条 INSERT OR IGNORE，最后提交"""
+    conn = sqlite3.connect(db_path)
+    try:
+        cur = conn.cursor()
+        count = 0
+        for f in facts:
+            cur.execute(INSERT_SQL, _fact_row(f))
+            if cur.rowcount:
+                count += 1
+        conn.commit()
+        return count
+    finally:
+        conn.close()
+
+
+def synthetic_facts(count: int, facilities: int, seed: int):
+    rng = random.Random(seed)
+    for i in range(count):
+        value = round(rng.uniform(10, 500), 2)
+        unit = "m"
+        yield {
+            "entity_name": f"第{i % facilities}号水库",
+            "field": FIELDS[(i // facilities) % len(FIELDS)],
+            "value": value,
+            "value_text": f"{value}{unit}",
+            "unit": unit,
+            "comparator": None,
+            "condition": rng.choice(CONDITIONS),
+            "source_doc": f"预案{i % 37}.pdf",
+            "source_page": str(i),
+            "source_clause": None,
+            "evidence_text": f"第{i % facilities}号水库 …… {value}{unit}",
+            "confidence": 0.8,
+        }
+
+
+# 库容类字段的单位写法：(单位, 相对 万m³ 的倍数)
+VOLUME_UNITS = [("万m³", 1.0), ("亿m³", 1e-4), ("立方米", 1e4), ("万方", 1.0)]
+
+
+def mixed_unit_facts(count: int, facilities: int, seed: int):
+    rng = random.Random(seed)
+    for fact in synthetic_facts(count, facilities, seed):
+        if "库容" in fact["field"]:
+            unit, scale = rng.choice(VOLUME_UNITS)
+            fact["value"] = round(fact["value"] * scale, 6)
+            fact["unit"] = unit
+            fact["value_text"] = f"{fact['value']}{unit}"
+        yield fact
+
+
+# 问法 → 期望的 (字段, 下限, 上限, 规范单位)；None 表示不应走范围查询
+# （条件句照常按意图路由；数值单位与字段不符时不算该字段的上下限）
+RANGE_PHRASES = [
+    ("总库容超过1亿的水库", ("总库容", 10000.0, None, "万m³")),
+    ("库容1亿以上的水库", ("总库容", 10000.0, None, "万m³")),
+    ("总库容在1000万到5000万方之间的水库", ("总库容", 1000.0, 5000.0, "万m³")),
+    ("库容5000万到1亿方", ("总库容", 5000.0, 10000.0, "万m³")),
+    ("总库容不超过500万立方米", ("总库容", None, 500.0, "万m³")),
+    ("哪些水库汛限水位高于300米", ("汛限水位", 300.0, None, "m")),
+    ("汛限水位不低于100m且低于200米", ("汛限水位", 100.0, 200.0, "m")),
+    ("流域面积50平方公里以上的水库", ("流域面积", 50.0, None, "km²")),
+    ("降雨量超过50毫米时启动几级响应", None),
+    ("降雨量超过50毫米时如何处置", None),
+    ("水位达到298米时的库容是多少", None),
+    ("库容在300米到500米之间", None),
+]
+
+
+def check_range_phrases() -> None:
+    failed = []
+    for query, expected in RANGE_PHRASES:
+        cond = route_query(query).get("range")
+        got = cond and (cond["field"], cond["min_value"], cond["max_value"], cond["unit"])
+        if got != expected:
+            failed.append((query, got))
+    print(f"问法解析：{len(RANGE_PHRASES)} 条，不符 {len(failed)} 条")
+    for query, got in failed:
+        print(f"  {query}: {got}  {extract_range_condition(query)}")
+
+
+def legacy_range(conn, field, low, high, limit):
+    """原做法：取出字段全部事实，Python 里折算单位后过滤、排序"""
+    rows = conn.execute("SELECT * FROM attributes WHERE field = ?", (field,)).fetchall()
+    hits = []
+    for row in rows:
+        value, _ = canonicalize(row["value"], row["unit"])
+        if value is not None and low <= value <= high:
+            hits.append((value, row["id"]))
+    hits.sort(reverse=True)
+    return hits[:limit]
+
+
+def _latencies(fn, queries):
+    out = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(*q)
+        out.append((time.perf_counter() - start) * 1000.0)
+    return np.percentile(out, 50), np.percentile(out, 99)
+
+
+def bench_ingest(facts: int, facilities: int, page_facts: int) -> None:
+    pages = []
+    page: list = []
+    for fact in synthetic_facts(facts, facilities, seed=0):
+        page.append(fact)
+        if len(page) == page_facts:
+            pages.append(page)
+            page = []
+    if page:
+        pages.append(page)
+    print(f"入库 {facts} 条事实（{len(pages)} 页，每页 {page_facts} 条），其中重复再写一遍首页：")
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_db = os.path.join(tmp, "legacy.sqlite")
+        store = AttributeStore(legacy_db)
+        store.migrate()
+        store.close()
+        start = time.perf_counter()
+        for page in pages + pages[:1]:
+            legacy_insert_facts(legacy_db, page)
+        print(f"  {'原实现（每页一次连接 + 提交）':<24}{time.perf_counter() - start:7.2f}s")
+
+        store = AttributeStore(os.path.join(tmp, "bulk.sqlite"))
+        start = time.perf_counter()
+        inserted, duplicates = store.bulk_insert(f for page in pages + pages[:1] for f in page)
+        print(f"  {'bulk_insert（单事务流式）':<24}{time.perf_counter() - start:7.2f}s   新增 {inserted}，重复 {duplicates}")
+        store.close()
+
+
+def bench_fts(facts: int, facilities: int, num_queries: int, legacy_queries: int) -> None:
+    rng = random.Random(2)
+    phrases = ["汛期", "设计", "校核", "溢洪道", "调度"]
+    queries = [
+        f"第{rng.randrange(facilities)}号水库{rng.choice(FIELDS)}{rng.choice(phrases)}是多少" for _ in range(num_queries)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "attribute_store.sqlite")
+        store = AttributeStore(db_path)
+        store.bulk_insert(synthetic_facts(facts, facilities, seed=0))
+        store.search_facts("预热")
+        start = time.perf_counter()
+        # 水位线之后的全部事实（首次同步在预热里已完成，这里再写一批测增量）
+        store.bulk_insert(synthetic_facts(facts // 10, facilities, seed=9))
+        synced = store.sync_fts()
+        print(f"{facts} 条事实；增量同步 {synced} 条：{time.perf_counter() - start:.1f}s（含写入）")
+
+        conn = store.connection()
+        like = lambda q: conn.execute(
+            "SELECT * FROM attributes WHERE evidence_text LIKE ? ORDER BY confidence DESC, id DESC LIMIT 5",
+            (f"%{q[:6]}%",),
+        ).fetchall()
+        p50, p99 = _latencies(lambda q: like(q), [(q,) for q in queries[:legacy_queries]])
+        print(f"  {'evidence_text LIKE 扫描':<28}p50 {p50:9.3f}ms   p99 {p99:9.3f}ms")
+        p50, p99 = _latencies(lambda q: store.search_facts(q), [(q,) for q in queries])
+        print(f"  {'search_facts（FTS5 BM25）':<28}p50 {p50:9.3f}ms   p99 {p99:9.3f}ms")
+        p50, p99 = _latencies(lambda q, f: store.search_facts(q, field=f), [(q, rng.choice(FIELDS)) for q in queries])
+        print(f"  {'search_facts + field 过滤':<28}p50 {p50:9.3f}ms   p99 {p99:9.3f}ms")
+        store.close()
+
+
+def bench_range(facts: int, facilities: int, num_queries: int, legacy_queries: int) -> None:
+    check_range_phrases()
+    rng = random.Random(3)
+    queries = []
+    for _ in range(num_queries):
+        field = rng.choice([f for f in FIELDS if "库容" in f] + FIELDS)
+        low = round(rng.uniform(10, 490), 1)
+        queries.append((field, low, round(low + rng.uniform(1, 20), 1), 20))
+    with tempfile.TemporaryDirectory() as tmp:
+        store = AttributeStore(os.path.join(tmp, "attribute_store.sqlite"))
+        start = time.perf_counter()
+        store.bulk_insert(mixed_unit_facts(facts, facilities, seed=0))
+        print(f"写入 {facts} 条事实（库容单位混写，入库时折算）：{time.perf_counter() - start:.1f}s")
+        conn = store.connection()
+
+        run = lambda f, lo, hi, n: store.query_range(f, lo, hi, limit=n)
+        mismatches = 0
+        for q in queries[:legacy_queries]:
+            expected = [value for value, _ in legacy_range(conn, *q)]
+            got = [row["value_canonical"] for row in run(*q)]
+            mismatches += expected != got
+        print(f"  结果比对 {legacy_queries} 条查询，不一致 {mismatches} 条")
+
+        p50, p99 = _latencies(lambda *q: legacy_range(conn, *q), queries[:legacy_queries])
+        print(f"  {'原做法（取全字段 + Python 过滤）':<28}p50 {p50:9.3f}ms   p99 {p99:9.3f}ms")
+        p50, p99 = _latencies(run, queries)
+        print(f"  {'query_range（索引区间扫描）':<28}p50 {p50:9.3f}ms   p99 {p99:9.3f}ms")
+        p50, p99 = _latencies(
+            lambda f, lo, hi, n: store.query_range(f, lo / 1e4, hi / 1e4, unit="亿m³", limit=n),
+            [q for q in queries if "库容" in q[0]],
+        )
+        print(f"  {'query_range（亿m³ 上下限）':<28}p50 {p50:9.3f}ms   p99 {p99:9.3f}ms")
+        store.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--facts", type=int, default=1_000_000)
+    ap.add_argument("--facilities", type=int, default=10_000)
+    ap.add_argument("--queries", type=int, default=300)
+    ap.add_argument("--legacy-queries", type=int, default=20, help="原实现每次全表扫描，少量采样即可")
+    ap.add_argument("--ingest", action="store_true", help="只测入库耗时")
+    ap.add_argument("--page-facts", type=int, default=10)
+    ap.add_argument("--fts", action="store_true", help="只测全文检索")
+    ap.add_argument("--range", action="store_true", help="只测数值范围查询")
+    args = ap.parse_args()
+
+    if args.range:
+        bench_range(args.facts, args.facilities, args.queries, args.legacy_queries)
+        return
+
+    if args.fts:
+        bench_fts(args.facts, args.facilities, args.queries, args.legacy_queries)
+        return
+
+    if args.ingest:
+        bench_ingest(args.facts, args.facilities, args.page_facts)
+        return
+
+    rng = random.Random(1)
+    queries = [(rng.choice(FIELDS), f"第{rng.randrange(args.facilities)}号水库") for _ in range(args.queries)]
+    fragments = [(field, name[:-2]) for field, name in queries]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "attribute_store.sqlite")
+        conn = sqlite3.connect(db_path)
+        conn.execute(LEGACY_SCHEMA)
+        start = time.perf_counter()
+        with conn:
+            conn.executemany(
+                f"INSERT INTO attributes ({', '.join(FACT_COLUMNS)}) VALUES ({', '.join('?' for _ in FACT_COLUMNS)})",
+                (tuple(f[c] for c in FACT_COLUMNS) for f in synthetic_facts(args.facts, args.facilities, seed=0)),
+            )
+        conn.close()
+        print(f"写入 {args.facts} 条事实（旧表结构）：{time.perf_counter() - start:.1f}s\n")
+
+        p50, p99 = _latencies(lambda f, e: legacy_query_facts(db_path, f, e), queries[: args.legacy_queries])
+        print(f"  {'原实现（新连接 + LIKE）':<28}p50 {p50:9.3f}ms   p99 {p99:9.3f}ms")
+
+        start = time.perf_counter()
+        store = AttributeStore(db_path)
+        store.migrate()
+        print(f"  {'旧库迁移（回填 + 去重 + 建索引）':<28}{time.perf_counter() - start:.1f}s")
+        hits = sum(bool(store.query_facts(field, name)) for field, name in queries)
+        print(f"  精确命中 {hits}/{len(queries)} 条查询")
+        p50, p99 = _latencies(lambda f, e: store.query_facts(f, e), queries)
+        print(f"  {'AttributeStore（entity_key）':<28}p50 {p50:9.3f}ms   p99 {p99:9.3f}ms")
+        p50, p99 = _latencies(lambda f, e: store.query_facts(f, e), fragments[: args.legacy_queries])
+        print(f"  {'AttributeStore（LIKE 兜底）':<28}p50 {p50:9.3f}ms   p99 {p99:9.3f}ms")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+BM25 引擎基准：项目自有 BM25Index（稀疏矩阵）vs bm25s（llama-index BM25Retriever 的后端）
+合成语料（Zipf 分布词表，模拟中文分词后的 token 序列），同一份分好词的语料与查询：
+  1. 构建耗时、落盘后打开耗时（BM25Index 为内存映射，与语料大小无关）、top-k 节点按需读取耗时
+  2. 单条查询 top-k 延迟、批量查询（一组扩写查询）每条平均延迟
+  3. 小语料上逐文档比对两者分数（公式一致性）
+
+用法：
+  python scripts/bench_bm25.py                       # 默认 100k 文档
+  python scripts/bench_bm25.py --docs 20000 --k1 1.2 --b 0.6
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import bm25s
+from llama_index.core.schema import TextNode
+
+from src.contextual_retrieval.bm25_index import BM25Index
+
+
+def synthetic_corpus(num_docs: int, vocab_size: int, seed: int):
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(50, 250, size=num_docs)
+    return [[f"t{x}" for x in rng.zipf(1.3, n) % vocab_size] for n in lengths]
+
+
+def synthetic_queries(num_queries: int, vocab_size: int, seed: int):
+    rng = np.random.default_rng(seed)
+    return [list(dict.fromkeys(f"t{x}" for x in rng.zipf(1.3, 6) % vocab_size)) for _ in range(num_queries)]
+
+
+def _timed(fn, repeat: int = 1) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000.0
+
+
+def check_scores(k1: float, b: float) -> None:
+    corpus = synthetic_corpus(2000, 5000, seed=1)
+    index = BM25Index.from_tokens(corpus, [str(i) for i in range(len(corpus))], k1=k1, b=b)
+    reference = bm25s.BM25(k1=k1, b=b, method="lucene")
+    reference.index(corpus, show_progress=False)
+    worst = 0.0
+    for query in synthetic_queries(50, 5000, seed=2):
+        worst = max(worst, float(np.abs(reference.get_scores(query) - index.score(query)).max()))
+    print(f"分数一致性（2000 文档 × 50 查询）：最大绝对误差 {worst:.2e}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=100_000)
+    ap.add_argument("--vocab", type=int, default=50_000)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--batch", type=int, default=4, help="每批查询数（对应意图解析的扩写条数）")
+    ap.add_argument("--top-k", type=int, default=8)
+    ap.add_argument("--k1", type=float, default=1.5)
+    ap.add_argument("--b", type=float, default=0.75)
+    ap.add_argument("--skip-bm25s", action="store_true")
+    args = ap.parse_args()
+
+    check_scores(args.k1, args.b)
+
+    corpus = synthetic_corpus(args.docs, args.vocab, seed=0)
+    queries = synthetic_queries(args.queries, args.vocab, seed=3)
+    batches = [queries[i:i + args.batch] for i in range(0, len(queries), args.batch)]
+    print(f"\n语料 {args.docs} 文档，平均 {np.mean([len(d) for d in corpus]):.0f} 词；{args.queries} 条查询，top-{args.top_k}")
+
+    nodes = [TextNode(text=" ".join(tokens), id_=str(i)) for i, tokens in enumerate(corpus)]
+    start = time.perf_counter()
+    index = BM25Index.from_tokens(corpus, [n.node_id for n in nodes], k1=args.k1, b=args.b)
+    build_ms = (time.perf_counter() - start) * 1000.0
+    with tempfile.TemporaryDirectory() as tmp:
+        index.save(tmp, nodes)
+        load_ms = _timed(lambda: BM25Index.load(tmp), repeat=20)
+        index = BM25Index.load(tmp)
+        single = _timed(lambda: [index.top_k(q, args.top_k) for q in queries]) / len(queries)
+        batched = _timed(lambda: [index.top_k_batch(b, args.top_k) for b in batches]) / len(queries)
+        fetch = _timed(lambda: [[index.node(int(d)) for d in index.top_k(q, args.top_k)[0]] for q in queries]) / len(queries) - single
+        del index
+    print(f"{'BM25Index':>10}: 构建 {build_ms:8.0f}ms  打开 {load_ms:7.1f}ms  单条 {single:6.2f}ms  批量 {batched:6.2f}ms/条"
+          f"  读取 top-{args.top_k} 节点 {fetch:5.2f}ms")
+
+    if args.skip_bm25s:
+        return
+    start = time.perf_counter()
+    reference = bm25s.BM25(k1=args.k1, b=args.b, method="lucene")
+    reference.index(corpus, show_progress=False)
+    build_ms = (time.perf_counter() - start) * 1000.0
+    with tempfile.TemporaryDirectory() as tmp:
+        reference.save(tmp)
+        load_ms = _timed(lambda: bm25s.BM25.load(tmp))
+    single = _timed(lambda: [reference.retrieve([q], k=args.top_k, show_progress=False) for q in queries]) / len(queries)
+    batched = _timed(lambda: [reference.retrieve(b, k=args.top_k, show_progress=False) for b in batches]) / len(queries)
+    print(f"{'bm25s':>10}: 构建 {build_ms:8.0f}ms  加载 {load_ms:7.1f}ms  单条 {single:6.2f}ms  批量 {batched:6.2f}ms/条")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+CR 上下文并发生成基准（无需 Ollama）
+- FakeLLM 模拟一个有 N 个并行槽位的推理服务：每个请求固定耗时，超出槽位排队
+- 对比不同 CONTEXT_CONCURRENCY 下的吞吐，验证近线性加速直到槽位上限
+
+用法：
+  python scripts/bench_context_generation.py --chunks 64 --latency 0.2 --slots 4
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.contextual_retrieval.context_generation import generate_contexts
+
+
+class _FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeLLM:
+    """按槽位限流并 sleep 的假 LLM，返回内容由 prompt 决定（用于校验顺序）"""
+
+    def __init__(self, latency: float, slots: int):
+        self._latency = latency
+        self._slots = slots
+        self._server = None
+
+    async def acomplete(self, prompt: str) -> _FakeResponse:
+        if self._server is None:
+            # 在当前事件循环内创建（每次 asyncio.run 都是新循环）
+            self._server = asyncio.Semaphore(self._slots)
+        async with self._server:
+            await asyncio.sleep(self._latency)
+        return _FakeResponse(f"ctx:{prompt}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=64)
+    ap.add_argument("--latency", type=float, default=0.2, help="单请求耗时（秒）")
+    ap.add_argument("--slots", type=int, default=4, help="服务端并行槽位")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = ap.parse_args()
+
+    prompts = [f"chunk-{i}" for i in range(args.chunks)]
+    expected = [f"ctx:{p}" for p in prompts]
+
+    print(f"chunks={args.chunks} latency={args.latency}s slots={args.slots}")
+    print(f"{'concurrency':>12} {'seconds':>10} {'chunks/s':>10} {'speedup':>8} {'ordered':>8}")
+    baseline = None
+    for c in args.concurrency:
+        llm = FakeLLM(args.latency, args.slots)
+        start = time.perf_counter()
+        results = generate_contexts(llm, prompts, max_concurrency=c, timeout=30, max_retries=0)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{c:>12} {elapsed:>10.2f} {args.chunks / elapsed:>10.1f} "
+              f"{baseline / elapsed:>7.2f}x {str(results == expected):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+嵌入吞吐基准（CPU）
+1. 构建路径：不同 EMBED_BATCH_SIZE 下的 chunks/sec
+2. 检索路径：N 个线程并发发单条查询，对比逐条前向 vs 动态批处理
+
+用法：
+  EMBED_THREADS=8 python scripts/bench_embedding.py --chunks 512 --batch-sizes 8 16 32 64
+  EMBED_BACKEND=onnx python scripts/bench_embedding.py
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.contextual_retrieval.embedding import BatchedEmbedding, get_embed_model
+
+SAMPLE = ("杨家横水库汛限水位为298.50米，当库水位超过汛限水位时，"
+          "水库管理单位应在2小时内向区防汛指挥部报告，并按调度方案开闸泄洪。")
+
+
+def _texts(n: int):
+    return [f"{i}. {SAMPLE}" * 3 for i in range(n)]
+
+
+def bench_ingest(model: BatchedEmbedding, chunks: int, batch_sizes) -> None:
+    texts = _texts(chunks)
+    inner = model.inner
+    inner.get_text_embedding_batch(texts[:8])  # 预热
+    print(f"\n[构建] {chunks} chunks")
+    print(f"{'batch':>8} {'seconds':>10} {'chunks/s':>10}")
+    for bs in batch_sizes:
+        inner.embed_batch_size = bs
+        start = time.perf_counter()
+        inner.get_text_embedding_batch(texts)
+        elapsed = time.perf_counter() - start
+        print(f"{bs:>8} {elapsed:>10.2f} {chunks / elapsed:>10.1f}")
+
+
+def bench_queries(model: BatchedEmbedding, queries: int, workers: int) -> None:
+    texts = [f"{i} 水库汛限水位是多少？" for i in range(queries)]
+    print(f"\n[检索] {queries} 条查询, {workers} 个并发线程")
+    print(f"{'mode':>10} {'seconds':>10} {'queries/s':>10}")
+    for name, embed in [("逐条", model.inner.get_query_embedding),
+                        ("动态批处理", model.get_query_embedding)]:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(embed, texts))
+        elapsed = time.perf_counter() - start
+        print(f"{name:>10} {elapsed:>10.2f} {queries / elapsed:>10.1f}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=512)
+    ap.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 16, 32, 64])
+    ap.add_argument("--queries", type=int, default=256)
+    ap.add_argument("--workers", type=int, default=16)
+    args = ap.parse_args()
+
+    start = time.perf_counter()
+    model = get_embed_model()
+    print(f"模型加载: {time.perf_counter() - start:.2f}s "
+          f"(backend={os.getenv('EMBED_BACKEND', 'torch')}, threads={os.getenv('EMBED_THREADS', 'default')})")
+    start = time.perf_counter()
+    get_embed_model()
+    print(f"再次获取（共享实例）: {(time.perf_counter() - start) * 1000:.3f}ms")
+
+    bench_ingest(model, args.chunks, args.batch_sizes)
+    bench_queries(model, args.queries, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+实体归一化基准：entity_fusion.normalize_entity
+  原实现（每次调用都按长度重排 ALL_ALIASES，逐个 alias in entity）vs 别名自动机（无缓存 / 带 LRU 缓存）
+合成图谱：别名 / 标准名 / 设施名与前后缀、全角数字、路径污染随机拼接，实体按 Zipf 分布重复出现（贴近真实图谱）
+
+  1. 一致性：全部去重实体逐个比对原实现与新实现的输出
+  2. 吞吐：entities/sec（每个三元组 2 个实体）
+  3. 整图融合：原 normalize_triplets + get_fusion_stats（逐三元组归一化、再遍历统计）
+     vs fuse_graph（去重实体只归一化一次、整数 id 数组去重），比对三元组与统计结果
+
+用法：
+  python scripts/bench_entity_fusion.py                  # 默认 100k 三元组
+  python scripts/bench_entity_fusion.py --triplets 20000 --unique 5000
+  python scripts/bench_entity_fusion.py --processes 4
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.contextual_retrieval.entity_fusion import (
+    ALL_ALIASES,
+    _full_to_half,
+    _strip_file_ext,
+    _strip_path_prefix,
+    fuse_graph,
+    get_fusion_stats,
+    normalize_entity,
+)
+
+_PREFIXES = ["", "", "", "启动", "区", "市", "向", "由", "县", "及时"]
+_SUFFIXES = ["", "", "", "办公室", "负责人", "响应", "应急响应", "工作", "值班室", "人员"]
+_FACILITIES = ["杨家横水库", "常庄水库", "古德范水库", "文字岭水库", "泼河水库", "某水库", "东大闸", "北泵站"]
+_VALUES = ["113.00米", "１１３．００米", "2小时内", "24小时", "500万方", "３级"]
+_PATHS = ["", "", "", "", "洪预案\\", "/data/plans/", "预案/"]
+_EXTS = ["", "", "", "", ".pdf", ".docx"]
+
+
+def legacy_normalize_entity(entity: str) -> str:
+    """原实现（逐轮重排词表 + 线性子串扫描）"""
+    entity = _full_to_half(entity.strip())
+    entity = _strip_path_prefix(entity)
+    entity = _strip_file_ext(entity)
+    if entity in ALL_ALIASES:
+        return ALL_ALIASES[entity]
+    for _ in range(2):
+        for alias, standard in sorted(ALL_ALIASES.items(), key=lambda x: -len(x[0])):
+            if alias in entity and alias != entity:
+                entity = entity.replace(alias, standard)
+                break
+    if entity in ALL_ALIASES:
+        entity = ALL_ALIASES[entity]
+    entity = re.sub(r'(响应){2,}', '响应', entity)
+    entity = re.sub(r'(转移){2,}', '转移', entity)
+    return entity
+
+
+def legacy_normalize_triplets(triplets):
+    """原 normalize_triplets（逐三元组归一化主语、宾语）"""
+    normalized = []
+    seen = set()
+    for subj, pred, obj in triplets:
+        key = (legacy_normalize_entity(subj), pred, legacy_normalize_entity(obj))
+        if key not in seen:
+            seen.add(key)
+            normalized.append(key)
+    return normalized
+
+
+def synthetic_entities(unique: int, seed: int):
+    rng = random.Random(seed)
+    words = list(ALL_ALIASES) + sorted(set(ALL_ALIASES.values())) + _FACILITIES + _VALUES
+    entities = set()
+    while len(entities) < unique:
+        core = rng.choice(words)
+        if rng.random() < 0.3:
+            core += rng.choice(words)
+        entity = rng.choice(_PATHS) + rng.choice(_PREFIXES) + core + rng.choice(_SUFFIXES) + rng.choice(_EXTS)
+        if rng.random() < 0.1:
+            entity = f" {entity} "
+        entities.add(entity)
+    return sorted(entities)
+
+
+def synthetic_triplets(entities, count: int, seed: int):
+    rng = random.Random(seed)
+    # Zipf 权重：少数实体（部门、响应级别）反复出现
+    weights = [1.0 / (rank + 1) for rank in range(len(entities))]
+    subjects = rng.choices(entities, weights=weights, k=count)
+    objects = rng.choices(entities, weights=weights, k=count)
+    predicates = rng.choices(["负责", "发布", "上报", "启动", "关联"], k=count)
+    return list(zip(subjects, predicates, objects))
+
+
+def _throughput(fn, triplets) -> float:
+    start = time.perf_counter()
+    for subj, _, obj in triplets:
+        fn(subj)
+        fn(obj)
+    return len(triplets) * 2 / (time.perf_counter() - start)
+
+
+def bench_graph(triplets, processes: int) -> None:
+    print(f"\n整图融合（{len(triplets)} 个三元组）：")
+    start = time.perf_counter()
+    legacy = legacy_normalize_triplets(triplets)
+    legacy_stats = get_fusion_stats(triplets, legacy)
+    legacy_s = time.perf_counter() - start
+    print(f"  {'原实现':<20}{legacy_s:8.2f}s")
+    runs = [("fuse_graph", 1)]
+    if processes > 1:
+        runs.append((f"fuse_graph ×{processes} 进程", processes))
+    for label, procs in runs:
+        normalize_entity.cache_clear()
+        start = time.perf_counter()
+        fused, stats = fuse_graph(triplets, processes=procs)
+        elapsed = time.perf_counter() - start
+        same = "一致" if (fused, stats) == (legacy, legacy_stats) else "不一致！"
+        print(f"  {label:<20}{elapsed:8.2f}s   ×{legacy_s / elapsed:.1f}   三元组/统计与原实现{same}")
+    print(f"  统计：{legacy_stats}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--triplets", type=int, default=100_000)
+    ap.add_argument("--unique", type=int, default=20_000)
+    ap.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args()
+
+    entities = synthetic_entities(args.unique, seed=0)
+    mismatches = [(e, legacy_normalize_entity(e), normalize_entity.__wrapped__(e))
+                  for e in entities if legacy_normalize_entity(e) != normalize_entity.__wrapped__(e)]
+    print(f"一致性：{len(entities)} 个去重实体，不一致 {len(mismatches)} 个")
+    for entity, old, new in mismatches[:10]:
+        print(f"  {entity!r}: 原 {old!r} / 新 {new!r}")
+
+    triplets = synthetic_triplets(entities, args.triplets, seed=1)
+    print(f"\n{len(triplets)} 个三元组（{len(entities)} 个去重实体），entities/sec：")
+    legacy = _throughput(legacy_normalize_entity, triplets)
+    print(f"  {'原实现':<16}{legacy:>12,.0f}")
+    uncached = _throughput(normalize_entity.__wrapped__, triplets)
+    print(f"  {'自动机（无缓存）':<16}{uncached:>12,.0f}   ×{uncached / legacy:.1f}")
+    normalize_entity.cache_clear()
+    cached = _throughput(normalize_entity, triplets)
+    print(f"  {'自动机 + LRU':<16}{cached:>12,.0f}   ×{cached / legacy:.1f}   {normalize_entity.cache_info()}")
+
+    bench_graph(triplets, args.processes)
+
+
+if __name__ == "__main__":
+    main()
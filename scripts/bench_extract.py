@@ -0,0 +1,191 @@
+"""
+属性抽取基准：src/attribute_store/extract.py
+  原实现：24 条字段正则逐条整页 finditer，每条匹配调用 _find_facility（整页设施正则再扫两遍）
+  新实现：一次首字扫描分派字段正则，整页设施位置只找一次、二分查找最近设施
+输出 pages/sec，并逐条比对两者抽取的事实。
+原实现在循环里改写 field（上下文含“溢洪道”时），同页后续的“设计流量 / 最大泄量”也被归入溢洪道字段；
+新实现只改本条，比对时单独统计这类差异。
+
+页面默认取 ATTRIBUTE_DATA_DIR 下的防洪预案 PDF（与 build_attribute_store 相同的读取方式）；
+目录或 PDF 解析依赖不可用时，用属性库 evidence_text（取自同一批 PDF 的原文片段）拼接成页面。
+
+用法：
+  python scripts/bench_extract.py
+  python scripts/bench_extract.py --data-dir ./data/防洪预案 --repeat 5
+  python scripts/bench_extract.py --pages 2000 --snippets 20
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from dotenv import load_dotenv
+
+from src.attribute_store.extract import (
+    FACILITY_PATTERN,
+    FIELD_PATTERNS,
+    _find_clause,
+    _find_comparator,
+    _find_condition,
+    extract_facts,
+)
+
+load_dotenv()
+
+_FILLER = [
+    "各乡镇要加强巡查，发现险情及时上报。",
+    "杨家横水库位于县城上游，下游有村庄三处。",
+    "溢洪道为开敞式，设计流量120m³/s，最大泄量150m³/s。",
+    "输水洞设计流量5m³/s，最大泄量8m³/s。",
+    "接到通知后2小时内完成人员转移。",
+]
+
+
+def legacy_find_facility(text, center):
+    """原实现：整页设施正则扫两遍"""
+    facilities = list({m.group(1) for m in FACILITY_PATTERN.finditer(text)})
+    if not facilities:
+        return None
+    best = None
+    best_dist = 10**9
+    for m in FACILITY_PATTERN.finditer(text):
+        dist = abs(m.start() - center)
+        if dist < best_dist:
+            best_dist = dist
+            best = m.group(1)
+    return best or facilities[0]
+
+
+def legacy_extract_facts(text, source_doc, source_page):
+    """原实现（逐字段整页 finditer；field 在循环内被改写）"""
+    facts = []
+    for field, pat in FIELD_PATTERNS:
+        for m in pat.finditer(text):
+            if field == "降雨量":
+                value = m.group(2)
+                unit = m.group(3)
+            elif field == "时限":
+                value = m.group(1)
+                unit = m.group(2)
+            else:
+                value = m.group(1)
+                unit = m.group(2)
+            try:
+                value_num = float(value)
+            except Exception:
+                value_num = None
+            ctx_s = max(0, m.start() - 40)
+            ctx_e = min(len(text), m.end() + 40)
+            ctx = text[ctx_s:ctx_e]
+            if field == "设计流量" and "溢洪道" in ctx:
+                field = "溢洪道设计流量"
+            elif field == "最大泄量" and "溢洪道" in ctx:
+                field = "溢洪道最大泄量"
+            facts.append({
+                "entity_name": legacy_find_facility(text, m.start()),
+                "field": field,
+                "value": value_num,
+                "value_text": f"{value}{unit}",
+                "unit": unit,
+                "comparator": _find_comparator(ctx),
+                "condition": _find_condition(ctx),
+                "source_doc": source_doc,
+                "source_page": source_page,
+                "source_clause": _find_clause(ctx),
+                "evidence_text": ctx,
+                "confidence": 0.8,
+            })
+    return facts
+
+
+def load_pdf_pages(data_dir: str):
+    from llama_index.core import SimpleDirectoryReader
+    from llama_index.readers.file import PDFReader
+
+    reader = SimpleDirectoryReader(
+        data_dir, file_extractor={".pdf": PDFReader(return_full_document=False)}, recursive=True
+    )
+    return [doc.text for doc in reader.load_data() if doc.text and doc.text.strip()]
+
+
+def snippet_pages(db_path: str, pages: int, snippets: int):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        texts = [row[0] for row in conn.execute("SELECT evidence_text FROM attributes") if row[0]]
+    finally:
+        conn.close()
+    rng = random.Random(0)
+    pool = texts + _FILLER
+    return ["\n".join(rng.choice(pool) for _ in range(snippets)) for _ in range(pages)]
+
+
+def _pages_per_sec(fn, pages, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i, text in enumerate(pages):
+            fn(text, "bench.pdf", str(i))
+        best = min(best, time.perf_counter() - start)
+    return len(pages) / best
+
+
+def _field_leak_only(old, new) -> bool:
+    """差异是否只在原实现串改的 field 上"""
+    return (
+        {k: v for k, v in old.items() if k != "field"} == {k: v for k, v in new.items() if k != "field"}
+        and old["field"].startswith("溢洪道")
+        and "溢洪道" not in old["evidence_text"]
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data-dir", default=os.getenv("ATTRIBUTE_DATA_DIR", "./data/防洪预案"))
+    ap.add_argument("--db", default=os.getenv("ATTRIBUTE_DB", str(ROOT / "src" / "db" / "attribute_store.sqlite")))
+    ap.add_argument("--pages", type=int, default=1000, help="无 PDF 时拼接的页数")
+    ap.add_argument("--snippets", type=int, default=15, help="无 PDF 时每页片段数")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    pages = None
+    if os.path.isdir(args.data_dir):
+        try:
+            pages = load_pdf_pages(args.data_dir)
+            print(f"PDF 页面：{args.data_dir}")
+        except ImportError as e:
+            print(f"PDF 解析依赖不可用（{e}），改用属性库片段拼页")
+    if not pages:
+        pages = snippet_pages(args.db, args.pages, args.snippets)
+        print(f"片段拼页：{args.db}")
+    print(f"{len(pages)} 页，平均 {sum(map(len, pages)) / len(pages):.0f} 字/页")
+
+    leaks = mismatches = total = 0
+    for i, text in enumerate(pages):
+        old = legacy_extract_facts(text, "bench.pdf", str(i))
+        new = extract_facts(text, "bench.pdf", str(i))
+        total += len(new)
+        if len(old) != len(new):
+            mismatches += abs(len(old) - len(new)) or 1
+            continue
+        for a, b in zip(old, new):
+            if a != b:
+                if _field_leak_only(a, b):
+                    leaks += 1
+                else:
+                    mismatches += 1
+    print(f"一致性：{total} 条事实，field 串改修正 {leaks} 条，其他不一致 {mismatches} 条")
+
+    legacy = _pages_per_sec(legacy_extract_facts, pages, args.repeat)
+    print(f"  {'原实现':<12}{legacy:10.0f} pages/s")
+    single = _pages_per_sec(extract_facts, pages, args.repeat)
+    print(f"  {'单遍抽取':<12}{single:10.0f} pages/s   ×{single / legacy:.1f}")
+
+
+if __name__ == "__main__":
+    main()
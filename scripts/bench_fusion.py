@@ -0,0 +1,136 @@
+"""
+混合检索融合基准
+1. 延迟：不同候选深度下，原 dict 逐节点合并 vs NumPy 融合（各方法）的单次耗时
+2. 召回：30 题防洪测试集（phase3_enhanced.TEST_QUERIES），每题取一次深候选列表，
+   用各融合方法重排后计算 top-k 关键词覆盖率；同时给出脚本中 HybridRetriever 的“取最大原始分”做参照
+
+用法：
+  python scripts/bench_fusion.py --latency-only
+  VECTOR_DB_PATH=./src/db/flood_prevention_db_cr_vectordb BM25_DB_PATH=./src/db/flood_prevention_db_cr_bm25 \
+      python scripts/bench_fusion.py --collection flood_prevention_collection --depth 50 --top-k 5
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from src.db.fusion import FUSION_METHODS, fuse
+
+
+def legacy_merge(vector, bm25, vector_weight, bm25_weight):
+    """SemanticBM25Retriever 原来的逐节点 dict 合并"""
+    combined = {}
+    for nid, score in vector:
+        entry = combined.get(nid, {"vec": 0.0, "bm": 0.0})
+        entry["vec"] = max(entry["vec"], score)
+        combined[nid] = entry
+    for nid, score in bm25:
+        entry = combined.get(nid, {"vec": 0.0, "bm": 0.0})
+        entry["bm"] = max(entry["bm"], score)
+        combined[nid] = entry
+    merged = [(nid, vector_weight * e["vec"] + bm25_weight * e["bm"]) for nid, e in combined.items()]
+    merged.sort(key=lambda x: x[1], reverse=True)
+    return merged
+
+
+def legacy_max(vector, bm25):
+    """scripts/ 中 HybridRetriever 的做法：同一节点取最大原始分"""
+    best = {}
+    for nid, score in vector + bm25:
+        if nid not in best or score > best[nid]:
+            best[nid] = score
+    return sorted(best, key=lambda nid: best[nid], reverse=True)
+
+
+def _timeit(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def bench_latency(depths, repeat):
+    rng = np.random.default_rng(0)
+    print(f"\n[延迟] 每次融合耗时（µs），重复 {repeat} 次取平均")
+    print(f"{'depth':>7} {'legacy-dict':>12}" + "".join(f"{m:>10}" for m in FUSION_METHODS))
+    for depth in depths:
+        # 两路候选约一半重叠
+        vec_ids = [f"n{i}" for i in rng.choice(depth * 2, depth, replace=False)]
+        bm_ids = [f"n{i}" for i in rng.choice(depth * 2, depth, replace=False)]
+        vec_scores = np.sort(rng.random(depth))[::-1].tolist()
+        bm_scores = np.sort(rng.random(depth) * 20)[::-1].tolist()
+        vector = list(zip(vec_ids, vec_scores))
+        bm25 = list(zip(bm_ids, bm_scores))
+        row = f"{depth:>7} {_timeit(lambda: legacy_merge(vector, bm25, 1.0, 1.3), repeat):>12.1f}"
+        for method in FUSION_METHODS:
+            row += f"{_timeit(lambda: fuse([vec_ids, bm_ids], [vec_scores, bm_scores], method, [1.0, 1.3]), repeat):>10.1f}"
+        print(row)
+
+
+def bench_recall(collection, depth, top_k):
+    from phase3_enhanced import TEST_QUERIES, evaluate_retrieval
+
+    # 候选深度由环境变量控制，必须在构造检索器之前设置
+    os.environ["VECTOR_TOP_K"] = str(depth)
+    os.environ["BM25_TOP_K"] = str(depth)
+    os.environ.setdefault("VECTOR_MIN_SCORE", "0.0")
+    from src.db.read_db import SemanticBM25Retriever
+
+    retriever = SemanticBM25Retriever(collection_name=collection)
+    queries = [item["query"] for item in TEST_QUERIES]
+    vector_batches = retriever._search_vector_many(retriever._embed_queries(queries))
+    bm25_batches = retriever._search_bm25_many(queries)
+
+    texts = {}
+    for batch in vector_batches + bm25_batches:
+        for n in batch:
+            texts[n.node.node_id] = n.node.get_content()
+
+    weights = [retriever._vector_weight, retriever._bm25_weight]
+    rankers = {"legacy-max": lambda v, b: legacy_max(v, b)}
+    for method in FUSION_METHODS:
+        rankers[method] = lambda v, b, m=method: fuse(
+            [[nid for nid, _ in v], [nid for nid, _ in b]],
+            [[s for _, s in v], [s for _, s in b]],
+            m, weights,
+        )[0]
+
+    print(f"\n[召回] {len(queries)} 题, 候选深度 {depth}, 关键词覆盖率@{top_k}")
+    print(f"{'method':>12} {'A':>7} {'B':>7} {'C':>7} {'all':>7}")
+    for name, rank in rankers.items():
+        per_category = {}
+        for item, vec_nodes, bm_nodes in zip(TEST_QUERIES, vector_batches, bm25_batches):
+            v = [(n.node.node_id, n.score or 0.0) for n in vec_nodes]
+            b = [(n.node.node_id, n.score or 0.0) for n in bm_nodes]
+            top_text = "\n".join(texts[nid] for nid in rank(v, b)[:top_k])
+            per_category.setdefault(item["id"][0], []).append(evaluate_retrieval(top_text, item["keywords"]))
+        overall = np.mean([s for scores in per_category.values() for s in scores])
+        print(f"{name:>12}" + "".join(f"{np.mean(per_category.get(c, [0])):>7.2%}" for c in "ABC")
+              + f"{overall:>7.2%}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--depths", type=int, nargs="+", default=[10, 50, 200, 1000])
+    ap.add_argument("--repeat", type=int, default=2000)
+    ap.add_argument("--latency-only", action="store_true")
+    ap.add_argument("--collection", default=os.getenv("COLLECTION_NAME", "flood_prevention_collection"))
+    ap.add_argument("--depth", type=int, default=50)
+    ap.add_argument("--top-k", type=int, default=5)
+    args = ap.parse_args()
+
+    bench_latency(args.depths, args.repeat)
+    if not args.latency_only:
+        bench_recall(args.collection, args.depth, args.top_k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+分词基准：src/contextual_retrieval/tokenizer.py
+  1. 入库批量分词：单进程 vs 多进程 tokenize_batch 的 tokens/sec（结果逐条比对）
+  2. 查询分词：首次（未命中缓存）vs 重复（LRU 命中）每条耗时
+  3. 领域词典：若干领域词是否被完整保留
+  4. 冷启动（--cold-start）：新进程从导入分词模块到首条查询分词完成的耗时，每种情况独立子进程：
+       无任何缓存（全新容器）/ jieba 自带 /tmp 缓存 / 索引目录下的词典快照（warm_start）
+
+语料默认取 BM25 库的 docstore.json 节点文本；库不存在时用合成段落（领域词 + 常用句式随机拼接）。
+
+用法：
+  python scripts/bench_tokenizer.py
+  python scripts/bench_tokenizer.py --texts 5000 --processes 1 2 4
+  python scripts/bench_tokenizer.py --cold-start
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from dotenv import load_dotenv
+
+from src.contextual_retrieval.tokenizer import (
+    chinese_tokenizer,
+    domain_words,
+    get_tokenizer,
+    query_cache,
+    save_dictionary,
+    tokenize_batch,
+    tokenize_query,
+    tokenizer_version,
+)
+
+load_dotenv()
+
+_PHRASES = [
+    "汛期应加强巡查，发现险情立即上报",
+    "当水位超过汛限水位时启动应急响应",
+    "组织转移下游受威胁群众至安置点",
+    "防汛物资储备包括编织袋、救生衣和抢险照明设备",
+    "值班人员二十四小时在岗，保持通讯畅通",
+    "泄洪前提前通知下游乡镇和村组",
+]
+
+
+def load_texts(limit: int) -> list:
+    docstore = Path(os.getenv("BM25_DB_PATH", "./src/db/flood_prevention_db_bm25")) / "docstore.json"
+    if docstore.exists():
+        with open(docstore, encoding="utf-8") as f:
+            data = json.load(f).get("docstore/data", {})
+        texts = [item["__data__"].get("text", "") for item in data.values()]
+        texts = [t for t in texts if t]
+        if texts:
+            return (texts * (limit // len(texts) + 1))[:limit]
+    rng = random.Random(0)
+    words = domain_words()
+    return [
+        "。".join(f"{rng.choice(words)}{rng.choice(_PHRASES)}" for _ in range(rng.randint(5, 15)))
+        for _ in range(limit)
+    ]
+
+
+# 子进程：分别计时导入（包 __init__ 会带入嵌入模型依赖，与词典无关）与“词典就绪 + 首条查询分词”
+_COLD_START = """
+import sys, time
+start = time.perf_counter()
+from src.contextual_retrieval.tokenizer import tokenize_query, warm_start
+imported = time.perf_counter()
+if sys.argv[1]:
+    assert warm_start(sys.argv[1])
+tokenize_query("杨家横水库的汛限水位是多少")
+print((imported - start) * 1000, (time.perf_counter() - imported) * 1000)
+"""
+
+
+def cold_start(snapshot_dir: str, tmp_dir: str, repeat: int):
+    env = dict(os.environ, TMPDIR=tmp_dir, PYTHONPATH=str(ROOT))
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _COLD_START, snapshot_dir],
+            env=env, cwd=str(ROOT), capture_output=True, text=True, check=True,
+        )
+        runs.append(tuple(float(x) for x in out.stdout.strip().splitlines()[-1].split()))
+    runs.sort(key=lambda r: r[1])
+    return runs[len(runs) // 2]
+
+
+def bench_cold_start(repeat: int) -> None:
+    print(f"\n冷启动到首条查询（{repeat} 次取中位数）：")
+    with tempfile.TemporaryDirectory() as snapshot_dir, tempfile.TemporaryDirectory() as jieba_tmp:
+        save_dictionary(snapshot_dir)
+        for label, snapshot, tmp in [
+            ("无缓存（全新容器）", "", None),
+            ("jieba /tmp 缓存", "", jieba_tmp),
+            ("词典快照 warm_start", snapshot_dir, None),
+        ]:
+            if tmp is None:
+                # 每次给一个空的临时目录，jieba 找不到自己的缓存
+                with tempfile.TemporaryDirectory() as empty:
+                    import_ms, first_ms = cold_start(snapshot, empty, repeat)
+            else:
+                import_ms, first_ms = cold_start(snapshot, tmp, repeat)
+            print(f"  {label:<20}词典 + 首条查询 {first_ms:7.0f}ms   （导入模块 {import_ms:6.0f}ms）")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--texts", type=int, default=3000)
+    ap.add_argument("--processes", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--cold-start", action="store_true", help="只测冷启动耗时")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    if args.cold_start:
+        bench_cold_start(args.repeat)
+        return
+
+    print(f"分词器版本：{tokenizer_version()}，CPU 核数 {os.cpu_count()}")
+    start = time.perf_counter()
+    get_tokenizer()
+    print(f"载入词典（{len(domain_words())} 个领域词）：{(time.perf_counter() - start) * 1000:.0f}ms")
+
+    texts = load_texts(args.texts)
+    chars = sum(len(t) for t in texts)
+    print(f"\n语料 {len(texts)} 段，共 {chars} 字")
+    reference = None
+    for processes in dict.fromkeys(args.processes):
+        start = time.perf_counter()
+        tokens = tokenize_batch(texts, processes=processes)
+        elapsed = time.perf_counter() - start
+        count = sum(len(t) for t in tokens)
+        same = "" if reference is None else ("  结果一致" if tokens == reference else "  结果不一致！")
+        reference = reference or tokens
+        print(f"  {processes:>2} 进程：{elapsed:6.2f}s  {count / elapsed:10.0f} tokens/s{same}")
+
+    rng = random.Random(1)
+    queries = [f"{rng.choice(domain_words())}{rng.choice(_PHRASES)[:8]}？" for _ in range(args.queries)]
+    query_cache().cache_clear()
+    start = time.perf_counter()
+    for q in queries:
+        tokenize_query(q)
+    cold = (time.perf_counter() - start) / len(queries) * 1e6
+    start = time.perf_counter()
+    for q in queries:
+        tokenize_query(q)
+    warm = (time.perf_counter() - start) / len(queries) * 1e6
+    print(f"\n查询分词 {len(queries)} 条：未命中 {cold:6.1f}µs/条  命中 {warm:6.1f}µs/条  {query_cache().cache_info()}")
+
+    print("\n领域词切分：")
+    for word in ["区防汛指挥部办公室", "杨家横水库", "常庄水库"]:
+        print(f"  {word} → {chinese_tokenizer(word + '的值班电话')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,16 @@
 构建数值属性层（Attribute Store）
 - 从 PDF 文档中抽取字段-数值-单位-条件-来源
 - 输出到 SQLite（默认: src/db/attribute_store.sqlite）
+- 逐文件解析、逐页抽取，事实以生成器流式写入（单事务 executemany，见 store.bulk_insert）
+- 写入后同步全文索引 attributes_fts（evidence_text 等列 jieba 分词，供 search_facts 检索）
+- 写入前先迁移库结构（旧库补列、回填、去重、建索引）；检索端只读打开，不做迁移
+  --migrate-only：只迁移已有的库并同步全文索引，不解析 PDF
+
+用法：
+  python scripts/build_attribute_store.py
+  python scripts/build_attribute_store.py --migrate-only
 """
+import argparse
 import os
 import sys
 from pathlib import Path
@@ -19,11 +28,26 @@ sys.path.insert(0, str(ROOT))
 from llama_index.core import SimpleDirectoryReader
 from llama_index.readers.file import PDFReader
 
-from src.attribute_store.store import init_db, insert_facts
+from src.attribute_store.store import get_store
 from src.attribute_store.extract import extract_facts
 
 
-def build_attribute_store():
+def iter_page_facts(reader, stats):
+    """逐文件解析 PDF，逐页产出抽取到的事实"""
+    for documents in reader.iter_data():
+        for doc in documents:
+            stats["pages"] += 1
+            text = doc.text or ""
+            if not text.strip():
+                continue
+            meta = doc.metadata or {}
+            file_path = meta.get("file_path", "")
+            source_doc = os.path.basename(file_path) if file_path else "unknown"
+            source_page = str(meta.get("page_label", ""))
+            yield from extract_facts(text, source_doc=source_doc, source_page=source_page)
+
+
+def build_attribute_store(migrate_only: bool = False):
     load_dotenv()
 
     # Attribute store should use PDF directory; keep separate from vector DATA_DIR
@@ -36,32 +60,27 @@ def build_attribute_store():
     print(f"DATA_DIR: {data_dir}")
     print(f"DB: {out_db}")
 
-    init_db(out_db)
+    store = get_store(out_db)
+    store.migrate()
+    if migrate_only:
+        synced = store.sync_fts()
+        print(f"完成：库结构已迁移，全文索引同步 {synced} 条")
+        print("=" * 72)
+        return
 
     parser = PDFReader(return_full_document=False)
     reader = SimpleDirectoryReader(data_dir, file_extractor={".pdf": parser}, recursive=True)
-    documents = reader.load_data()
-
-    print(f"加载文档片段: {len(documents)}")
-
-    total_facts = 0
-    for doc in documents:
-        text = doc.text or ""
-        if not text.strip():
-            continue
-        meta = doc.metadata or {}
-        file_path = meta.get("file_path", "")
-        source_doc = os.path.basename(file_path) if file_path else "unknown"
-        source_page = str(meta.get("page_label", ""))
-
-        facts = extract_facts(text, source_doc=source_doc, source_page=source_page)
-        if facts:
-            inserted = insert_facts(out_db, facts)
-            total_facts += inserted
-
-    print(f"完成：新增 {total_facts} 条属性事实")
+
+    stats = {"pages": 0}
+    inserted, duplicates = store.bulk_insert(iter_page_facts(reader, stats))
+    synced = store.sync_fts()
+
+    print(f"加载文档片段: {stats['pages']}")
+    print(f"完成：新增 {inserted} 条属性事实（重复忽略 {duplicates} 条），全文索引同步 {synced} 条")
     print("=" * 72)
 
 
 if __name__ == "__main__":
-    build_attribute_store()
+    ap = argparse.ArgumentParser(description="构建数值属性层")
+    ap.add_argument("--migrate-only", action="store_true", help="只迁移已有的库并同步全文索引，不解析 PDF")
+    build_attribute_store(migrate_only=ap.parse_args().migrate_only)
@@ -2,7 +2,12 @@
 清洗 KG 图节点名（去路径前缀/文件后缀/别名归一）
 - 只修改 graph_store.json，不重建数据库
 - 会生成 graph_store.json.bak 备份
+- 整图融合（fuse_graph）：每个去重节点名只归一化一次；--processes N 用进程池
+
+用法：
+  python scripts/clean_kg_nodes.py [--processes 4]
 """
+import argparse
 import json
 import os
 import sys
@@ -12,47 +17,30 @@ from typing import Dict, List
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT))
 
-from src.contextual_retrieval.entity_fusion import normalize_entity
+from src.contextual_retrieval.entity_fusion import fuse_graph
 KG_DIR = ROOT / "src" / "db" / "knowledge_graph"
 GRAPH_PATH = KG_DIR / "graph_store.json"
 BACKUP_PATH = KG_DIR / "graph_store.json.bak"
 
 
-def _normalize_node(name: str) -> str:
-    return normalize_entity(name)
-
-
-def _dedup_edges(edges: List[List[str]]) -> List[List[str]]:
-    seen = set()
-    out = []
-    for rel, obj in edges:
-        key = (rel, obj)
-        if key not in seen:
-            seen.add(key)
-            out.append([rel, obj])
-    return out
-
-
-def clean_graph_store() -> None:
+def clean_graph_store(processes: int = 1) -> None:
     if not GRAPH_PATH.exists():
         raise FileNotFoundError(f"graph_store.json not found: {GRAPH_PATH}")
 
     raw = json.loads(GRAPH_PATH.read_text(encoding="utf-8"))
     graph_dict: Dict[str, List[List[str]]] = raw.get("graph_dict", {})
 
-    new_graph: Dict[str, List[List[str]]] = {}
     node_count_before = len(graph_dict)
     edge_count_before = sum(len(v) for v in graph_dict.values())
 
-    for subj, edges in graph_dict.items():
-        n_subj = _normalize_node(subj)
-        for rel, obj in edges:
-            n_obj = _normalize_node(obj)
-            new_graph.setdefault(n_subj, []).append([rel, n_obj])
-
-    # 去重
-    for k in list(new_graph.keys()):
-        new_graph[k] = _dedup_edges(new_graph[k])
+    # 融合 + 去重（保留边的首次出现顺序）
+    fused, stats = fuse_graph(
+        ((subj, rel, obj) for subj, edges in graph_dict.items() for rel, obj in edges),
+        processes=processes,
+    )
+    new_graph: Dict[str, List[List[str]]] = {}
+    for n_subj, rel, n_obj in fused:
+        new_graph.setdefault(n_subj, []).append([rel, n_obj])
 
     node_count_after = len(new_graph)
     edge_count_after = sum(len(v) for v in new_graph.values())
@@ -69,8 +57,11 @@ def clean_graph_store() -> None:
     print("KG graph_store clean complete")
     print(f"nodes: {node_count_before} -> {node_count_after}")
     print(f"edges: {edge_count_before} -> {edge_count_after}")
+    print(f"entities: {stats['original_entities']} -> {stats['fused_entities']}")
     print(f"backup: {BACKUP_PATH}")
 
 
 if __name__ == "__main__":
-    clean_graph_store()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--processes", type=int, default=1, help="归一化进程数（节点很多时有效）")
+    clean_graph_store(ap.parse_args().processes)
@@ -23,13 +23,13 @@ from llama_index.core import (
 )
 from llama_index.core.graph_stores import SimpleGraphStore
 from llama_index.llms.ollama import Ollama
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.readers.file import PDFReader
 
 # 导入自定义 Schema
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 from src.schema.flood_schema import FloodSchema
 from src.contextual_retrieval.entity_fusion import normalize_triplets
+from src.contextual_retrieval.embedding import get_embed_model
 
 # 使用 Schema 生成的 v2 Prompt（已传给 LLM，不再是摆设）
 KG_TRIPLET_EXTRACT_TMPL = FloodSchema.get_prompt_template()
@@ -155,10 +155,7 @@ def create_knowledge_graph():
         temperature=0.1      # 抽取任务需要低温度
     )
 
-    embed_model = HuggingFaceEmbedding(
-        model_name="BAAI/bge-small-zh-v1.5",
-        device="cpu"
-    )
+    embed_model = get_embed_model()
 
     # 设置全局配置
     Settings.llm = llm
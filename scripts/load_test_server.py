@@ -0,0 +1,216 @@
+"""
+RAG 服务压测（假 LLM）
+在进程内启动 src/tools/server.py 的 FastAPI 应用，LLM 换成可控延迟的假模型，
+用 N 个并发客户端发送流式请求，统计首 token 延迟 / 完整延迟的 p50/p95/p99、QPS 以及 503/504 数量。
+
+默认检索器也是假的（固定延迟，返回固定节点），只测服务层排队与限流；
+加 --real-retriever 则使用 VECTOR_DB_PATH / BM25_DB_PATH 下的真实索引。
+
+用法：
+  python scripts/load_test_server.py --requests 400 --concurrency 32 --llm-concurrency 4
+  python scripts/load_test_server.py --llm-queue 8 --deadline 5      # 观察负载削减与超时
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, List
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import httpx
+import uvicorn
+from llama_index.core.llms import CompletionResponse, CompletionResponseGen, CustomLLM, LLMMetadata
+from llama_index.core.llms.callbacks import llm_completion_callback
+from llama_index.core.schema import NodeWithScore, TextNode
+
+QUERIES = [
+    "杨家横水库的汛限水位是多少？",
+    "常庄水库的总库容是多少？",
+    "什么情况下需要启动III级应急响应？",
+    "防洪抢险物资储备包括哪些东西？",
+    "发现险情后应该如何报告？",
+]
+
+
+class FakeLLM(CustomLLM):
+    """首 token 前等待 ttft 秒，之后每 token_delay 秒吐一个 token"""
+
+    ttft: float = 0.3
+    token_delay: float = 0.02
+    num_tokens: int = 40
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(context_window=8192, num_output=256, model_name="fake")
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        time.sleep(self.ttft + self.token_delay * self.num_tokens)
+        return CompletionResponse(text="答" * self.num_tokens)
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        time.sleep(self.ttft)
+        text = ""
+        for _ in range(self.num_tokens):
+            time.sleep(self.token_delay)
+            text += "答"
+            yield CompletionResponse(text=text, delta="答")
+
+    @llm_completion_callback()
+    async def astream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        async def gen():
+            await asyncio.sleep(self.ttft)
+            text = ""
+            for _ in range(self.num_tokens):
+                await asyncio.sleep(self.token_delay)
+                text += "答"
+                yield CompletionResponse(text=text, delta="答")
+
+        return gen()
+
+
+class FakeRetriever:
+    """固定延迟的检索器，接口与 SemanticBM25Retriever.aretrieve_many 一致"""
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.last_timings = {}
+        self._nodes = [
+            NodeWithScore(node=TextNode(text=f"杨家横水库汛限水位为298.50米。第{i}段。", id_=f"fake-{i}"), score=1.0 - i * 0.1)
+            for i in range(5)
+        ]
+
+    async def aretrieve_many(self, queries: List[str]) -> List[NodeWithScore]:
+        await asyncio.sleep(self.latency)
+        return list(self._nodes)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentiles(values: List[float]) -> str:
+    if not values:
+        return "n/a"
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return f"p50={p50:7.1f}ms  p95={p95:7.1f}ms  p99={p99:7.1f}ms"
+
+
+async def _client(url: str, queue: "asyncio.Queue[str]", results: list) -> None:
+    async with httpx.AsyncClient(timeout=None) as client:
+        while True:
+            try:
+                query = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            first = None
+            async with client.stream("POST", url, json={"query": query, "stream": True}) as resp:
+                async for chunk in resp.aiter_text():
+                    if first is None and chunk:
+                        first = time.perf_counter()
+            end = time.perf_counter()
+            results.append({
+                "status": resp.status_code,
+                "latency": (end - start) * 1000.0,
+                "ttft": ((first or end) - start) * 1000.0,
+            })
+
+
+async def _run(base_url: str, requests: int, concurrency: int):
+    queue: "asyncio.Queue[str]" = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(QUERIES[i % len(QUERIES)])
+    results: list = []
+    start = time.perf_counter()
+    await asyncio.gather(*[_client(base_url + "/rag-chat", queue, results) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    async with httpx.AsyncClient() as client:
+        health = (await client.get(base_url + "/health")).json()
+    return results, elapsed, health
+
+
+def _report(results: list, elapsed: float, health: dict, concurrency: int) -> None:
+    ok = [r for r in results if r["status"] == 200]
+    statuses = Counter(r["status"] for r in results)
+    print(f"\n请求数 {len(results)}  并发 {concurrency}  耗时 {elapsed:.2f}s  "
+          f"QPS={len(results) / elapsed:.1f}  成功 QPS={len(ok) / elapsed:.1f}")
+    print(f"状态码: {dict(sorted(statuses.items()))}")
+    print(f"首 token  {_percentiles([r['ttft'] for r in ok])}")
+    print(f"完整响应  {_percentiles([r['latency'] for r in ok])}")
+    for stage in ("retrieval", "llm", "result_cache", "answer_cache"):
+        print(f"{stage:>12}: {health[stage]}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--llm-concurrency", type=int, default=4)
+    ap.add_argument("--llm-queue", type=int, default=64)
+    ap.add_argument("--retrieval-concurrency", type=int, default=8)
+    ap.add_argument("--retrieval-queue", type=int, default=128)
+    ap.add_argument("--deadline", type=float, default=60.0)
+    ap.add_argument("--ttft", type=float, default=0.3, help="假 LLM 首 token 延迟（秒）")
+    ap.add_argument("--token-delay", type=float, default=0.02)
+    ap.add_argument("--tokens", type=int, default=40)
+    ap.add_argument("--retrieval-latency", type=float, default=0.05, help="假检索器延迟（秒）")
+    ap.add_argument("--real-retriever", action="store_true")
+    ap.add_argument("--query-cache", type=int, default=0, help="检索结果缓存条目数（默认 0，关闭以便测到检索阶段）")
+    ap.add_argument("--answer-cache", type=int, default=0, help="语义答案缓存条目数（默认 0，关闭以便测到生成阶段）")
+    ap.add_argument("--verbose", action="store_true", help="保留 workflow 的逐请求打印")
+    args = ap.parse_args()
+
+    # 限流参数在 create_app 时读取
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.llm_concurrency)
+    os.environ["LLM_MAX_QUEUE"] = str(args.llm_queue)
+    os.environ["RETRIEVAL_MAX_CONCURRENCY"] = str(args.retrieval_concurrency)
+    os.environ["RETRIEVAL_MAX_QUEUE"] = str(args.retrieval_queue)
+    os.environ["REQUEST_DEADLINE"] = str(args.deadline)
+    os.environ["QUERY_CACHE_SIZE"] = str(args.query_cache)
+    os.environ["ANSWER_CACHE_SIZE"] = str(args.answer_cache)
+
+    from src.tools.resources import get_registry
+    from src.tools.server import DEFAULT_COLLECTION, create_app
+
+    registry = get_registry()
+    registry.set_llm(FakeLLM(ttft=args.ttft, token_delay=args.token_delay, num_tokens=args.tokens))
+    if not args.real_retriever:
+        registry.register(DEFAULT_COLLECTION, FakeRetriever(args.retrieval_latency))
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        create_app(warm_up=args.real_retriever), host="127.0.0.1", port=port, log_level="warning",
+    ))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    ideal = args.ttft + args.token_delay * args.tokens
+    print(f"假 LLM: 首 token {args.ttft * 1000:.0f}ms, 完整生成 {ideal * 1000:.0f}ms; "
+          f"LLM 并发 {args.llm_concurrency} → 理论上限约 {args.llm_concurrency / ideal:.1f} QPS")
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        results, elapsed, health = asyncio.run(_run(f"http://127.0.0.1:{port}", args.requests, args.concurrency))
+    server.should_exit = True
+    thread.join()
+    _report(results, elapsed, health, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
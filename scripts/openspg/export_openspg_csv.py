@@ -2,6 +2,8 @@
 Export current KG triples and attribute facts to CSV for OpenSPG ingestion.
 - KG source: src/db/knowledge_graph/graph_store.json
 - Attribute source: src/db/attribute_store.sqlite
+KG triples go through the graph-level entity fusion (fuse_graph): each distinct
+entity string is normalized once and duplicate triples after fusion are dropped.
 Outputs:
   data/openspg/kg_triples.csv
   data/openspg/attributes.csv
@@ -12,7 +14,7 @@ import sqlite3
 from pathlib import Path
 from typing import Dict, List
 
-from src.contextual_retrieval.entity_fusion import normalize_entity
+from src.contextual_retrieval.entity_fusion import fuse_graph
 
 ROOT = Path(__file__).resolve().parents[2]
 KG_DIR = ROOT / "src" / "db" / "knowledge_graph"
@@ -28,18 +30,16 @@ def export_kg_triples(out_path: Path) -> int:
     raw = json.loads(graph_path.read_text(encoding="utf-8"))
     graph_dict: Dict[str, List[List[str]]] = raw.get("graph_dict", {})
 
+    fused, _ = fuse_graph(
+        (subj, pred, obj) for subj, edges in graph_dict.items() for pred, obj in edges
+    )
+
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    count = 0
     with out_path.open("w", encoding="utf-8", newline="") as f:
         writer = csv.writer(f)
         writer.writerow(["subject", "predicate", "object"])
-        for subj, edges in graph_dict.items():
-            n_subj = normalize_entity(subj)
-            for pred, obj in edges:
-                n_obj = normalize_entity(obj)
-                writer.writerow([n_subj, pred, n_obj])
-                count += 1
-    return count
+        writer.writerows(fused)
+    return len(fused)
 
 
 def export_attributes(out_path: Path) -> int:
@@ -26,15 +26,15 @@ from llama_index.core import (
     Settings,
     QueryBundle
 )
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.retrievers.bm25 import BM25Retriever
 from llama_index.core.retrievers import BaseRetriever
 from llama_index.core.schema import NodeWithScore
 from llama_index.llms.ollama import Ollama
 import chromadb
-import jieba
 from typing import List
+from src.contextual_retrieval.embedding import get_embed_model
+from src.contextual_retrieval.tokenizer import chinese_tokenizer
 
 load_dotenv()
 
@@ -61,9 +61,6 @@ TEST_QUERIES = [
     {"query": "请详细描述堤防巡查的具体步骤和标准。", "category": "长文描述", "type": "规则说明"}
 ]
 
-def chinese_tokenizer(text):
-    """中文分词器"""
-    return list(jieba.cut_for_search(text))
 
 class HybridRetriever(BaseRetriever):
     """混合检索器（向量+BM25）"""
@@ -91,7 +88,7 @@ def init_baseline_retriever(db_path, bm25_path, collection_name):
     """初始化Baseline检索器 - 从预构建的数据库加载（与CR采用相同架构）"""
     print("🔹 Baseline: 从预构建数据库加载...")
     
-    embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-zh-v1.5", device="cpu")
+    embed_model = get_embed_model()
     
     if not os.path.exists(db_path):
         print(f"   ❌ 数据库不存在: {db_path}")
@@ -123,7 +120,7 @@ def init_cr_retriever(db_path, bm25_path, collection_name):
     """初始化CR检索器 - 从预构建的数据库加载"""
     print("🔹 CR Enhanced: 从预构建数据库加载...")
     
-    embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-zh-v1.5", device="cpu")
+    embed_model = get_embed_model()
     
     if not os.path.exists(db_path):
         print(f"   ❌ 数据库不存在: {db_path}")
@@ -165,7 +162,7 @@ def init_kg_retriever(kg_dir):
         request_timeout=120.0,
         context_window=1024
     )
-    embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-zh-v1.5", device="cpu")
+    embed_model = get_embed_model()
     Settings.llm = llm
     Settings.embed_model = embed_model
     
@@ -23,14 +23,13 @@ from llama_index.core import (
     Settings,
     QueryBundle
 )
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.retrievers.bm25 import BM25Retriever
 from llama_index.core.retrievers import BaseRetriever
 from llama_index.core.schema import NodeWithScore
 import chromadb
-import jieba
 from typing import List
+from src.contextual_retrieval.embedding import get_embed_model
 
 load_dotenv()
 
@@ -110,9 +109,6 @@ TEST_QUERIES = [
      "expected_answer": "值班要求", "keywords": ["值班", "制度", "要求"]},
 ]
 
-def chinese_tokenizer(text):
-    """中文分词器"""
-    return list(jieba.cut_for_search(text))
 
 class HybridRetriever(BaseRetriever):
     """混合检索器（向量+BM25）"""
@@ -140,7 +136,7 @@ def init_retriever(vector_db_path, bm25_path, collection_name, name=""):
     """初始化检索器"""
     print(f"🔹 {name}: 加载数据库...")
     
-    embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-zh-v1.5", device="cpu")
+    embed_model = get_embed_model()
     
     if not os.path.exists(vector_db_path):
         print(f"   ❌ 向量数据库不存在: {vector_db_path}")
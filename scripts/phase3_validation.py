@@ -20,7 +20,6 @@ from dotenv import load_dotenv
 sys.path.insert(0, str(Path(__file__).parents[1]))
 
 from llama_index.core import VectorStoreIndex, QueryBundle
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.retrievers.bm25 import BM25Retriever
 from llama_index.core.retrievers import BaseRetriever
@@ -28,6 +27,7 @@ from llama_index.core.schema import NodeWithScore
 import chromadb
 from typing import List
 import numpy as np
+from src.contextual_retrieval.embedding import get_embed_model
 
 load_dotenv()
 
@@ -111,7 +111,7 @@ def init_retriever(vector_db_path, bm25_path, collection_name, name=""):
     """初始化检索器"""
     print(f"🔹 {name}: 加载数据库...")
     
-    embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-zh-v1.5", device="cpu")
+    embed_model = get_embed_model()
     
     if not os.path.exists(vector_db_path):
         print(f"   ❌ 向量数据库不存在: {vector_db_path}")
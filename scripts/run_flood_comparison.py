@@ -20,14 +20,13 @@ from dotenv import load_dotenv
 sys.path.insert(0, str(Path(__file__).parents[1]))
 
 from llama_index.core import VectorStoreIndex, QueryBundle
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.retrievers.bm25 import BM25Retriever
 from llama_index.core.retrievers import BaseRetriever
 from llama_index.core.schema import NodeWithScore
 import chromadb
-import jieba
 from typing import List
+from src.contextual_retrieval.embedding import get_embed_model
 
 load_dotenv()
 
@@ -39,8 +38,6 @@ COLLECTION_NAME = os.getenv("COLLECTION_NAME", "flood_prevention_collection")
 BASELINE_REPORT = Path(__file__).parent.parent / "results" / "flood_retrieval_report.json"
 COMPARISON_REPORT = Path(__file__).parent.parent / "results" / "flood_comparison_report.md"
 
-def chinese_tokenizer(text):
-    return list(jieba.cut_for_search(text))
 
 class HybridRetriever(BaseRetriever):
     def __init__(self, vector_retriever, bm25_retriever):
@@ -71,10 +68,7 @@ class HybridRetriever(BaseRetriever):
 
 def init_retrievers():
     print(f"Loading DB from: {DB_PATH}")
-    embed_model = HuggingFaceEmbedding(
-        model_name="BAAI/bge-small-zh-v1.5",
-        device="cpu"
-    )
+    embed_model = get_embed_model()
     
     if not os.path.exists(DB_PATH):
         print(f"Error: Vector DB Path does not exist: {DB_PATH}")
@@ -17,14 +17,13 @@ from dotenv import load_dotenv
 sys.path.insert(0, str(Path(__file__).parents[1]))
 
 from llama_index.core import VectorStoreIndex, QueryBundle
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.retrievers.bm25 import BM25Retriever
 from llama_index.core.retrievers import BaseRetriever
 from llama_index.core.schema import NodeWithScore
 import chromadb
-import jieba
 from typing import List
+from src.contextual_retrieval.embedding import get_embed_model
 
 load_dotenv()
 
@@ -40,8 +39,6 @@ TEST_QUERIES = [
     {"query": "水库大坝出现险情时应该联系谁？", "category": "多跳推理"},
 ]
 
-def chinese_tokenizer(text):
-    return list(jieba.cut_for_search(text))
 
 class HybridRetriever(BaseRetriever):
     def __init__(self, vector_retriever, bm25_retriever):
@@ -59,7 +56,7 @@ class HybridRetriever(BaseRetriever):
 
 def init_retriever(db_path, bm25_path, collection_name):
     """初始化检索器"""
-    embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-zh-v1.5", device="cpu")
+    embed_model = get_embed_model()
     
     if not os.path.exists(db_path):
         return None
@@ -8,30 +8,17 @@ import json
 import sys
 from dotenv import load_dotenv
 from llama_index.core import VectorStoreIndex
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.retrievers.bm25 import BM25Retriever
 from llama_index.llms.ollama import Ollama
 from llama_index.core import Settings
 import chromadb
-import jieba
 
-load_dotenv()
-
-# 中文分词器（必须与 save_bm25.py 中的完全一致）
-def chinese_tokenizer(text):
-    """增强型中文分词器，支持'包'、'包子'等词的模糊匹配"""
-    tokens = list(jieba.cut_for_search(text))
-
-    enhanced_tokens = []
-    for token in tokens:
-        enhanced_tokens.append(token)
-        # 只要包含'包'字，就添加相关词（提高召回率）
-        if '包' in token:
-            enhanced_tokens.append('包')
-            enhanced_tokens.append('包子')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.contextual_retrieval.embedding import get_embed_model
+from src.contextual_retrieval.tokenizer import chinese_tokenizer
 
-    return enhanced_tokens
+load_dotenv()
 
 # 精心设计的测试问题（根据实际PDF内容）
 # 问题分类：实体查找、价格查询、窗口定位、菜品推荐
@@ -94,10 +81,7 @@ class SimpleABTester:
         )
 
         # 初始化 Embedding - 必须使用与数据库创建时相同的模型（中文模型！）
-        self.embed_model = HuggingFaceEmbedding(
-            model_name="BAAI/bge-small-zh-v1.5",  # 中文模型
-            device="cpu"
-        )
+        self.embed_model = get_embed_model()
 
         Settings.llm = self.llm
         Settings.embed_model = self.embed_model
@@ -115,17 +99,6 @@ class SimpleABTester:
         # 加载 BM25 数据库
         print("加载 BM25 数据库...")
         # 注意：必须重新指定分词器，因为persist不保存tokenizer
-        import jieba
-        def chinese_tokenizer(text):
-            """增强型中文分词器，与创建时保持一致"""
-            tokens = list(jieba.cut_for_search(text))
-            enhanced_tokens = []
-            for token in tokens:
-                enhanced_tokens.append(token)
-                if '包' in token:
-                    enhanced_tokens.append('包')
-                    enhanced_tokens.append('包子')
-            return enhanced_tokens
         
         # 先加载基础BM25
         self.bm25_retriever = BM25Retriever.from_persist_dir(
@@ -19,15 +19,14 @@ from dotenv import load_dotenv
 sys.path.insert(0, str(Path(__file__).parents[1]))
 
 from llama_index.core import VectorStoreIndex
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.retrievers.bm25 import BM25Retriever
 from llama_index.core import QueryBundle
 from llama_index.core.retrievers import BaseRetriever
 from llama_index.core.schema import NodeWithScore
 import chromadb
-import jieba
 from typing import List
+from src.contextual_retrieval.embedding import get_embed_model
 
 load_dotenv()
 
@@ -36,10 +35,6 @@ DB_PATH = os.getenv("VECTOR_DB_PATH", "./src/db/flood_prevention_db_vectordb")
 BM25_PATH = os.getenv("BM25_DB_PATH", "./src/db/flood_prevention_db_bm25")
 COLLECTION_NAME = os.getenv("COLLECTION_NAME", "flood_prevention_collection")
 
-# 中文分词器
-def chinese_tokenizer(text):
-    return list(jieba.cut_for_search(text))
-
 # ===== 混合检索器 =====
 class HybridRetriever(BaseRetriever):
     def __init__(self, vector_retriever, bm25_retriever):
@@ -85,10 +80,7 @@ def init_retrievers():
     print("=" * 80)
     
     # 初始化Embedding模型
-    embed_model = HuggingFaceEmbedding(
-        model_name="BAAI/bge-small-zh-v1.5",
-        device="cpu"
-    )
+    embed_model = get_embed_model()
     
     # 初始化向量数据库
     db = chromadb.PersistentClient(path=DB_PATH)
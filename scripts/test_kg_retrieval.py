@@ -20,11 +20,11 @@ from llama_index.core import (
 )
 from llama_index.core.retrievers import KnowledgeGraphRAGRetriever
 from llama_index.llms.ollama import Ollama
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 
 # Load environment
 load_dotenv()
 sys.path.insert(0, str(Path(__file__).parents[1]))  # Add project root
+from src.contextual_retrieval.embedding import get_embed_model
 
 ROOT = Path(__file__).resolve().parents[1]
 KG_DIR = str(ROOT / "src" / "db" / "knowledge_graph")
@@ -46,7 +46,7 @@ def test_kg_retrieval():
         request_timeout=120.0,
         context_window=1024
     )
-    embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-zh-v1.5", device="cpu")
+    embed_model = get_embed_model()
     Settings.llm = llm
     Settings.embed_model = embed_model
 
@@ -1,4 +1,14 @@
+"""
+数值属性规则抽取：页面文本 → 字段-数值-单位-条件-来源事实
+
+每页只扫描一次：
+  - 字段：一次字符类扫描找出所有字段名首字的位置，按首字分派，只在这些位置尝试对应字段的正则
+    （没有固定首字的“时限”单独整页扫描），结果与逐字段 finditer 完全一致
+  - 设施：整页设施名位置只找一次，每条事实用二分查找取最近的设施
+"""
+
 import re
+from bisect import bisect_left
 from typing import Dict, Any, List, Optional, Tuple
 from src.schema.flood_schema import RULE_RESPONSE_LEVEL
 
@@ -53,19 +63,86 @@ FIELD_PATTERNS: List[Tuple[str, re.Pattern]] = [
 ]
 
 
-def _find_facility(text: str, center: int) -> Optional[str]:
-    facilities = list({m.group(1) for m in FACILITY_PATTERN.finditer(text)})
-    if not facilities:
-        return None
-    # 取距离 center 最近的设施名
-    best = None
-    best_dist = 10**9
+# 数值 / 单位所在的捕获组（默认 1、2）
+VALUE_GROUPS: Dict[str, Tuple[int, int]] = {
+    "降雨量": (2, 3),
+    "时限": (1, 2),
+}
+
+# 匹配可能的起始字符（默认取正则首字符，即字段名首字）；None 表示没有固定首字，单独整页扫描
+LEADING_CHARS: Dict[str, Optional[str]] = {
+    "降雨量": "日降雨",
+    "时限": None,
+}
+
+
+def _build_dispatch() -> Tuple[Dict[str, List[int]], List[int]]:
+    dispatch: Dict[str, List[int]] = {}
+    scanned: List[int] = []
+    for i, (field, pat) in enumerate(FIELD_PATTERNS):
+        chars = LEADING_CHARS.get(field, pat.pattern[0])
+        if chars is None:
+            scanned.append(i)
+            continue
+        if not all("\u4e00" <= ch <= "\u9fa5" for ch in chars):
+            raise ValueError(f"字段 {field} 的正则没有固定汉字首字，需在 LEADING_CHARS 中声明")
+        for ch in chars:
+            dispatch.setdefault(ch, []).append(i)
+    return dispatch, scanned
+
+
+# 首字 → 以该字开头的字段下标；一次字符类扫描找出所有候选起点，再只在候选处尝试对应字段的正则
+_DISPATCH, _SCANNED_FIELDS = _build_dispatch()
+_TRIGGER_PATTERN = re.compile("[" + "".join(_DISPATCH) + "]")
+
+
+def _field_matches(text: str) -> List[Tuple[int, re.Match]]:
+    """
+    全部字段匹配，顺序与逐字段 finditer 一致（先按 FIELD_PATTERNS 顺序，再按位置）
+    每个字段各自不重叠：候选起点按位置递增尝试 pat.match，命中后跳过其覆盖范围，
+    候选集是实际起点的超集，因此与 finditer 结果相同；不同字段之间照旧允许重叠
+    """
+    found: List[Tuple[int, int, re.Match]] = []
+    next_start = [0] * len(FIELD_PATTERNS)
+    for t in _TRIGGER_PATTERN.finditer(text):
+        pos = t.start()
+        for i in _DISPATCH[t.group()]:
+            if pos < next_start[i]:
+                continue
+            m = FIELD_PATTERNS[i][1].match(text, pos)
+            if m:
+                found.append((i, pos, m))
+                next_start[i] = m.end()
+    for i in _SCANNED_FIELDS:
+        found.extend((i, m.start(), m) for m in FIELD_PATTERNS[i][1].finditer(text))
+    found.sort(key=lambda x: (x[0], x[1]))
+    return [(i, m) for i, _, m in found]
+
+
+def _facility_index(text: str) -> Tuple[List[int], List[str]]:
+    """整页设施名位置（起点升序）与名称，每页只扫描一次"""
+    starts: List[int] = []
+    names: List[str] = []
     for m in FACILITY_PATTERN.finditer(text):
-        dist = abs(m.start() - center)
-        if dist < best_dist:
-            best_dist = dist
-            best = m.group(1)
-    return best or facilities[0]
+        starts.append(m.start())
+        names.append(m.group(1))
+    return starts, names
+
+
+def _nearest_facility(starts: List[int], names: List[str], center: int) -> Optional[str]:
+    """二分查找距离 center 最近的设施名；距离相同取靠前的一个"""
+    if not starts:
+        return None
+    i = bisect_left(starts, center)
+    if i == 0:
+        return names[0]
+    if i == len(starts) or center - starts[i - 1] <= starts[i] - center:
+        return names[i - 1]
+    return names[i]
+
+
+def _find_facility(text: str, center: int) -> Optional[str]:
+    return _nearest_facility(*_facility_index(text), center)
 
 
 def _find_condition(text: str) -> Optional[str]:
@@ -98,55 +175,53 @@ def _find_clause(text: str) -> Optional[str]:
 
 def extract_facts(text: str, source_doc: str, source_page: str) -> List[Dict[str, Any]]:
     facts: List[Dict[str, Any]] = []
-
-    for field, pat in FIELD_PATTERNS:
-        for m in pat.finditer(text):
-            # 统一数值/单位抓取
-            if field == "降雨量":
-                value = m.group(2)
-                unit = m.group(3)
-            elif field == "时限":
-                value = m.group(1)
-                unit = m.group(2)
-            else:
-                value = m.group(1)
-                unit = m.group(2)
-
-            try:
-                value_num = float(value)
-            except Exception:
-                value_num = None
-
-            ctx_s = max(0, m.start() - 40)
-            ctx_e = min(len(text), m.end() + 40)
-            ctx = text[ctx_s:ctx_e]
-
-            # 结构区分：若上下文包含“溢洪道”，则归入溢洪道字段
-            if field == "设计流量" and "溢洪道" in ctx:
-                field = "溢洪道设计流量"
-            elif field == "最大泄量" and "溢洪道" in ctx:
-                field = "溢洪道最大泄量"
-
-            entity_name = _find_facility(text, m.start())
-            condition = _find_condition(ctx)
-            comparator = _find_comparator(ctx)
-            clause = _find_clause(ctx)
-
-            facts.append(
-                {
-                    "entity_name": entity_name,
-                    "field": field,
-                    "value": value_num,
-                    "value_text": f"{value}{unit}",
-                    "unit": unit,
-                    "comparator": comparator,
-                    "condition": condition,
-                    "source_doc": source_doc,
-                    "source_page": source_page,
-                    "source_clause": clause,
-                    "evidence_text": ctx,
-                    "confidence": 0.8,
-                }
-            )
+    matches = _field_matches(text)
+    if not matches:
+        return facts
+    starts, names = _facility_index(text)
+
+    for i, m in matches:
+        field = FIELD_PATTERNS[i][0]
+        # 统一数值/单位抓取
+        value_group, unit_group = VALUE_GROUPS.get(field, (1, 2))
+        value = m.group(value_group)
+        unit = m.group(unit_group)
+
+        try:
+            value_num = float(value)
+        except Exception:
+            value_num = None
+
+        ctx_s = max(0, m.start() - 40)
+        ctx_e = min(len(text), m.end() + 40)
+        ctx = text[ctx_s:ctx_e]
+
+        # 结构区分：若上下文包含“溢洪道”，则归入溢洪道字段（只改本条，不影响同页后续匹配）
+        if field == "设计流量" and "溢洪道" in ctx:
+            field = "溢洪道设计流量"
+        elif field == "最大泄量" and "溢洪道" in ctx:
+            field = "溢洪道最大泄量"
+
+        entity_name = _nearest_facility(starts, names, m.start())
+        condition = _find_condition(ctx)
+        comparator = _find_comparator(ctx)
+        clause = _find_clause(ctx)
+
+        facts.append(
+            {
+                "entity_name": entity_name,
+                "field": field,
+                "value": value_num,
+                "value_text": f"{value}{unit}",
+                "unit": unit,
+                "comparator": comparator,
+                "condition": condition,
+                "source_doc": source_doc,
+                "source_page": source_page,
+                "source_clause": clause,
+                "evidence_text": ctx,
+                "confidence": 0.8,
+            }
+        )
 
     return facts
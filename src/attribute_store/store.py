@@ -1,5 +1,18 @@
+"""
+数值属性层存储（SQLite）：按路径缓存的 AttributeStore，每线程常驻连接，
+支持实体精确 / 模糊查找、批量入库、FTS5 全文检索与规范单位数值范围查询；
+检索端只读打开，库结构迁移由 migrate 在构建时完成
+"""
+
 import sqlite3
-from typing import Iterable, Dict, Any, List, Optional
+import threading
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Dict, Any, List, Optional, Tuple
+
+from src.attribute_store.units import canonicalize
 
 TABLE_SCHEMA = """
 CREATE TABLE IF NOT EXISTS attributes (
@@ -16,56 +29,586 @@ CREATE TABLE IF NOT EXISTS attributes (
     source_clause TEXT,
     evidence_text TEXT,
     confidence REAL,
+    entity_key TEXT,
+    value_canonical REAL,
+    unit_canonical TEXT,
     UNIQUE(entity_name, field, value_text, unit, condition, source_doc, source_page)
 );
 """
 
+# 事实去重键。表上的 UNIQUE 约束把 NULL 视为互不相同（condition / unit 常为空），同一事实会重复写入；
+# 这里用 ifnull 表达式建唯一索引，INSERT OR IGNORE 才能真正忽略重复
+FACT_KEY_COLUMNS = ["entity_name", "field", "value_text", "unit", "condition", "source_doc", "source_page"]
+UNIQUE_FACT_INDEX = "idx_attributes_fact"
+
+INDEX_SCHEMA = [
+    "CREATE INDEX IF NOT EXISTS idx_attributes_field_entity ON attributes(field, entity_name)",
+    "CREATE INDEX IF NOT EXISTS idx_attributes_entity_condition ON attributes(entity_name, condition)",
+    "CREATE INDEX IF NOT EXISTS idx_attributes_key_field ON attributes(entity_key, field)",
+    # 数值范围查询：field 等值 + value_canonical 区间扫描（兼作排序），
+    # 单位、比较词、实体键也放进索引，这些过滤在索引内完成，只有 LIMIT 以内的行回表
+    "CREATE INDEX IF NOT EXISTS idx_attributes_field_value "
+    "ON attributes(field, value_canonical, unit_canonical, comparator, entity_key)",
+]
+
+FACT_COLUMNS = [
+    "entity_name", "field", "value", "value_text", "unit", "comparator",
+    "condition", "source_doc", "source_page", "source_clause",
+    "evidence_text", "confidence",
+]
+
+INSERT_SQL = (
+    f"INSERT OR IGNORE INTO attributes ({', '.join(FACT_COLUMNS)}, entity_key, value_canonical, unit_canonical) "
+    f"VALUES ({', '.join('?' for _ in FACT_COLUMNS)}, ?, ?, ?)"
+)
+
+# 全文索引：列顺序即 bm25() 权重顺序
+FTS_COLUMNS = ["evidence_text", "source_clause", "entity_name", "field"]
+FTS_WEIGHTS = (1.0, 0.5, 2.0, 2.0)
+FTS_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS attributes_fts USING fts5({', '.join(FTS_COLUMNS)}, tokenize='unicode61')
+"""
+FTS_STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS attributes_fts_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    last_id INTEGER NOT NULL,
+    doc_count INTEGER NOT NULL,
+    tokenizer_version TEXT NOT NULL
+)
+"""
+FTS_TERMS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS attributes_fts_terms (
+    term TEXT PRIMARY KEY,
+    doc INTEGER NOT NULL
+) WITHOUT ROWID
+"""
+FTS_SYNC_BATCH = 2000
+# 文档频率超过该比例的查询词不参与匹配（区分度低，却让大量行进入 BM25 打分）
+FTS_MAX_DF_RATIO = 0.3
+# 文档频率不超过 max(比例 × 总行数, 下限) 的词视为稀有词，候选行只从稀有词的倒排中取
+FTS_RARE_DF_RATIO = 0.02
+FTS_RARE_MIN_DF = 100
+
+# 每条连接缓存的预编译语句数（sqlite3 默认 128）
+_CACHED_STATEMENTS = 256
+
+# 批量入库：每批 executemany 的行数与构建期间的 PRAGMA（结束后恢复）
+BULK_BATCH_SIZE = 5000
+BULK_PRAGMAS = {"synchronous": "OFF", "temp_store": "MEMORY", "cache_size": "-65536"}
+
+
+def entity_key(name: Optional[str]) -> Optional[str]:
+    """实体名规范化键：全角转半角、去空白、小写"""
+    if name is None:
+        return None
+    return "".join(unicodedata.normalize("NFKC", name).split()).lower()
+
+
+@lru_cache(maxsize=None)
+def _select_sql(by_key: bool, field: bool, entity_like: bool, condition: bool) -> str:
+    # 过滤条件组合有限，每种组合对应一条固定 SQL，连接级语句缓存可复用
+    sql = "SELECT * FROM attributes WHERE 1=1"
+    if by_key:
+        sql += " AND entity_key = ?"
+    if field:
+        sql += " AND field = ?"
+    if entity_like:
+        sql += " AND entity_name LIKE ?"
+    if condition:
+        sql += " AND condition LIKE ?"
+    return sql + " ORDER BY confidence DESC, id DESC LIMIT ?"
+
+
+@lru_cache(maxsize=None)
+def _range_sql(
+    lower: Optional[str], upper: Optional[str], unit: bool, comparator: bool, by_key: bool, condition: bool
+) -> str:
+    # lower / upper 为 ">" / ">=" / "<" / "<=" 或 None；组合有限，同样每种一条固定 SQL
+    sql = "SELECT * FROM attributes WHERE field = ?"
+    if lower:
+        sql += f" AND value_canonical {lower} ?"
+    if upper:
+        sql += f" AND value_canonical {upper} ?"
+    if not (lower or upper):
+        sql += " AND value_canonical IS NOT NULL"
+    if unit:
+        sql += " AND unit_canonical = ?"
+    if comparator:
+        sql += " AND comparator = ?"
+    if by_key:
+        sql += " AND entity_key = ?"
+    if condition:
+        sql += " AND condition LIKE ?"
+    # 只按 value_canonical 排序：顺序直接取自索引，扫到 LIMIT 条即停
+    return sql + " ORDER BY value_canonical DESC LIMIT ?"
+
+
+def _segment(text: Optional[str]) -> str:
+    # 延迟导入：只有用到全文检索时才加载 jieba 词典
+    from src.contextual_retrieval.tokenizer import chinese_tokenizer
+
+    return " ".join(t for t in chinese_tokenizer(text) if t.strip()) if text else ""
+
+
+def fts_query_terms(query: str) -> List[str]:
+    """查询分词（去重、去标点），小写后与词频表的键一致"""
+    from src.contextual_retrieval.tokenizer import tokenize_query
+
+    return list(dict.fromkeys(t.lower() for t in tokenize_query(query) if any(ch.isalnum() for ch in t)))
+
+
+def _match_expression(terms: List[str]) -> str:
+    # 词之间 OR，由 BM25 决定排序；每个词加引号按短语匹配
+    return " OR ".join('"' + t.replace('"', '""') + '"' for t in terms)
+
+
+def _fact_row(f: Dict[str, Any]) -> Tuple:
+    return (
+        tuple(f.get(col) for col in FACT_COLUMNS)
+        + (entity_key(f.get("entity_name")),)
+        + canonicalize(f.get("value"), f.get("unit"))
+    )
+
+
+class AttributeStore:
+    """
+    readonly=True 时以只读 URI 打开，不建表、不迁移、不改 journal 模式（检索端用）；
+    写入端在入库前调用 migrate（bulk_insert 会自动调用）
+    """
+
+    def __init__(self, db_path: str, readonly: bool = False) -> None:
+        self.db_path = db_path
+        self.readonly = readonly
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._fts_lock = threading.Lock()
+        self._migrated = False
+        self._columns: Optional[set] = None
+
+    def connection(self) -> sqlite3.Connection:
+        """当前线程的常驻连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.readonly:
+                conn = sqlite3.connect(
+                    f"file:{self.db_path}?mode=ro", uri=True,
+                    check_same_thread=False, cached_statements=_CACHED_STATEMENTS,
+                )
+            else:
+                conn = sqlite3.connect(
+                    self.db_path, check_same_thread=False, cached_statements=_CACHED_STATEMENTS
+                )
+                conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def columns(self) -> set:
+        """attributes 表现有的列（只读打开未迁移的旧库时缺 entity_key / value_canonical 等列）"""
+        if self._columns is None:
+            self._columns = {row["name"] for row in self.connection().execute("PRAGMA table_info(attributes)")}
+        return self._columns
+
+    def migrate(self) -> None:
+        """
+        建表，旧库补 entity_key / 规范数值列并回填、清理重复事实、建索引，切换到 WAL
+        只在构建 / 入库时调用（scripts/build_attribute_store.py），检索端只读打开不会触发
+        """
+        if self._migrated:
+            return
+        if self.readonly:
+            raise sqlite3.OperationalError(f"attribute store {self.db_path} is opened read-only")
+        conn = self.connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute(TABLE_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(attributes)")}
+            for column, kind in [("entity_key", "TEXT"), ("value_canonical", "REAL"), ("unit_canonical", "TEXT")]:
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE attributes ADD COLUMN {column} {kind}")
+            # 回填旧数据（包括新增列之前写入的行）
+            missing = conn.execute(
+                "SELECT id, entity_name FROM attributes WHERE entity_key IS NULL AND entity_name IS NOT NULL"
+            ).fetchall()
+            conn.executemany(
+                "UPDATE attributes SET entity_key = ? WHERE id = ?",
+                [(entity_key(row["entity_name"]), row["id"]) for row in missing],
+            )
+            missing = conn.execute(
+                "SELECT id, value, unit FROM attributes "
+                "WHERE (value_canonical IS NULL AND value IS NOT NULL) OR (unit_canonical IS NULL AND unit IS NOT NULL)"
+            ).fetchall()
+            conn.executemany(
+                "UPDATE attributes SET value_canonical = ?, unit_canonical = ? WHERE id = ?",
+                [canonicalize(row["value"], row["unit"]) + (row["id"],) for row in missing],
+            )
+            for statement in INDEX_SCHEMA:
+                conn.execute(statement)
+            if not conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (UNIQUE_FACT_INDEX,)
+            ).fetchone():
+                # 先清掉旧库里因 NULL 漏掉的重复事实（保留最早的一条），再建唯一索引
+                key = ", ".join(FACT_KEY_COLUMNS)
+                conn.execute(
+                    f"DELETE FROM attributes WHERE id NOT IN (SELECT MIN(id) FROM attributes GROUP BY {key})"
+                )
+                conn.execute(
+                    f"CREATE UNIQUE INDEX {UNIQUE_FACT_INDEX} ON attributes("
+                    + ", ".join(f"ifnull({col}, '')" for col in FACT_KEY_COLUMNS) + ")"
+                )
+        self._migrated = True
+        self._columns = None
+
+    def bulk_insert(
+        self, facts: Iterable[Dict[str, Any]], batch_size: int = BULK_BATCH_SIZE
+    ) -> Tuple[int, int]:
+        """
+        流式批量写入（facts 可以是跨所有页面的生成器），整个过程一个事务
+        返回: (新增条数, 重复被忽略的条数)
+        """
+        self.migrate()
+        conn = self.connection()
+        saved = {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in BULK_PRAGMAS}
+        for name, value in BULK_PRAGMAS.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        rows = (_fact_row(f) for f in facts)
+        total = 0
+        before = conn.total_changes
+        try:
+            with conn:
+                while True:
+                    batch = list(islice(rows, batch_size))
+                    if not batch:
+                        break
+                    conn.executemany(INSERT_SQL, batch)
+                    total += len(batch)
+        finally:
+            for name, value in saved.items():
+                conn.execute(f"PRAGMA {name}={value}")
+        inserted = conn.total_changes - before
+        return inserted, total - inserted
+
+    def insert_facts(self, facts: Iterable[Dict[str, Any]]) -> int:
+        return self.bulk_insert(facts)[0]
+
+    def query_facts(
+        self,
+        field: Optional[str] = None,
+        entity_name: Optional[str] = None,
+        condition: Optional[str] = None,
+        limit: int = 5,
+    ) -> List[Dict[str, Any]]:
+        """实体名先按 entity_key 精确查找，无结果再按 LIKE 模糊匹配"""
+        conn = self.connection()
+        tail: list = []
+        if field:
+            tail.append(field)
+        if entity_name and "entity_key" in self.columns():
+            rows = conn.execute(
+                _select_sql(True, bool(field), False, bool(condition)),
+                [entity_key(entity_name)] + tail + ([f"%{condition}%"] if condition else []) + [limit],
+            ).fetchall()
+            if rows:
+                return [dict(r) for r in rows]
+        if entity_name:
+            tail.append(f"%{entity_name}%")
+        if condition:
+            tail.append(f"%{condition}%")
+        rows = conn.execute(
+            _select_sql(False, bool(field), bool(entity_name), bool(condition)), tail + [limit]
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def query_range(
+        self,
+        field: str,
+        min_value: Optional[float] = None,
+        max_value: Optional[float] = None,
+        unit: Optional[str] = None,
+        include_min: bool = True,
+        include_max: bool = True,
+        entity_name: Optional[str] = None,
+        condition: Optional[str] = None,
+        comparator: Optional[str] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """
+        数值范围查询：field 的取值落在 [min_value, max_value] 内的事实，按折算后数值从大到小
+        unit 为上下限的单位，先折算到规范单位，并只比较同一规范单位的事实（“300米”不会和 300mm 比）；
+        不给 unit 时上下限按规范单位理解（库容 万m³、时限 小时…），不限单位
+        entity_name 按 entity_key 精确匹配；comparator 只保留原文带该比较词的事实（">=" 即“不低于 X”这类阈值条款）
+        """
+        if unit:
+            min_value, canonical = canonicalize(min_value, unit)
+            max_value, _ = canonicalize(max_value, unit)
+        if "value_canonical" not in self.columns():
+            return self._range_unmigrated(
+                field, min_value, max_value, canonical if unit else None,
+                include_min, include_max, entity_name, condition, comparator, limit,
+            )
+        lower = None if min_value is None else (">=" if include_min else ">")
+        upper = None if max_value is None else ("<=" if include_max else "<")
+        params: list = [field]
+        if lower:
+            params.append(min_value)
+        if upper:
+            params.append(max_value)
+        if unit:
+            params.append(canonical)
+        if comparator:
+            params.append(comparator)
+        if entity_name:
+            params.append(entity_key(entity_name))
+        if condition:
+            params.append(f"%{condition}%")
+        sql = _range_sql(lower, upper, bool(unit), bool(comparator), bool(entity_name), bool(condition))
+        rows = self.connection().execute(sql, params + [limit]).fetchall()
+        return [dict(r) for r in rows]
+
+    def _range_unmigrated(
+        self, field, min_value, max_value, unit, include_min, include_max, entity_name, condition, comparator, limit
+    ) -> List[Dict[str, Any]]:
+        # 未迁移的旧库（只读打开）没有规范数值列：取出该字段的事实，在内存里折算、过滤、排序
+        sql = "SELECT * FROM attributes WHERE field = ? AND value IS NOT NULL"
+        params: list = [field]
+        if comparator:
+            sql += " AND comparator = ?"
+            params.append(comparator)
+        if condition:
+            sql += " AND condition LIKE ?"
+            params.append(f"%{condition}%")
+        matched = []
+        for row in self.connection().execute(sql, params):
+            value, canonical = canonicalize(row["value"], row["unit"])
+            if unit and canonical != unit:
+                continue
+            if entity_name and entity_key(row["entity_name"]) != entity_key(entity_name):
+                continue
+            if min_value is not None and (value < min_value if include_min else value <= min_value):
+                continue
+            if max_value is not None and (value > max_value if include_max else value >= max_value):
+                continue
+            matched.append(dict(row, entity_key=entity_key(row["entity_name"]),
+                                value_canonical=value, unit_canonical=canonical))
+        matched.sort(key=lambda fact: fact["value_canonical"], reverse=True)
+        return matched[:limit]
+
+    def fts_pending(self) -> bool:
+        """只读检查全文索引是否落后：从未同步、分词器版本变化或水位线之后有新事实"""
+        from src.contextual_retrieval.tokenizer import tokenizer_version
+
+        conn = self.connection()
+        try:
+            state = conn.execute("SELECT last_id, tokenizer_version FROM attributes_fts_state").fetchone()
+        except sqlite3.OperationalError:
+            return True
+        if not state or state["tokenizer_version"] != tokenizer_version():
+            return True
+        max_id = conn.execute("SELECT MAX(id) FROM attributes").fetchone()[0]
+        return (max_id or 0) > state["last_id"]
+
+    def sync_fts(self) -> int:
+        """
+        把水位线之后的新事实分词写入 attributes_fts（并累加词频），返回同步条数
+        索引已是最新时只做只读检查，不开写事务
+        """
+        from src.contextual_retrieval.tokenizer import tokenizer_version
+
+        if not self.fts_pending():
+            return 0
+        conn = self.connection()
+        with self._fts_lock, conn:
+            conn.execute(FTS_SCHEMA)
+            conn.execute(FTS_STATE_SCHEMA)
+            conn.execute(FTS_TERMS_SCHEMA)
+            state = conn.execute("SELECT last_id, doc_count, tokenizer_version FROM attributes_fts_state").fetchone()
+            last_id, doc_count = (state["last_id"], state["doc_count"]) if state else (0, 0)
+            if state and state["tokenizer_version"] != tokenizer_version():
+                # 分词规则变了，旧的切分结果与新查询对不上，整表重建
+                conn.execute("DELETE FROM attributes_fts")
+                conn.execute("DELETE FROM attributes_fts_terms")
+                last_id, doc_count = 0, 0
+            synced = 0
+            while True:
+                rows = conn.execute(
+                    f"SELECT id, {', '.join(FTS_COLUMNS)} FROM attributes WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, FTS_SYNC_BATCH),
+                ).fetchall()
+                if not rows:
+                    break
+                segmented = [tuple(_segment(row[col]) for col in FTS_COLUMNS) for row in rows]
+                conn.executemany(
+                    f"INSERT INTO attributes_fts(rowid, {', '.join(FTS_COLUMNS)}) "
+                    f"VALUES (?, {', '.join('?' for _ in FTS_COLUMNS)})",
+                    [(row["id"],) + columns for row, columns in zip(rows, segmented)],
+                )
+                doc_freq = Counter(t for columns in segmented for t in set(" ".join(columns).lower().split()))
+                conn.executemany(
+                    "INSERT INTO attributes_fts_terms (term, doc) VALUES (?, ?) "
+                    "ON CONFLICT(term) DO UPDATE SET doc = doc + excluded.doc",
+                    doc_freq.items(),
+                )
+                last_id = rows[-1]["id"]
+                synced += len(rows)
+            conn.execute(
+                "INSERT OR REPLACE INTO attributes_fts_state (id, last_id, doc_count, tokenizer_version) "
+                "VALUES (1, ?, ?, ?)",
+                (last_id, doc_count + synced, tokenizer_version()),
+            )
+        return synced
+
+    def _split_terms(self, terms: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        去掉索引里不存在的词和过于常见的词（全部都常见时保留），按文档频率分为 (稀有词, 普通词)
+        没有稀有词时全部归入普通词
+        """
+        conn = self.connection()
+        state = conn.execute("SELECT doc_count FROM attributes_fts_state").fetchone()
+        if not state:
+            return [], []
+        doc_count = state["doc_count"]
+        doc_freq = dict(conn.execute(
+            f"SELECT term, doc FROM attributes_fts_terms WHERE term IN ({', '.join('?' for _ in terms)})", terms
+        ).fetchall())
+        present = [t for t in terms if doc_freq.get(t)]
+        selective = [t for t in present if doc_freq[t] <= FTS_MAX_DF_RATIO * doc_count] or present
+        rare_df = max(FTS_RARE_DF_RATIO * doc_count, FTS_RARE_MIN_DF)
+        rare = [t for t in selective if doc_freq[t] <= rare_df]
+        return rare, [t for t in selective if t not in rare]
+
+    def _search(self, match: str, filters: List[Tuple[str, Any]], limit: int) -> List[Dict[str, Any]]:
+        weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+        sql = (
+            f"SELECT a.*, -bm25(attributes_fts, {weights}) AS score "
+            "FROM attributes_fts JOIN attributes a ON a.id = attributes_fts.rowid "
+            "WHERE attributes_fts MATCH ?"
+        )
+        for clause, _ in filters:
+            sql += f" AND {clause}"
+        sql += f" ORDER BY bm25(attributes_fts, {weights}) LIMIT ?"
+        params = [match] + [value for _, value in filters] + [limit]
+        return [dict(r) for r in self.connection().execute(sql, params).fetchall()]
+
+    def search_facts(
+        self,
+        query: str,
+        field: Optional[str] = None,
+        entity_name: Optional[str] = None,
+        condition: Optional[str] = None,
+        limit: int = 5,
+    ) -> List[Dict[str, Any]]:
+        """
+        全文检索：evidence_text 等列按 BM25 排序，可叠加结构化过滤
+        返回的事实带 score（越大越相关）
+        """
+        terms = fts_query_terms(query)
+        if not terms:
+            return []
+        if not self.readonly and self.fts_pending():
+            # 索引在构建 / 入库时同步（build_attribute_store）；这里只兜底补齐，
+            # 只读打开或正被入库进程写锁占用时直接用现有索引检索
+            try:
+                self.sync_fts()
+            except sqlite3.OperationalError:
+                pass
+        try:
+            rare, common = self._split_terms(terms)
+        except sqlite3.OperationalError:
+            # 从未建过全文索引
+            return []
+        if rare:
+            matches = ([f"({_match_expression(rare)}) AND ({_match_expression(common)})"] if common else [])
+            matches.append(_match_expression(rare))
+        elif common:
+            matches = [_match_expression(common)]
+        else:
+            return []
+
+        filters: List[Tuple[str, Any]] = []
+        if field:
+            filters.append(("a.field = ?", field))
+        if entity_name:
+            filters.append(("a.entity_name LIKE ?", f"%{entity_name}%"))
+        if condition:
+            filters.append(("a.condition LIKE ?", f"%{condition}%"))
+
+        results: List[Dict[str, Any]] = []
+        seen = set()
+        for match in matches:
+            for fact in self._search(match, filters, limit):
+                if fact["id"] not in seen:
+                    seen.add(fact["id"])
+                    results.append(fact)
+            if len(results) >= limit:
+                break
+        return results[:limit]
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+_STORES: Dict[Tuple[str, bool], AttributeStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_store(db_path: str, readonly: bool = False) -> AttributeStore:
+    """按 (路径, 是否只读) 缓存的 AttributeStore（进程内共享）"""
+    with _STORES_LOCK:
+        store = _STORES.get((db_path, readonly))
+        if store is None:
+            store = AttributeStore(db_path, readonly=readonly)
+            _STORES[(db_path, readonly)] = store
+        return store
+
 
 def init_db(db_path: str) -> None:
-    conn = sqlite3.connect(db_path)
-    try:
-        conn.execute(TABLE_SCHEMA)
-        conn.commit()
-    finally:
-        conn.close()
+    get_store(db_path).migrate()
 
 
 def insert_facts(db_path: str, facts: Iterable[Dict[str, Any]]) -> int:
-    conn = sqlite3.connect(db_path)
-    try:
-        conn.execute(TABLE_SCHEMA)
-        cur = conn.cursor()
-        count = 0
-        for f in facts:
-            cur.execute(
-                """
-                INSERT OR IGNORE INTO attributes (
-                    entity_name, field, value, value_text, unit, comparator,
-                    condition, source_doc, source_page, source_clause,
-                    evidence_text, confidence
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    f.get("entity_name"),
-                    f.get("field"),
-                    f.get("value"),
-                    f.get("value_text"),
-                    f.get("unit"),
-                    f.get("comparator"),
-                    f.get("condition"),
-                    f.get("source_doc"),
-                    f.get("source_page"),
-                    f.get("source_clause"),
-                    f.get("evidence_text"),
-                    f.get("confidence"),
-                ),
-            )
-            if cur.rowcount:
-                count += 1
-        conn.commit()
-        return count
-    finally:
-        conn.close()
+    return get_store(db_path).insert_facts(facts)
+
+
+def bulk_insert(db_path: str, facts: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+    return get_store(db_path).bulk_insert(facts)
+
+
+def search_facts(
+    db_path: str,
+    query: str,
+    field: Optional[str] = None,
+    entity_name: Optional[str] = None,
+    condition: Optional[str] = None,
+    limit: int = 5,
+) -> List[Dict[str, Any]]:
+    return get_store(db_path, readonly=True).search_facts(query, field=field, entity_name=entity_name, condition=condition, limit=limit)
+
+
+def query_range(
+    db_path: str,
+    field: str,
+    min_value: Optional[float] = None,
+    max_value: Optional[float] = None,
+    unit: Optional[str] = None,
+    include_min: bool = True,
+    include_max: bool = True,
+    entity_name: Optional[str] = None,
+    condition: Optional[str] = None,
+    comparator: Optional[str] = None,
+    limit: int = 20,
+) -> List[Dict[str, Any]]:
+    return get_store(db_path, readonly=True).query_range(
+        field, min_value=min_value, max_value=max_value, unit=unit,
+        include_min=include_min, include_max=include_max,
+        entity_name=entity_name, condition=condition, comparator=comparator, limit=limit,
+    )
 
 
 def query_facts(
@@ -75,23 +618,4 @@ def query_facts(
     condition: Optional[str] = None,
     limit: int = 5,
 ) -> List[Dict[str, Any]]:
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    try:
-        sql = "SELECT * FROM attributes WHERE 1=1"
-        params: list = []
-        if field:
-            sql += " AND field = ?"
-            params.append(field)
-        if entity_name:
-            sql += " AND entity_name LIKE ?"
-            params.append(f"%{entity_name}%")
-        if condition:
-            sql += " AND condition LIKE ?"
-            params.append(f"%{condition}%")
-        sql += " ORDER BY confidence DESC, id DESC LIMIT ?"
-        params.append(limit)
-        rows = conn.execute(sql, params).fetchall()
-        return [dict(r) for r in rows]
-    finally:
-        conn.close()
+    return get_store(db_path, readonly=True).query_facts(field=field, entity_name=entity_name, condition=condition, limit=limit)
@@ -0,0 +1,76 @@
+"""
+数值属性单位归一化
+
+入库时把同一量纲的不同写法折算到一个规范单位，数值范围查询直接在 SQL 里比较 value_canonical：
+  库容    万m³ / 亿m³ / m³ / 万方 / 亿方 / 万立方米 / 立方米 … → 万m³
+  长度    米 / m → m；雨量 毫米 / mm → mm
+  面积    km² / km2 / 平方公里 → km²
+  流量    m³/s / m3/s / 立方米每秒 / 立方米/秒 → m³/s
+  时限    小时 / h / 分钟 / min / 天 → 小时
+单位先做 NFKC 规范化（m³ → m3、km² → km2、全角转半角）再查表；不认识的单位原样保留。
+"""
+
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+# NFKC 规范化后的单位写法 → (规范单位, 换算系数)
+CANONICAL_UNITS: Dict[str, Tuple[str, float]] = {
+    # 库容
+    "万m3": ("万m³", 1.0),
+    "万方": ("万m³", 1.0),
+    "万立方米": ("万m³", 1.0),
+    "亿m3": ("万m³", 1e4),
+    "亿方": ("万m³", 1e4),
+    "亿立方米": ("万m³", 1e4),
+    "m3": ("万m³", 1e-4),
+    "立方米": ("万m³", 1e-4),
+    # 水位 / 高程 / 长度
+    "米": ("m", 1.0),
+    "m": ("m", 1.0),
+    # 雨量
+    "毫米": ("mm", 1.0),
+    "mm": ("mm", 1.0),
+    # 面积
+    "km2": ("km²", 1.0),
+    "平方公里": ("km²", 1.0),
+    "平方千米": ("km²", 1.0),
+    # 流量
+    "m3/s": ("m³/s", 1.0),
+    "立方米每秒": ("m³/s", 1.0),
+    "立方米/秒": ("m³/s", 1.0),
+    # 时限
+    "小时": ("小时", 1.0),
+    "h": ("小时", 1.0),
+    "分钟": ("小时", 1 / 60),
+    "min": ("小时", 1 / 60),
+    "天": ("小时", 24.0),
+}
+
+
+def normalize_unit_text(unit: str) -> str:
+    """单位写法规范化：NFKC（上标、全角转半角）、去空白、小写"""
+    return "".join(unicodedata.normalize("NFKC", unit).split()).lower()
+
+
+@lru_cache(maxsize=1024)
+def canonical_unit(unit: Optional[str]) -> Optional[Tuple[str, float]]:
+    """单位 → (规范单位, 换算系数)，不认识的单位返回 None"""
+    if not unit:
+        return None
+    return CANONICAL_UNITS.get(normalize_unit_text(unit))
+
+
+def canonicalize(value: Optional[float], unit: Optional[str]) -> Tuple[Optional[float], Optional[str]]:
+    """
+    折算到规范单位，返回 (value_canonical, unit_canonical)
+    不认识的单位原样返回，数值不做换算
+    """
+    found = canonical_unit(unit)
+    if found is None:
+        return value, unit
+    canonical, factor = found
+    if value is None:
+        return None, canonical
+    # 折算后按有效数字取整，避免 0.0001 × 12345 之类的二进制浮点尾差
+    return float(f"{value * factor:.12g}"), canonical
@@ -4,6 +4,7 @@ from .save_vectordb import save_chromadb
 from .entity_fusion import (
     normalize_entity,
     normalize_triplets,
+    fuse_graph,
     extract_numeric_slots,
     extract_deadline_slots,
     has_trigger_keyword,
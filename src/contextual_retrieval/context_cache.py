@@ -0,0 +1,221 @@
+"""
+CR 上下文缓存（SQLite 后端），替代整体重写的 context_cache.json
+
+  - 每条结果单独提交（WAL 模式），崩溃时只丢失尚未返回的请求
+  - 插入 O(1)；打开缓存不解析全部内容，按键索引查询
+  - 键 = chunk 哈希 + 文档指纹 + 模型名 + 模板哈希 + 切分参数(chunk_size/overlap)，
+    任一项变化都视为未命中，不会误用旧上下文
+  - 记录来源文件，文件内容变化时只淘汰该文件的旧条目
+
+命令行：
+  python -m src.contextual_retrieval.context_cache stats      <context_cache.sqlite>
+  python -m src.contextual_retrieval.context_cache invalidate <context_cache.sqlite> [--model M] [--template-hash T]
+                                                             [--chunk-config C] [--source PATH]
+                                                             （至少给一个过滤条件）
+  python -m src.contextual_retrieval.context_cache compact    <context_cache.sqlite>
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Dict, Optional
+
+CACHE_FILE_NAME = "context_cache.sqlite"
+
+# 表结构版本；与库中 user_version 不一致时丢弃旧表重建
+SCHEMA_VERSION = 2
+
+TABLE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contexts (
+    chunk_hash TEXT NOT NULL,
+    doc_hash TEXT NOT NULL,
+    model TEXT NOT NULL,
+    template_hash TEXT NOT NULL,
+    chunk_config TEXT NOT NULL,
+    source TEXT,
+    context TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (chunk_hash, doc_hash, model, template_hash, chunk_config)
+) WITHOUT ROWID;
+"""
+
+INDEX_SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_contexts_source ON contexts (source, doc_hash);
+"""
+
+
+def text_hash(text: str) -> str:
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+def chunk_config(chunk_size: int, chunk_overlap: int) -> str:
+    return f"{chunk_size}/{chunk_overlap}"
+
+
+class ContextCache:
+    """
+    绑定一次构建配置（模型 + 模板 + 切分参数）的上下文缓存视图。
+    get/put 只需 chunk 哈希与文档指纹；不同配置的条目共存于同一文件，互不命中。
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        model: str = "",
+        template: str = "",
+        chunk_size: int = 0,
+        chunk_overlap: int = 0,
+    ) -> None:
+        self._db_path = db_path
+        self.model = model
+        self.template_hash = text_hash(template)[:12]
+        self.chunk_config = chunk_config(chunk_size, chunk_overlap)
+        self._hits = 0
+        self._misses = 0
+        self._inserted = 0
+        self._evicted = 0
+
+        parent = os.path.dirname(db_path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._conn = sqlite3.connect(db_path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL：每次提交仍是原子的，断电最多回滚最后几个事务
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS contexts")
+            self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self._conn.execute(TABLE_SCHEMA)
+        self._conn.execute(INDEX_SCHEMA)
+        self._conn.commit()
+
+    # ── 读写 ──────────────────────────────────────────────────
+
+    def get(self, chunk_hash: str, doc_hash: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT context FROM contexts WHERE chunk_hash = ? AND doc_hash = ? "
+            "AND model = ? AND template_hash = ? AND chunk_config = ?",
+            (chunk_hash, doc_hash, self.model, self.template_hash, self.chunk_config),
+        ).fetchone()
+        if row is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        return row[0]
+
+    def put(self, chunk_hash: str, doc_hash: str, context: str, source: Optional[str] = None) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO contexts (chunk_hash, doc_hash, model, template_hash, "
+                "chunk_config, source, context, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (chunk_hash, doc_hash, self.model, self.template_hash, self.chunk_config,
+                 source, context, time.time()),
+            )
+        self._inserted += 1
+
+    # ── 失效 ──────────────────────────────────────────────────
+
+    def invalidate(
+        self,
+        model: Optional[str] = None,
+        template_hash: Optional[str] = None,
+        chunk_config: Optional[str] = None,
+        source: Optional[str] = None,
+        doc_hash: Optional[str] = None,
+    ) -> int:
+        """删除同时满足所有给定条件的条目（至少给一个条件），返回删除条数"""
+        filters = {
+            "model": model,
+            "template_hash": template_hash,
+            "chunk_config": chunk_config,
+            "source": source,
+            "doc_hash": doc_hash,
+        }
+        filters = {k: v for k, v in filters.items() if v is not None}
+        if not filters:
+            raise ValueError("invalidate() needs at least one filter")
+        where = " AND ".join(f"{k} = ?" for k in filters)
+        with self._conn:
+            removed = self._conn.execute(
+                f"DELETE FROM contexts WHERE {where}", list(filters.values())
+            ).rowcount
+        self._evicted += removed
+        return removed
+
+    def invalidate_stale_document(self, source: str, doc_hash: str) -> int:
+        """文件内容已变化：删除该来源下指纹不同的旧条目（所有配置）"""
+        with self._conn:
+            removed = self._conn.execute(
+                "DELETE FROM contexts WHERE source = ? AND doc_hash != ?", (source, doc_hash)
+            ).rowcount
+        self._evicted += removed
+        return removed
+
+    def compact(self) -> None:
+        """回收已删除条目占用的空间"""
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._conn.execute("VACUUM")
+
+    # ── 统计 ──────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM contexts").fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self),
+            "hits": self._hits,
+            "misses": self._misses,
+            "inserted": self._inserted,
+            "evicted": self._evicted,
+        }
+
+    def configs(self) -> Dict[tuple, int]:
+        rows = self._conn.execute(
+            "SELECT model, template_hash, chunk_config, COUNT(*) FROM contexts "
+            "GROUP BY model, template_hash, chunk_config ORDER BY model"
+        ).fetchall()
+        return {tuple(r[:3]): r[3] for r in rows}
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="CR context cache maintenance")
+    ap.add_argument("command", choices=["stats", "invalidate", "compact"])
+    ap.add_argument("db_path")
+    ap.add_argument("--model")
+    ap.add_argument("--template-hash")
+    ap.add_argument("--chunk-config", help="形如 512/20")
+    ap.add_argument("--source", help="来源文件路径（与构建时 file_path 一致）")
+    args = ap.parse_args()
+    if args.command == "invalidate" and not (args.model or args.template_hash or args.chunk_config or args.source):
+        ap.error("invalidate needs at least one of --model / --template-hash / --chunk-config / --source")
+
+    cache = ContextCache(args.db_path)
+    try:
+        if args.command == "invalidate":
+            removed = cache.invalidate(
+                model=args.model,
+                template_hash=args.template_hash,
+                chunk_config=args.chunk_config,
+                source=args.source,
+            )
+            print(f"invalidated {removed} entries")
+        elif args.command == "compact":
+            before = os.path.getsize(args.db_path)
+            cache.compact()
+            after = os.path.getsize(args.db_path)
+            print(f"{before / 1e6:.1f}MB -> {after / 1e6:.1f}MB")
+        print(f"{len(cache)} entries")
+        for (model, template_hash, config), count in cache.configs().items():
+            print(f"  model={model} template={template_hash} chunk={config}: {count}")
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+CR 上下文并发生成
+目标：把逐块串行的 llm.complete 改为有界并发的 acomplete 扇出，
+      结果顺序与输入顺序一致（与并发度、完成先后无关）
+
+配置（环境变量，可被函数参数覆盖）：
+  CONTEXT_CONCURRENCY  同时在途的请求数（建议 = Ollama 的 OLLAMA_NUM_PARALLEL）
+  CONTEXT_TIMEOUT      单个请求超时（秒）
+  CONTEXT_RETRIES      失败后重试次数（指数退避）
+  CONTEXT_BACKOFF      首次退避时间（秒），之后每次翻倍
+
+文档分组模式（groups）：同一文件的 chunk 在同一个 worker 上背靠背发送，
+文档前缀保持一致且位于 prompt 开头，便于服务端命中 KV / prompt 缓存。
+组数少于并发度时（如只有一个大文件）把最大的组对半切成连续的子组，
+每个子组仍背靠背发送，并发度不因分组而丢失。
+"""
+
+import asyncio
+import os
+import re
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 1.0
+
+
+# 中日韩字符大约 1 字 ≈ 1 token；其余文本按 4 字符 ≈ 1 token 估算
+_CJK_PATTERN = re.compile(r'[\u3000-\u303f\u4e00-\u9fff\uff00-\uffef]')
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数（无需加载 tokenizer，只用于预算与日志）"""
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def select_document_window(document: str, chunk: str, max_tokens: int) -> Tuple[int, str]:
+    """
+    文档超出预算时，返回包含该 chunk 的固定窗口 (窗口序号, 窗口文本)。
+
+    窗口按固定步长（半个窗口）切分而不是以 chunk 为中心，
+    这样落在同一窗口里的 chunk 共享完全相同的前缀，仍可命中 prompt 缓存。
+    """
+    total_tokens = estimate_tokens(document)
+    if total_tokens <= max_tokens:
+        return 0, document
+
+    window_chars = max(1, int(len(document) * max_tokens / total_tokens))
+    stride = max(1, window_chars // 2)
+    start = document.find(chunk)
+    if start < 0:
+        # 切分时空白被规整过，找不到原文位置：退回文档开头窗口
+        return 0, document[:window_chars]
+    end = start + len(chunk)
+
+    index = max(0, (end - window_chars + stride - 1) // stride)
+    while index * stride > start:
+        # chunk 比窗口还长时无法完整包含，取覆盖 chunk 开头的窗口
+        index -= 1
+    return index, document[index * stride:index * stride + window_chars]
+
+
+async def _complete_with_retry(
+    llm,
+    prompt: str,
+    semaphore: asyncio.Semaphore,
+    timeout: float,
+    max_retries: int,
+    backoff: float,
+) -> str:
+    """单个 prompt：占用一个并发槽位发请求；失败则释放槽位退避后重试"""
+    attempt = 0
+    while True:
+        try:
+            async with semaphore:
+                response = await asyncio.wait_for(llm.acomplete(prompt), timeout=timeout)
+            return response.text
+        except Exception:
+            if attempt >= max_retries:
+                raise
+            # 退避期间不占用槽位，让其他请求先跑
+            await asyncio.sleep(backoff * (2 ** attempt))
+            attempt += 1
+
+
+def split_groups(groups: Sequence[Sequence[int]], workers: int) -> List[List[int]]:
+    """
+    组数少于 workers 时反复把最大的组切成前后两半，直到组数够用或每组只剩一个 prompt
+    切成连续的两段：组内按前缀排好的顺序不变，每多切一刀只多一次前缀 prefill
+    """
+    groups = [list(g) for g in groups if g]
+    while len(groups) < workers:
+        largest = max(range(len(groups)), key=lambda i: len(groups[i]), default=None)
+        if largest is None or len(groups[largest]) < 2:
+            break
+        group = groups.pop(largest)
+        half = (len(group) + 1) // 2
+        groups[largest:largest] = [group[:half], group[half:]]
+    return groups
+
+
+async def agenerate_contexts(
+    llm,
+    prompts: Sequence[str],
+    max_concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    max_retries: Optional[int] = None,
+    backoff: Optional[float] = None,
+    on_result: Optional[Callable[[int, Optional[str]], None]] = None,
+    groups: Optional[Sequence[Sequence[int]]] = None,
+) -> List[Optional[str]]:
+    """
+    并发生成上下文，返回与 prompts 一一对应的结果列表。
+    重试耗尽仍失败的位置为 None（调用方回退到原始 chunk）。
+
+    on_result(index, text) 在每个请求完成时（按完成顺序）回调，
+    用于增量写缓存 / 打印进度；回调运行在事件循环线程内，无需加锁。
+
+    groups 为 prompts 下标的分组（通常一组 = 一个文件）：每组由一个 worker
+    按组内顺序串行处理，组与组之间并发；组数少于并发度时先用 split_groups 切分；
+    为 None 时所有 prompt 独立扇出。
+    """
+    max_concurrency = max_concurrency or _env_int("CONTEXT_CONCURRENCY", DEFAULT_CONCURRENCY)
+    timeout = timeout if timeout is not None else _env_float("CONTEXT_TIMEOUT", DEFAULT_TIMEOUT)
+    max_retries = max_retries if max_retries is not None else _env_int("CONTEXT_RETRIES", DEFAULT_RETRIES)
+    backoff = backoff if backoff is not None else _env_float("CONTEXT_BACKOFF", DEFAULT_BACKOFF)
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    results: List[Optional[str]] = [None] * len(prompts)
+
+    async def _run(index: int, prompt: str) -> None:
+        try:
+            results[index] = await _complete_with_retry(
+                llm, prompt, semaphore, timeout, max_retries, backoff
+            )
+        except Exception as e:
+            print(f"  ❌ Error generating context for job {index + 1}: {e!r}")
+        if on_result is not None:
+            on_result(index, results[index])
+
+    if groups is None:
+        await asyncio.gather(*(_run(i, p) for i, p in enumerate(prompts)))
+        return results
+
+    groups = split_groups(groups, max_concurrency)
+    queue: asyncio.Queue = asyncio.Queue()
+    for group in groups:
+        queue.put_nowait(group)
+
+    async def _worker() -> None:
+        while not queue.empty():
+            group = queue.get_nowait()
+            for i in group:
+                await _run(i, prompts[i])
+
+    await asyncio.gather(*(_worker() for _ in range(min(max_concurrency, len(groups)) or 1)))
+    return results
+
+
+def generate_contexts(
+    llm,
+    prompts: Sequence[str],
+    max_concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    max_retries: Optional[int] = None,
+    backoff: Optional[float] = None,
+    on_result: Optional[Callable[[int, Optional[str]], None]] = None,
+    groups: Optional[Sequence[Sequence[int]]] = None,
+) -> List[Optional[str]]:
+    """agenerate_contexts 的同步入口（构建脚本在事件循环外调用）"""
+    if not prompts:
+        return []
+    start = time.perf_counter()
+    results = asyncio.run(
+        agenerate_contexts(
+            llm,
+            prompts,
+            max_concurrency=max_concurrency,
+            timeout=timeout,
+            max_retries=max_retries,
+            backoff=backoff,
+            on_result=on_result,
+            groups=groups,
+        )
+    )
+    elapsed = time.perf_counter() - start
+    ok = sum(r is not None for r in results)
+    print(f"  [LLM] {ok}/{len(prompts)} contexts generated in {elapsed:.1f}s "
+          f"({len(prompts) / max(elapsed, 1e-9):.2f} chunks/s)")
+    return results
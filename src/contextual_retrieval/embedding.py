@@ -0,0 +1,243 @@
+"""
+共享嵌入模型（进程级单例 + 动态批处理）
+构建（save_chromadb / rebuild_vector_db / 知识图谱）与检索（SemanticBM25Retriever / 实验脚本）
+统一通过 get_embed_model() 获取同一个实例，模型只加载一次。
+
+环境变量：
+  EMBEDDING_MODEL    模型名（默认 BAAI/bge-small-zh-v1.5，构建与检索必须一致）
+  EMBED_DEVICE       cpu / cuda / mps
+  EMBED_BATCH_SIZE   单次前向的最大条数
+  EMBED_THREADS      CPU 推理线程数（0 = 不修改 torch 默认值）
+  EMBED_BACKEND      torch / onnx / openvino（需较新的 llama-index-embeddings-huggingface）
+  EMBED_ONNX_FILE    ONNX 后端使用的模型文件，如 onnx/model_qint8_avx512_vnni.onnx（量化版）
+  EMBED_MAX_WAIT_MS  动态批处理等待窗口：并发到达的单条请求在窗口内合并成一个 batch（0 = 关闭）
+  EMBED_CACHE_DIR    向量持久化缓存目录（空字符串 = 关闭），构建与查询路径共用
+  EMBED_CACHE_MAX_ENTRIES  缓存条目上限，超出按 LRU 淘汰
+"""
+
+import asyncio
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+from .embedding_cache import EmbeddingCache
+
+DEFAULT_EMBED_MODEL = "BAAI/bge-small-zh-v1.5"
+DEFAULT_EMBED_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db", "embedding_cache"
+)
+
+_MODELS: Dict[Tuple[str, str], BaseEmbedding] = {}
+_MODELS_LOCK = threading.Lock()
+
+
+class _DynamicBatcher:
+    """
+    后台线程把队列中的请求合并成 batch：拿到第一条后最多再等 max_wait 秒，
+    或凑满 batch_size 条就立即执行。每条请求通过 Future 取回自己的结果。
+    """
+
+    def __init__(self, fn: Callable[[List[str]], List[List[float]]], batch_size: int, max_wait: float):
+        self._fn = fn
+        self._batch_size = max(1, batch_size)
+        self._max_wait = max_wait
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="embed-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self._batch_size:
+                    batch.append(self._queue.get(timeout=self._max_wait))
+            except queue.Empty:
+                pass
+            try:
+                vectors = self._fn([text for text, _ in batch])
+                for (_, future), vector in zip(batch, vectors):
+                    future.set_result(vector)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+
+class BatchedEmbedding(BaseEmbedding):
+    """
+    包装底层嵌入模型：单条 query/text 请求走动态批处理，
+    批量接口（构建时 get_text_embedding_batch）直接透传，由 embed_batch_size 分批。
+    配置了 cache 时，所有路径先查持久化缓存，只对未命中的文本做前向。
+    """
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _cache: Optional[EmbeddingCache] = PrivateAttr(default=None)
+    _query_batcher: Optional[_DynamicBatcher] = PrivateAttr(default=None)
+    _text_batcher: Optional[_DynamicBatcher] = PrivateAttr(default=None)
+
+    def __init__(
+        self,
+        inner: BaseEmbedding,
+        max_wait_ms: float = 0.0,
+        cache: Optional[EmbeddingCache] = None,
+        **kwargs,
+    ):
+        super().__init__(
+            model_name=inner.model_name,
+            embed_batch_size=inner.embed_batch_size,
+            **kwargs,
+        )
+        self._inner = inner
+        self._cache = cache
+        if max_wait_ms > 0:
+            max_wait = max_wait_ms / 1000.0
+            self._query_batcher = _DynamicBatcher(self._embed_queries, inner.embed_batch_size, max_wait)
+            self._text_batcher = _DynamicBatcher(self._embed_texts, inner.embed_batch_size, max_wait)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "BatchedEmbedding"
+
+    @property
+    def inner(self) -> BaseEmbedding:
+        return self._inner
+
+    @property
+    def cache(self) -> Optional[EmbeddingCache]:
+        return self._cache
+
+    def _cached(
+        self, kind: str, texts: List[str], fn: Callable[[List[str]], List[List[float]]]
+    ) -> List[List[float]]:
+        """先查持久化缓存，只把未命中的文本交给 fn 做前向，结果写回缓存"""
+        if self._cache is None:
+            return fn(texts)
+        keys = [EmbeddingCache.make_key(t, kind) for t in texts]
+        vectors = self._cache.get_many(keys)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            computed = fn([texts[i] for i in missing])
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+            self._cache.put_many([keys[i] for i in missing], computed)
+        return vectors
+
+    def _forward_queries(self, queries: List[str]) -> List[List[float]]:
+        # HuggingFaceEmbedding 的 _embed 支持按 prompt_name 批量编码（bge 查询指令）
+        embed = getattr(self._inner, "_embed", None)
+        if embed is not None:
+            try:
+                return embed(list(queries), prompt_name="query")
+            except TypeError:
+                pass
+        return [self._inner._get_query_embedding(q) for q in queries]
+
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        return self._cached("query", queries, self._forward_queries)
+
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        return self._cached("text", texts, self._inner._get_text_embeddings)
+
+    def get_query_embedding_batch(self, queries: Sequence[str]) -> List[List[float]]:
+        """一次前向得到多条查询的向量（查询扩写的多路变体）"""
+        if not queries:
+            return []
+        return self._embed_queries(list(queries))
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        if self._query_batcher is None:
+            return self._embed_queries([query])[0]
+        return self._query_batcher.submit(query).result()
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        if self._query_batcher is None:
+            return (await asyncio.to_thread(self._embed_queries, [query]))[0]
+        return await asyncio.wrap_future(self._query_batcher.submit(query))
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        if self._text_batcher is None:
+            return self._embed_texts([text])[0]
+        return self._text_batcher.submit(text).result()
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        if self._text_batcher is None:
+            return (await asyncio.to_thread(self._embed_texts, [text]))[0]
+        return await asyncio.wrap_future(self._text_batcher.submit(text))
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._embed_texts(texts)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self._embed_texts, texts)
+
+
+def _set_threads() -> None:
+    threads = int(os.getenv("EMBED_THREADS", "0"))
+    if threads <= 0:
+        return
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _load_hf_model(model_name: str, device: str) -> Tuple[HuggingFaceEmbedding, str]:
+    """返回 (模型, 缓存用的模型 ID)；ID 含实际生效的后端与 ONNX 文件，不同后端 / 量化版本的向量不混用"""
+    kwargs = {
+        "model_name": model_name,
+        "device": device,
+        "embed_batch_size": int(os.getenv("EMBED_BATCH_SIZE", "32")),
+    }
+    backend = os.getenv("EMBED_BACKEND", "torch")
+    if backend != "torch":
+        kwargs["backend"] = backend
+        onnx_file = os.getenv("EMBED_ONNX_FILE")
+        if onnx_file:
+            kwargs["model_kwargs"] = {"file_name": onnx_file}
+        model_id = f"{model_name}@{backend}" + (f":{onnx_file}" if onnx_file else "")
+        try:
+            return HuggingFaceEmbedding(**kwargs), model_id
+        except TypeError:
+            # 旧版 llama-index-embeddings-huggingface 不支持 backend 参数
+            print(f"⚠️ EMBED_BACKEND={backend} 不受当前 llama-index-embeddings-huggingface 支持，回退到 torch")
+            kwargs.pop("backend", None)
+            kwargs.pop("model_kwargs", None)
+    return HuggingFaceEmbedding(**kwargs), f"{model_name}@torch"
+
+
+def get_embed_model(model_name: Optional[str] = None, device: Optional[str] = None) -> BaseEmbedding:
+    """返回进程内共享的嵌入模型（同一 model_name + device 只加载一次，线程安全）"""
+    model_name = model_name or os.getenv("EMBEDDING_MODEL", DEFAULT_EMBED_MODEL)
+    device = device or os.getenv("EMBED_DEVICE", "cpu")
+    key = (model_name, device)
+    with _MODELS_LOCK:
+        model = _MODELS.get(key)
+        if model is None:
+            _set_threads()
+            inner, model_id = _load_hf_model(model_name, device)
+            cache = None
+            cache_dir = os.getenv("EMBED_CACHE_DIR", DEFAULT_EMBED_CACHE_DIR)
+            if cache_dir:
+                cache = EmbeddingCache(
+                    cache_dir,
+                    model_id=model_id,
+                    max_entries=int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000")),
+                )
+            model = BatchedEmbedding(
+                inner,
+                max_wait_ms=float(os.getenv("EMBED_MAX_WAIT_MS", "5")),
+                cache=cache,
+            )
+            _MODELS[key] = model
+    return model
@@ -0,0 +1,223 @@
+"""
+嵌入向量持久化缓存
+文本哈希 + 模型 ID → float32 向量；未变化的语料重建时不再做任何模型前向。
+
+磁盘布局（每个模型一个子目录）：
+  vectors.f32    定长行的 float32 矩阵，np.memmap 映射，按需翻倍扩容
+  index.sqlite   key → 行号 + 最近使用时间；被淘汰的行号进入空闲表复用
+
+条目数超过 max_entries 时按最近使用时间（LRU）淘汰。
+同一目录可被多个实例 / 进程共享：写入时先取 SQLite 写锁（BEGIN IMMEDIATE），
+在锁内重新读取行数与空闲行、文件被别的实例扩容过则重新映射，行号不会重复分配。
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    row INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS free_rows (row INTEGER PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+"""
+
+_INITIAL_CAPACITY = 1024
+
+
+def _safe_dir_name(model_id: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", model_id)
+
+
+class EmbeddingCache:
+    def __init__(self, cache_dir: str, model_id: str, max_entries: int = 200_000) -> None:
+        self.model_id = model_id
+        self.max_entries = max_entries
+        self._dir = os.path.join(cache_dir, _safe_dir_name(model_id))
+        os.makedirs(self._dir, exist_ok=True)
+        self._vectors_path = os.path.join(self._dir, "vectors.f32")
+        self._lock = threading.Lock()
+        # 命中时只在内存里记录访问时间，写入/关闭时批量落盘，避免读路径写库
+        self._touched: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+        self._conn = sqlite3.connect(os.path.join(self._dir, "index.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(INDEX_SCHEMA)
+        self._conn.commit()
+
+        self._dim = self._get_meta("dim")
+        self._rows = self._get_meta("rows") or 0
+        self._vectors: Optional[np.memmap] = None
+        self._remap()
+
+    # ── 内部 ──────────────────────────────────────────────────
+
+    def _get_meta(self, name: str) -> Optional[int]:
+        row = self._conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return int(row[0]) if row else None
+
+    def _set_meta(self, name: str, value: int) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, str(value)))
+
+    def _remap(self) -> None:
+        """按当前文件大小重新映射（其他实例可能已扩容）"""
+        if self._dim is None:
+            self._dim = self._get_meta("dim")
+        if not self._dim or not os.path.exists(self._vectors_path):
+            return
+        capacity = os.path.getsize(self._vectors_path) // (4 * self._dim)
+        if self._vectors is not None and self._vectors.shape[0] == capacity:
+            return
+        if self._vectors is not None:
+            self._vectors.flush()
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+",
+                                  shape=(capacity, self._dim))
+
+    def _ensure_capacity(self, rows: int, dim: int) -> None:
+        if self._dim is None:
+            self._dim = dim
+            self._set_meta("dim", dim)
+        elif dim != self._dim:
+            raise ValueError(f"embedding dim {dim} != cached dim {self._dim} for {self.model_id}")
+        self._remap()
+        capacity = self._vectors.shape[0] if self._vectors is not None else 0
+        if rows <= capacity:
+            return
+        new_capacity = max(_INITIAL_CAPACITY, capacity)
+        while new_capacity < rows:
+            new_capacity *= 2
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(new_capacity * self._dim * 4)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+",
+                                  shape=(new_capacity, self._dim))
+
+    def _lookup_rows(self, keys: Sequence[str]) -> Dict[str, int]:
+        rows: Dict[str, int] = {}
+        unique = list(dict.fromkeys(keys))
+        # SQLite 单条语句的参数个数有限，分批查询
+        for start in range(0, len(unique), 500):
+            batch = unique[start:start + 500]
+            rows.update(self._conn.execute(
+                f"SELECT key, row FROM entries WHERE key IN ({','.join('?' * len(batch))})", batch
+            ).fetchall())
+        return rows
+
+    def _flush_touched(self) -> None:
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE entries SET last_used = ? WHERE key = ?",
+                [(ts, key) for key, ts in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self) -> None:
+        count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow <= 0:
+            return
+        victims = self._conn.execute(
+            "SELECT key, row FROM entries ORDER BY last_used LIMIT ?", (overflow,)
+        ).fetchall()
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k, _ in victims])
+        self._conn.executemany("INSERT OR IGNORE INTO free_rows (row) VALUES (?)", [(r,) for _, r in victims])
+        self.evicted += len(victims)
+
+    # ── 公开接口 ──────────────────────────────────────────────
+
+    @staticmethod
+    def make_key(text: str, kind: str = "text") -> str:
+        return kind + ":" + hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[List[float]]]:
+        results: List[Optional[List[float]]] = [None] * len(keys)
+        if not keys:
+            return results
+        with self._lock:
+            rows = self._lookup_rows(keys)
+            if rows and (self._vectors is None or max(rows.values()) >= self._vectors.shape[0]):
+                self._remap()
+            now = time.time()
+            for i, key in enumerate(keys):
+                row = rows.get(key)
+                if row is None:
+                    self.misses += 1
+                    continue
+                results[i] = self._vectors[row].tolist()
+                self._touched[key] = now
+                self.hits += 1
+        return results
+
+    def put_many(self, keys: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        if not keys:
+            return
+        with self._lock:
+            matrix = np.asarray(vectors, dtype=np.float32)
+            # 先拿写锁再分配行号：其他实例 / 进程的写入在此之前已提交，下面读到的是最新状态
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._rows = self._get_meta("rows") or 0
+                existing = self._lookup_rows(keys)
+                free = [r for (r,) in self._conn.execute(
+                    "SELECT row FROM free_rows ORDER BY row LIMIT ?", (len(keys),)
+                ).fetchall()]
+                assigned: Dict[str, int] = {}
+                for key in keys:
+                    if key in existing or key in assigned:
+                        continue
+                    if free:
+                        assigned[key] = free.pop(0)
+                    else:
+                        assigned[key] = self._rows
+                        self._rows += 1
+                self._ensure_capacity(self._rows, matrix.shape[1])
+                now = time.time()
+                for key, vector in zip(keys, matrix):
+                    row = existing.get(key, assigned.get(key))
+                    self._vectors[row] = vector
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO entries (key, row, last_used) VALUES (?, ?, ?)",
+                    [(key, row, now) for key, row in assigned.items()],
+                )
+                self._conn.executemany("DELETE FROM free_rows WHERE row = ?",
+                                       [(row,) for row in assigned.values()])
+                self._set_meta("rows", self._rows)
+                self._flush_touched()
+                self._evict()
+                # 向量先落盘再提交索引，其他实例查到行号时数据已在文件里
+                self._vectors.flush()
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses, "evicted": self.evicted}
+
+    def close(self) -> None:
+        with self._lock:
+            with self._conn:
+                self._flush_touched()
+            if self._vectors is not None:
+                self._vectors.flush()
+            self._conn.close()
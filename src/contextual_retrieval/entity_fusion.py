@@ -7,10 +7,18 @@
   - 响应级别归一（Ⅳ级 / 四级 / 4级 / IV级响应 → IV级响应）
   - 水库/闸/站命名归一（全角半角、简称、带"水库"后缀）
   - 动作/触发词归一（上报 / 报告 / 报送 → 上报）
+
+别名匹配使用 Aho-Corasick 自动机（首次调用时构建），一次扫描找出字符串中出现的全部别名；
+normalize_entity 带 LRU 缓存，图谱里反复出现的实体只计算一次。
+整图融合（fuse_graph）先收集去重实体、每个只归一化一次，再把三元组改写为整数 id 数组去重。
 """
 
 import re
-from typing import List, Tuple, Dict, Optional
+from functools import lru_cache
+from multiprocessing import Pool
+from typing import Iterable, List, Tuple, Dict, Optional
+
+import numpy as np
 
 
 # ============================================================
@@ -173,9 +181,95 @@ PATTERN_DEADLINE = re.compile(
 
 
 # ============================================================
-# 3. 核心归一化函数
+# 3. 别名自动机
 # ============================================================
 
+class AliasAutomaton:
+    """
+    Aho-Corasick 多模式匹配：一次扫描找出文本中出现的别名
+    别名按优先级编号：长度降序，同长度按词表顺序（与原先 sorted(-len) 的稳定排序一致）
+    """
+
+    def __init__(self, aliases: Dict[str, str]):
+        self.patterns = sorted(aliases, key=lambda a: -len(a))
+        self.standards = [aliases[a] for a in self.patterns]
+        # 状态 0 为根；goto[state][char] -> state，out[state] 为以该状态结尾的别名编号（含 fail 链）
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for rank, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(rank)
+        self._build_fail_links()
+
+    def _build_fail_links(self) -> None:
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def best_match(self, text: str) -> Optional[int]:
+        """文本中出现的优先级最高的别名编号；与整个文本相同的别名不算（None = 无匹配）"""
+        best = None
+        state = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for rank in out[state]:
+                if (best is None or rank < best) and len(self.patterns[rank]) != len(text):
+                    best = rank
+        return best
+
+
+_AUTOMATON: Optional[AliasAutomaton] = None
+
+
+def get_alias_automaton() -> AliasAutomaton:
+    """ALL_ALIASES 的自动机（首次调用时构建；运行期修改词表后需调用 reset_alias_cache）"""
+    global _AUTOMATON
+    if _AUTOMATON is None:
+        _AUTOMATON = AliasAutomaton(ALL_ALIASES)
+    return _AUTOMATON
+
+
+def reset_alias_cache() -> None:
+    """词表变更后重建自动机并清空归一化缓存"""
+    global _AUTOMATON
+    _AUTOMATON = None
+    normalize_entity.cache_clear()
+
+
+# ============================================================
+# 4. 核心归一化函数
+# ============================================================
+
+# 归一化缓存条目数（实体字符串 → 标准名）
+NORMALIZE_CACHE_SIZE = 65536
+
+_REPEATED_SUFFIX = [(re.compile(r'(响应){2,}'), '响应'), (re.compile(r'(转移){2,}'), '转移')]
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def normalize_entity(entity: str) -> str:
     """
     对单个实体字符串进行归一化：
@@ -195,23 +289,83 @@ def normalize_entity(entity: str) -> str:
 
     # 模糊匹配：检查是否包含别名（处理"启动Ⅳ级响应"这类带前缀的）
     # 做两轮，处理替换后新出现的别名（如"区防指办公室"→"防汛指挥部办公室"→"防汛指挥部"）
+    # 每轮取出现的最长别名（同长按词表顺序），替换其全部出现位置
+    automaton = get_alias_automaton()
     for _ in range(2):
-        for alias, standard in sorted(ALL_ALIASES.items(), key=lambda x: -len(x[0])):
-            if alias in entity and alias != entity:
-                entity = entity.replace(alias, standard)
-                break
+        rank = automaton.best_match(entity)
+        if rank is None:
+            break
+        entity = entity.replace(automaton.patterns[rank], automaton.standards[rank])
 
     # 精确匹配再查一次（两轮模糊替换后可能命中新词条）
     if entity in ALL_ALIASES:
         entity = ALL_ALIASES[entity]
 
     # 修复替换后可能出现的重复后缀（如"IV级响应响应" -> "IV级响应"）
-    entity = re.sub(r'(响应){2,}', '响应', entity)
-    entity = re.sub(r'(转移){2,}', '转移', entity)
+    for pattern, repl in _REPEATED_SUFFIX:
+        entity = pattern.sub(repl, entity)
 
     return entity
 
 
+# 去重实体少于该数量时不启用进程池（启动开销大于收益）
+_MIN_PARALLEL_ENTITIES = 5000
+
+
+def _normalize_many(entities: List[str], processes: Optional[int]) -> List[str]:
+    if processes and processes > 1 and len(entities) >= _MIN_PARALLEL_ENTITIES:
+        with Pool(processes) as pool:
+            return pool.map(normalize_entity, entities, chunksize=max(1, len(entities) // (processes * 8)))
+    return [normalize_entity(entity) for entity in entities]
+
+
+def fuse_graph(
+    triplets: Iterable[Tuple[str, str, str]],
+    processes: Optional[int] = None,
+) -> Tuple[List[Tuple[str, str, str]], Dict]:
+    """
+    整图实体融合：
+    1. 收集去重后的实体字符串，每个只归一化一次（processes > 1 时用进程池）
+    2. 建立 原始实体 → 标准实体 id 映射表，三元组改写为 (主语, 谓词, 宾语) 整数 id 数组
+    3. 按 id 行去重（保留首次出现的顺序）
+    返回: (归一化后的三元组列表, 融合统计)，统计字段与 get_fusion_stats 一致
+    """
+    raw_ids: Dict[str, int] = {}
+    pred_ids: Dict[str, int] = {}
+    rows = [
+        (raw_ids.setdefault(s, len(raw_ids)), pred_ids.setdefault(p, len(pred_ids)), raw_ids.setdefault(o, len(raw_ids)))
+        for s, p, o in triplets
+    ]
+    # 只归一化实体，不处理谓词，避免把关系名误映射为实体
+    normalized = _normalize_many(list(raw_ids), processes)
+    canonical_ids: Dict[str, int] = {}
+    raw_to_canonical = np.fromiter(
+        (canonical_ids.setdefault(name, len(canonical_ids)) for name in normalized),
+        dtype=np.int64, count=len(normalized),
+    )
+
+    fused: List[Tuple[str, str, str]] = []
+    if rows:
+        ids = np.asarray(rows, dtype=np.int64)
+        ids[:, 0] = raw_to_canonical[ids[:, 0]]
+        ids[:, 2] = raw_to_canonical[ids[:, 2]]
+        _, first = np.unique(ids, axis=0, return_index=True)
+        first.sort()
+        canonical = list(canonical_ids)
+        predicates = list(pred_ids)
+        fused = [(canonical[s], predicates[p], canonical[o]) for s, p, o in ids[first].tolist()]
+
+    stats = {
+        "original_triplets": len(rows),
+        "fused_triplets": len(fused),
+        "dedup_removed": len(rows) - len(fused),
+        "original_entities": len(raw_ids),
+        "fused_entities": len(canonical_ids),
+        "entity_reduction": len(raw_ids) - len(canonical_ids),
+    }
+    return fused, stats
+
+
 def normalize_triplets(
     triplets: List[Tuple[str, str, str]]
 ) -> List[Tuple[str, str, str]]:
@@ -220,21 +374,7 @@ def normalize_triplets(
     输入: [(subject, predicate, object), ...]
     输出: 归一化后的三元组列表（去重）
     """
-    normalized = []
-    seen = set()
-
-    for subj, pred, obj in triplets:
-        # 只归一化实体，不处理谓词，避免把关系名误映射为实体
-        n_subj = normalize_entity(subj)
-        n_pred = pred
-        n_obj = normalize_entity(obj)
-
-        key = (n_subj, n_pred, n_obj)
-        if key not in seen:
-            seen.add(key)
-            normalized.append(key)
-
-    return normalized
+    return fuse_graph(triplets)[0]
 
 
 def extract_numeric_slots(text: str) -> List[Dict]:
@@ -280,23 +420,18 @@ def has_trigger_keyword(text: str) -> bool:
 
 
 # ============================================================
-# 4. 工具函数
+# 5. 工具函数
 # ============================================================
 
+# 全角空格 + 全角字符范围（0xFF01-0xFF5E）→ 半角
+_FULL_TO_HALF = {0x3000: ' ', **{code: code - 0xFEE0 for code in range(0xFF01, 0xFF5F)}}
+
+_FILE_EXT = re.compile(r"\.(pdf|docx?|txt|md|html?)$", re.IGNORECASE)
+
+
 def _full_to_half(text: str) -> str:
     """全角字符转半角（处理中文文档中的全角数字/字母）"""
-    result = []
-    for char in text:
-        code = ord(char)
-        # 全角空格
-        if code == 0x3000:
-            result.append(' ')
-        # 全角字符范围
-        elif 0xFF01 <= code <= 0xFF5E:
-            result.append(chr(code - 0xFEE0))
-        else:
-            result.append(char)
-    return ''.join(result)
+    return text.translate(_FULL_TO_HALF)
 
 
 def _strip_path_prefix(text: str) -> str:
@@ -311,7 +446,7 @@ def _strip_path_prefix(text: str) -> str:
 
 def _strip_file_ext(text: str) -> str:
     """去除常见文件后缀"""
-    return re.sub(r"\.(pdf|docx?|txt|md|html?)$", "", text, flags=re.IGNORECASE)
+    return _FILE_EXT.sub("", text)
 
 
 def get_fusion_stats(
@@ -340,7 +475,7 @@ def get_fusion_stats(
 
 
 # ============================================================
-# 5. 测试
+# 6. 测试
 # ============================================================
 
 if __name__ == "__main__":
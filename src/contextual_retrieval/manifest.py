@@ -0,0 +1,131 @@
+"""
+增量构建清单（Ingest Manifest）
+记录 文件路径 → 内容哈希 → 节点 ID，重建时只处理新增 / 修改 / 删除的文件
+
+  - 文件大小与 mtime 都未变时直接复用上次的哈希，不重新读文件
+  - 每处理完一个文件就原子落盘（写临时文件再 os.replace），中断后可续跑
+  - 同时记录构建时的分词器版本，版本变化时即使文件未变也需要重建索引
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+MANIFEST_FILE_NAME = "ingest_manifest.json"
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class ManifestDiff:
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+
+    @property
+    def to_ingest(self) -> List[str]:
+        return self.added + self.changed
+
+    @property
+    def to_delete(self) -> List[str]:
+        return self.changed + self.removed
+
+    def summary(self) -> str:
+        return (f"新增 {len(self.added)} / 修改 {len(self.changed)} / "
+                f"删除 {len(self.removed)} / 未变 {len(self.unchanged)}")
+
+
+def collect_input_files(data_dir: str, recursive: bool = True) -> List[str]:
+    """与 SimpleDirectoryReader 默认规则一致：跳过隐藏文件/目录，按路径排序"""
+    files = []
+    for root, dirs, names in os.walk(data_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in names:
+            if not name.startswith("."):
+                files.append(os.path.join(root, name))
+        if not recursive:
+            break
+    return sorted(files)
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class IngestManifest:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._files: Dict[str, Dict] = {}
+        self.tokenizer_version = ""
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            if raw.get("version") == MANIFEST_VERSION:
+                self._files = raw.get("files", {})
+                self.tokenizer_version = raw.get("tokenizer_version", "")
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def __contains__(self, file_path: str) -> bool:
+        return file_path in self._files
+
+    def fingerprint(self, file_path: str) -> Dict:
+        stat = os.stat(file_path)
+        previous = self._files.get(file_path)
+        if previous and previous["size"] == stat.st_size and previous["mtime_ns"] == stat.st_mtime_ns:
+            content_hash = previous["hash"]
+        else:
+            content_hash = _sha256(file_path)
+        return {"hash": content_hash, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def diff(self, file_paths: List[str]) -> ManifestDiff:
+        result = ManifestDiff()
+        current = set(file_paths)
+        for file_path in file_paths:
+            previous = self._files.get(file_path)
+            if previous is None:
+                result.added.append(file_path)
+            elif self.fingerprint(file_path)["hash"] != previous["hash"]:
+                result.changed.append(file_path)
+            else:
+                result.unchanged.append(file_path)
+        result.removed = sorted(p for p in self._files if p not in current)
+        return result
+
+    def node_ids(self, file_path: str) -> List[str]:
+        entry = self._files.get(file_path)
+        return list(entry["node_ids"]) if entry else []
+
+    def all_node_ids(self) -> List[str]:
+        return [nid for entry in self._files.values() for nid in entry["node_ids"]]
+
+    def update(self, file_path: str, node_ids: List[str], fingerprint: Optional[Dict] = None) -> None:
+        entry = dict(fingerprint or self.fingerprint(file_path))
+        entry["node_ids"] = list(node_ids)
+        self._files[file_path] = entry
+
+    def remove(self, file_path: str) -> None:
+        self._files.pop(file_path, None)
+
+    def clear(self) -> None:
+        self._files = {}
+        self.tokenizer_version = ""
+
+    def save(self) -> None:
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": MANIFEST_VERSION, "tokenizer_version": self.tokenizer_version, "files": self._files},
+                f, ensure_ascii=False,
+            )
+        os.replace(tmp_path, self.path)
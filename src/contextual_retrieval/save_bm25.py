@@ -1,34 +1,32 @@
 from llama_index.retrievers.bm25 import BM25Retriever
-import Stemmer
 import os
 
+from .bm25_index import BM25Index
+
+# 中文分词（jieba 搜索引擎模式 + 领域词典），与检索端共用 tokenizer.py
+from .tokenizer import chinese_tokenizer, save_dictionary, tokenize_batch, tokenizer_version
+
+
+def save_bm25_index(nodes: list, save_pth: str) -> BM25Index:
+    """构建项目自有 BM25 索引（含节点，写入 save_pth/native_index/），供 SemanticBM25Retriever 使用"""
+    index = BM25Index.from_tokens(
+        tokenize_batch([node.get_content() for node in nodes]),
+        [node.node_id for node in nodes],
+        tokenizer_version=tokenizer_version(),
+    )
+    index.save(save_pth, nodes)
+    # 前缀词典快照：检索端启动时直接载入
+    save_dictionary(save_pth)
+    return index
+
+
 def save_BM25(nodes: list, 
               save_dir: str = "./", 
               db_name: str = "none") -> None:
     
     print("-:-:-:- BM25 [TF_IDF Database] creating ... -:-:-:-")
 
-    # Initializing BM25 with Chinese support
-    # 使用 jieba 分词，移除 stemmer（中文不需要词干提取）
-    import jieba
-
-    # 自定义分词函数
-    def chinese_tokenizer(text):
-        """增强型中文分词器，支持'包'、'包子'等词的模糊匹配"""
-        # 使用搜索引擎模式
-        tokens = list(jieba.cut_for_search(text))
-
-        # 扩展：只要包含'包'，就添加'包'和'包子'（提高召回率）
-        enhanced_tokens = []
-        for token in tokens:
-            enhanced_tokens.append(token)
-            # 只要包含'包'字，就添加相关词
-            if '包' in token:
-                enhanced_tokens.append('包')
-                enhanced_tokens.append('包子')
-
-        return enhanced_tokens
-
+    # llama-index 格式：实验脚本（scripts/phase*）仍通过 BM25Retriever.from_persist_dir 读取
     bm25_retriever = BM25Retriever.from_defaults(
         nodes=nodes,
         similarity_top_k=12,
@@ -41,5 +39,6 @@ def save_BM25(nodes: list,
 
     # Saving BM25
     bm25_retriever.persist(save_pth)
+    save_bm25_index(nodes, save_pth)
 
     print("-:-:-:- BM25 [TF_IDF Database] saved -:-:-:-")
\ No newline at end of file
@@ -3,18 +3,44 @@ from llama_index.core.node_parser import TokenTextSplitter
 from llama_index.llms.ollama import Ollama
 from .save_vectordb import save_chromadb
 from .save_bm25 import save_BM25
+from .context_generation import generate_contexts, estimate_tokens, select_document_window
+from .context_cache import ContextCache, CACHE_FILE_NAME, text_hash
 import os
-import json
-import hashlib
 from collections import defaultdict
 
+# Template referred from Anthropic Blog Post
+# Split into a document prefix and a chunk suffix: the prefix is identical for every
+# chunk of a file and comes first, so the LLM server can reuse its KV / prompt cache.
+DOCUMENT_PREFIX_TEMPLATE = """
+            <document> 
+            {WHOLE_DOCUMENT} 
+            </document> 
+"""
+CHUNK_SUFFIX_TEMPLATE = """            Here is the chunk we want to situate within the whole document 
+            <chunk> 
+            {CHUNK_CONTENT} 
+            </chunk> 
+            Please give a short succinct context to situate this chunk within the overall document for the purposes of improving search retrieval of the chunk. 
+            Answer only with the succinct context and nothing else. 
+            """
+
+# LLM context window, and the share of it reserved for the chunk suffix and the answer
+CONTEXT_WINDOW = 8192
+CONTEXT_RESERVED_TOKENS = 1024
+
+CONTEXT_MODEL = "gemma3:12b"
+
 def create_and_save_db(
         data_dir: str, 
         collection_name : str, 
         save_dir: str, 
         db_name: str = "default",
         chunk_size: int = 512, 
-        chunk_overlap: int =20
+        chunk_overlap: int =20,
+        max_concurrency: int = None,
+        request_timeout: float = None,
+        max_retries: int = None,
+        group_by_document: bool = None
         ) -> None:
 
     # Path directory to data storage 
@@ -27,16 +53,20 @@ def create_and_save_db(
     # 控制是否跳过LLM生成上下文（Windows上Ollama不一定可用）
     skip_llm = os.getenv("SKIP_CONTEXT_LLM", "0") == "1"
 
+    # 文档分组：同一文件的 chunk 背靠背发往同一 worker，命中服务端前缀缓存
+    if group_by_document is None:
+        group_by_document = os.getenv("CONTEXT_GROUP_BY_DOCUMENT", "1") == "1"
+
     llm = None
     if not skip_llm:
         # Initializing LLM for contextual retrieval
         # 支持从环境变量配置 Ollama 地址（用于连接 WSL）
         ollama_base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
         llm = Ollama(
-            model="gemma3:12b",
+            model=CONTEXT_MODEL,
             base_url=ollama_base_url,
             request_timeout=120.0,
-            context_window=8192
+            context_window=CONTEXT_WINDOW
         )
 
     # Reading documents
@@ -60,36 +90,39 @@ def create_and_save_db(
         separator=" ",
     )
 
-    # Template referred from Anthropic Blog Post
-    template = """
-            <document> 
-            {WHOLE_DOCUMENT} 
-            </document> 
-            Here is the chunk we want to situate within the whole document 
-            <chunk> 
-            {CHUNK_CONTENT} 
-            </chunk> 
-            Please give a short succinct context to situate this chunk within the overall document for the purposes of improving search retrieval of the chunk. 
-            Answer only with the succinct context and nothing else. 
-            """
+    # Token budget for the document prefix; longer files are windowed around the chunk
+    document_budget = CONTEXT_WINDOW - CONTEXT_RESERVED_TOKENS - CHUNK_SIZE
 
     # Setup Cache if LLM is active
-    context_cache = {}
-    cache_file = os.path.join(save_dir, "context_cache.json")
-    
-    if llm and os.path.exists(cache_file):
-        print(f"Loading existing context cache from {cache_file}...")
-        try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                context_cache = json.load(f)
-            print(f"Loaded {len(context_cache)} cached items.")
-        except Exception as e:
-            print(f"Error loading cache: {e}")
+    # Contexts are only reused for the same model, template and chunking parameters
+    context_cache = None
+    if llm:
+        cache_path = os.path.join(save_dir, CACHE_FILE_NAME)
+        context_cache = ContextCache(
+            cache_path,
+            model=CONTEXT_MODEL,
+            template=DOCUMENT_PREFIX_TEMPLATE + CHUNK_SUFFIX_TEMPLATE,
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+        )
+        print(f"Context cache: {cache_path} ({len(context_cache)} entries, "
+              f"model={context_cache.model} template={context_cache.template_hash} "
+              f"chunk={context_cache.chunk_config})")
+        if os.path.exists(os.path.join(save_dir, "context_cache.json")):
+            print("Note: legacy context_cache.json is no longer read (keyed by chunk text only).")
 
     all_nodes = []
     
     processed_files_count = 0
     total_files = len(docs_by_file)
+
+    # Pending LLM jobs across ALL files: (content_hash, doc_hash) -> prompt
+    pending_prompts = {}
+    pending_nodes = defaultdict(list)
+    job_sources = {}
+    # One group of job keys per file, ordered so identical prefixes are adjacent
+    pending_groups = []
+    total_prefill_saved = 0
     
     # Process each file individually
     for file_path, file_docs in docs_by_file.items():
@@ -98,45 +131,98 @@ def create_and_save_db(
         
         # Construct WHOLE DOCUMENT context from this file only
         file_content = "\n".join([d.text for d in file_docs])
+        doc_hash = text_hash(file_content)
         
         # Split this file into nodes
         file_nodes = splitter.get_nodes_from_documents(file_docs)
         print(f"File [{processed_files_count}/{total_files}]: {file_name} -> {len(file_nodes)} chunks")
         
         if llm:
-            for i, node in enumerate(file_nodes):
+            evicted = context_cache.invalidate_stale_document(file_path, doc_hash)
+            if evicted:
+                print(f"  [Cache] file changed, evicted {evicted} stale contexts")
+            cached_count = 0
+            file_jobs = []  # (window index, job key, prefix tokens)
+            for node in file_nodes:
                 content_body = node.text
-                content_hash = hashlib.md5(content_body.encode('utf-8')).hexdigest()
+                content_hash = text_hash(content_body)
                 
-                if content_hash in context_cache:
-                    node.text = context_cache[content_hash]
-                    # print(f"  [Cache] Chunk {i+1}")
+                cached_context = context_cache.get(content_hash, doc_hash)
+                if cached_context is not None:
+                    # Ensure there is a separation between context and original content
+                    node.text = cached_context + "\n\n" + content_body
+                    cached_count += 1
                 else:
-                    print(f"  [LLM] Generating context for chunk {i+1}/{len(file_nodes)}...")
-                    prompt = template.format(WHOLE_DOCUMENT=file_content, CHUNK_CONTENT=content_body)
-                    
-                    try:
-                        llm_response = llm.complete(prompt)
-                        # Ensure there is a separation between context and original content
-                        contextual_text = llm_response.text + "\n\n" + content_body 
-                        
-                        node.text = contextual_text
-                        context_cache[content_hash] = contextual_text
-                        
-                        # Save cache periodically
-                        if len(context_cache) % 10 == 0:
-                            with open(cache_file, 'w', encoding='utf-8') as f:
-                                json.dump(context_cache, f, ensure_ascii=False, indent=2)
-                                
-                    except Exception as e:
-                        print(f"  ❌ Error generating context: {e}")
+                    job_key = (content_hash, doc_hash)
+                    if job_key not in pending_prompts:
+                        window, document = select_document_window(
+                            file_content, content_body, document_budget)
+                        prefix = DOCUMENT_PREFIX_TEMPLATE.format(WHOLE_DOCUMENT=document)
+                        pending_prompts[job_key] = prefix + CHUNK_SUFFIX_TEMPLATE.format(
+                            CHUNK_CONTENT=content_body)
+                        file_jobs.append((window, job_key, estimate_tokens(prefix)))
+                        job_sources[job_key] = file_path
+                    pending_nodes[job_key].append(node)
+            print(f"  [Cache] {cached_count} hit, {len(file_nodes) - cached_count} to generate")
+
+            if file_jobs:
+                # Stable sort keeps chunk order inside a window
+                file_jobs.sort(key=lambda job: job[0])
+                pending_groups.append([job_key for _, job_key, _ in file_jobs])
+                # Every prompt after the first one sharing a prefix can skip its prefill
+                windows = {}
+                for window, _, prefix_tokens in file_jobs:
+                    windows.setdefault(window, [0, prefix_tokens])[0] += 1
+                prefill_saved = sum((count - 1) * tokens for count, tokens in windows.values())
+                total_prefill_saved += prefill_saved
+                print(f"  [Prefix] {len(file_jobs)} prompts share {len(windows)} document prefix(es), "
+                      f"~{prefill_saved} prefill tokens reusable")
         
         all_nodes.extend(file_nodes)
 
-    # Final Save Cache
-    if llm:
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            json.dump(context_cache, f, ensure_ascii=False, indent=2)
+    # Fan out context generation across chunks and files (bounded concurrency)
+    if llm and pending_prompts:
+        job_keys = [job_key for group in pending_groups for job_key in group]
+        groups = None
+        if group_by_document:
+            groups, offset = [], 0
+            for group in pending_groups:
+                groups.append(list(range(offset, offset + len(group))))
+                offset += len(group)
+        print(f"[LLM] Generating context for {len(job_keys)} chunks "
+              f"({'grouped by document' if group_by_document else 'fan-out'}, "
+              f"~{total_prefill_saved} prefill tokens reusable)...")
+        contexts = {}
+
+        def _on_result(index, context):
+            if context is None:
+                return
+            content_hash, doc_hash = job_keys[index]
+            # Committed immediately: a crash loses only in-flight requests
+            context_cache.put(content_hash, doc_hash, context, source=job_sources[job_keys[index]])
+            contexts[job_keys[index]] = context
+
+        generate_contexts(
+            llm,
+            [pending_prompts[k] for k in job_keys],
+            max_concurrency=max_concurrency,
+            timeout=request_timeout,
+            max_retries=max_retries,
+            on_result=_on_result,
+            groups=groups,
+        )
+
+        # Apply in deterministic (file, chunk) order; failed jobs keep the raw chunk
+        for job_key in job_keys:
+            if job_key in contexts:
+                for node in pending_nodes[job_key]:
+                    node.text = contexts[job_key] + "\n\n" + node.text
+
+    if context_cache is not None:
+        stats = context_cache.stats()
+        print(f"Context cache: {stats['hits']} hit / {stats['misses']} miss / "
+              f"{stats['inserted']} inserted / {stats['evicted']} evicted, {stats['entries']} entries")
+        context_cache.close()
 
     if not llm:
         print("SKIP_CONTEXT_LLM=1: Used raw chunks without context.")
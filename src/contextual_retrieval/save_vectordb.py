@@ -1,6 +1,6 @@
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.core import StorageContext
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from .embedding import get_embed_model
 from llama_index.core import VectorStoreIndex
 import chromadb
 import os
@@ -13,10 +13,7 @@ def save_chromadb(nodes: list,
     print("-:-:-:- ChromaDB [Vector Database] creating ... -:-:-:-")
 
     # Embedding Model - 使用中文模型！
-    embed_model = HuggingFaceEmbedding(
-        model_name="BAAI/bge-small-zh-v1.5",  # 中文模型
-        device="cpu"
-    )
+    embed_model = get_embed_model()
 
     # Path to save the database file
     save_pth = os.path.join(save_dir, db_name)
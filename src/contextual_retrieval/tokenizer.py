@@ -0,0 +1,186 @@
+"""
+统一中文分词（BM25 构建与查询共用）
+原先 save_bm25 / read_db / rebuild_bm25_db / 各实验脚本各有一份 chinese_tokenizer，规则不一致（有的不做“包”扩展），
+构建与查询分词不同会让 BM25 静默失配。
+
+  - chinese_tokenizer：规范分词（jieba 搜索引擎模式 + “包”扩展），使用独立的 jieba.Tokenizer 实例
+  - 领域词典：entity_fusion 的别名 / 标准名 + 水利设施名（+ TOKENIZER_USER_DICT 指向的自定义词表，每行一个词），
+    首次分词时载入，“区防汛指挥部”“杨家横水库”等不再被切碎
+  - tokenize_batch：入库时多进程分词，每个 worker 在 initializer 里载入一次词典
+  - tokenize_query：查询分词带 LRU 缓存（扩写查询、重复提问都会命中）
+  - tokenizer_version()：规则版本 + jieba 版本 + 领域词典指纹；随 BM25 索引保存，检索端加载时校验
+  - 词典快照：构建 BM25 索引时把已并入领域词的前缀词典序列化到索引目录（jieba_dict.pkl），
+    检索器初始化时直接载入，省掉 jieba 首次分词时的“Building prefix dict”与逐个 add_word
+
+环境变量（首次使用时读取，调用方先 load_dotenv 再导入也不影响）：
+  TOKENIZER_USER_DICT      额外词表路径（可选）
+  TOKENIZE_PROCESSES       入库分词进程数（默认 CPU 核数，1 = 单进程）
+  QUERY_TOKEN_CACHE_SIZE   查询分词缓存条目数
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+from functools import lru_cache
+from multiprocessing import Pool
+from typing import List, Optional, Sequence, Tuple
+
+import jieba
+
+from .entity_fusion import ALL_ALIASES
+
+# 规则有变化（扩展词、切分模式）时递增
+_RULES_VERSION = "search+bao.1"
+
+# 水利设施名（来自防洪预案语料与测试集，可用 TOKENIZER_USER_DICT 补充）
+FACILITY_NAMES: List[str] = [
+    "杨家横水库",
+    "常庄水库",
+    "古德范水库",
+    "文字岭水库",
+    "泼河水库",
+]
+
+# 小批量时进程池的启动开销大于收益
+_MIN_PARALLEL_TEXTS = 256
+
+# 前缀词典快照文件名（位于 BM25 数据库目录下）
+DICT_SNAPSHOT_NAME = "jieba_dict.pkl"
+
+
+def domain_words() -> List[str]:
+    """领域词典：别名、标准名、设施名与自定义词表，去重后排序"""
+    words = set(ALL_ALIASES) | set(ALL_ALIASES.values()) | set(FACILITY_NAMES)
+    user_dict = os.getenv("TOKENIZER_USER_DICT")
+    if user_dict and os.path.exists(user_dict):
+        with open(user_dict, encoding="utf-8") as f:
+            words.update(line.split()[0] for line in f if line.strip())
+    return sorted(words)
+
+
+_tokenizer: Optional[jieba.Tokenizer] = None
+_words: Optional[List[str]] = None
+_version: Optional[str] = None
+_query_cache = None
+_tokenizer_lock = threading.RLock()
+
+
+def dictionary_words() -> List[str]:
+    """本进程分词器使用的领域词表：首次调用时按当时的环境变量读取，之后固定不变"""
+    global _words
+    with _tokenizer_lock:
+        if _words is None:
+            _words = domain_words()
+        return _words
+
+
+def tokenizer_version() -> str:
+    """分词器版本，与 get_tokenizer 载入的是同一份词表"""
+    global _version
+    with _tokenizer_lock:
+        if _version is None:
+            digest = hashlib.md5("\n".join(dictionary_words()).encode("utf-8")).hexdigest()[:8]
+            _version = f"{_RULES_VERSION}/jieba-{jieba.__version__}/dict-{digest}"
+        return _version
+
+
+def get_tokenizer() -> jieba.Tokenizer:
+    """已载入领域词典的 jieba 实例（进程内单例）"""
+    global _tokenizer
+    with _tokenizer_lock:
+        if _tokenizer is None:
+            tokenizer = jieba.Tokenizer()
+            tokenizer.initialize()
+            for word in dictionary_words():
+                tokenizer.add_word(word)
+            _tokenizer = tokenizer
+        return _tokenizer
+
+
+def save_dictionary(directory: str) -> str:
+    """把已载入领域词典的前缀词典写入 directory/jieba_dict.pkl，返回文件路径"""
+    tokenizer = get_tokenizer()
+    path = os.path.join(directory, DICT_SNAPSHOT_NAME)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    # pickle 载入约 0.2s，jieba 自带的 marshal 缓存约 0.7s（50 万词条）
+    with open(tmp_path, "wb") as f:
+        pickle.dump((tokenizer_version(), tokenizer.FREQ, tokenizer.total), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_dictionary(directory: str) -> bool:
+    """从 directory 的词典快照初始化分词器；快照不存在或版本不符时返回 False（首次分词时按原流程构建）"""
+    global _tokenizer
+    path = os.path.join(directory, DICT_SNAPSHOT_NAME)
+    with _tokenizer_lock:
+        if _tokenizer is not None:
+            return True
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, "rb") as f:
+                version, freq, total = pickle.load(f)
+        except Exception:
+            return False
+        if version != tokenizer_version():
+            return False
+        tokenizer = jieba.Tokenizer()
+        tokenizer.FREQ, tokenizer.total = freq, total
+        tokenizer.initialized = True
+        _tokenizer = tokenizer
+        return True
+
+
+def chinese_tokenizer(text: str) -> List[str]:
+    """增强型中文分词器，支持'包'、'包子'等词的模糊匹配"""
+    tokens = []
+    for token in get_tokenizer().cut_for_search(text):
+        tokens.append(token)
+        # 只要包含'包'字，就添加相关词（提高召回率）
+        if "包" in token:
+            tokens.append("包")
+            tokens.append("包子")
+    return tokens
+
+
+def _tokenize_query(text: str) -> Tuple[str, ...]:
+    return tuple(chinese_tokenizer(text))
+
+
+def query_cache():
+    """查询分词的 LRU 缓存（首次使用时按 QUERY_TOKEN_CACHE_SIZE 创建）"""
+    global _query_cache
+    with _tokenizer_lock:
+        if _query_cache is None:
+            _query_cache = lru_cache(maxsize=int(os.getenv("QUERY_TOKEN_CACHE_SIZE") or 4096))(_tokenize_query)
+        return _query_cache
+
+
+def tokenize_query(text: str) -> List[str]:
+    """查询分词（LRU 缓存）"""
+    return list(query_cache()(text))
+
+
+def warm_start(directory: Optional[str] = None) -> bool:
+    """进程启动时调用：优先载入快照，否则立即构建词典；返回是否命中快照"""
+    loaded = bool(directory) and load_dictionary(directory)
+    tokenize_query("预热")
+    return loaded
+
+
+def _init_worker() -> None:
+    get_tokenizer()
+
+
+def tokenize_batch(texts: Sequence[str], processes: Optional[int] = None, chunksize: int = 64) -> List[List[str]]:
+    """入库批量分词；结果顺序与 texts 一致"""
+    if processes is None:
+        # .env.example 里留空（TOKENIZE_PROCESSES=""）等同于未设置
+        processes = int(os.getenv("TOKENIZE_PROCESSES") or os.cpu_count() or 1)
+    if processes <= 1 or len(texts) < _MIN_PARALLEL_TEXTS:
+        return [chinese_tokenizer(text) for text in texts]
+    with Pool(processes, initializer=_init_worker) as pool:
+        return pool.map(chinese_tokenizer, texts, chunksize=chunksize)
@@ -0,0 +1,100 @@
+"""
+混合检索分数融合（NumPy 向量化）
+
+每路检索结果是一组 (node_id, score)，融合在数组上完成，不再逐节点维护 dict：
+  raw      加权原始分数之和（与原 VECTOR_WEIGHT*vec + BM25_WEIGHT*bm 完全一致）
+  minmax   每路先 min-max 归一化到 [0, 1]，再加权求和
+  zscore   每路先做 z-score 标准化，再加权求和
+  rrf      Reciprocal Rank Fusion：sum(w / (k + rank))，只看名次不看分数
+  combmnz  min-max 归一化后的加权和 × 命中该节点的路数
+
+通过环境变量 FUSION_METHOD 选择（默认 raw），RRF 的常数 k 由 FUSION_RRF_K 配置（默认 60）。
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+FUSION_METHODS = ("raw", "minmax", "zscore", "rrf", "combmnz")
+DEFAULT_RRF_K = 60.0
+
+
+def _minmax(scores: np.ndarray) -> np.ndarray:
+    low, high = scores.min(), scores.max()
+    if high - low <= 0:
+        return np.ones_like(scores)
+    return (scores - low) / (high - low)
+
+
+def _zscore(scores: np.ndarray) -> np.ndarray:
+    std = scores.std()
+    if std <= 0:
+        return np.zeros_like(scores)
+    return (scores - scores.mean()) / std
+
+
+def _rrf(scores: np.ndarray, k: float) -> np.ndarray:
+    # 名次从 1 开始；同分按输入顺序
+    order = np.argsort(-scores, kind="stable")
+    ranks = np.empty(len(scores), dtype=np.float64)
+    ranks[order] = np.arange(1, len(scores) + 1)
+    return 1.0 / (k + ranks)
+
+
+def normalize(scores: np.ndarray, method: str, rrf_k: float = DEFAULT_RRF_K) -> np.ndarray:
+    """按融合方法变换单路分数（raw 原样返回）"""
+    scores = np.asarray(scores, dtype=np.float64)
+    if len(scores) == 0 or method == "raw":
+        return scores
+    if method in ("minmax", "combmnz"):
+        return _minmax(scores)
+    if method == "zscore":
+        return _zscore(scores)
+    if method == "rrf":
+        return _rrf(scores, rrf_k)
+    raise ValueError(f"Unknown fusion method '{method}', expected one of {FUSION_METHODS}")
+
+
+def fuse(
+    id_lists: Sequence[Sequence[str]],
+    score_lists: Sequence[Sequence[float]],
+    method: str = "raw",
+    weights: Optional[Sequence[float]] = None,
+    rrf_k: float = DEFAULT_RRF_K,
+) -> Tuple[List[str], np.ndarray]:
+    """
+    融合多路检索结果，返回按融合分数降序排列的 (node_ids, scores)。
+
+    同一路内重复出现的节点取最高分；某路未命中的节点在该路记 0 分（raw 与原合并逻辑一致）。
+    同分时保持节点首次出现的顺序（先向量、后 BM25）。
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method '{method}', expected one of {FUSION_METHODS}")
+    n_lists = len(id_lists)
+    weights = np.ones(n_lists) if weights is None else np.asarray(weights, dtype=np.float64)
+
+    # 节点 ID → 列号（按首次出现顺序编号）
+    column_of = {}
+    columns = [[column_of.setdefault(nid, len(column_of)) for nid in ids] for ids in id_lists]
+    if not column_of:
+        return [], np.zeros(0)
+
+    # 每路一行，缺失记 NaN
+    matrix = np.full((n_lists, len(column_of)), np.nan)
+    for row, (cols, scores) in enumerate(zip(columns, score_lists)):
+        if not cols:
+            continue
+        values = normalize(scores, method, rrf_k)
+        if len(set(cols)) == len(cols):
+            matrix[row, cols] = values
+        else:
+            # 同一路内的重复节点取最高分
+            np.fmax.at(matrix[row], cols, values)
+
+    fused = np.nansum(matrix * weights[:, None], axis=0)
+    if method == "combmnz":
+        fused *= np.count_nonzero(~np.isnan(matrix), axis=0)
+
+    ranking = np.argsort(-fused, kind="stable")
+    node_ids = list(column_of)
+    return [node_ids[i] for i in ranking], fused[ranking]
@@ -1,41 +1,85 @@
 from llama_index.core import VectorStoreIndex
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from src.contextual_retrieval.bm25_index import BM25Index
+from src.contextual_retrieval.embedding import get_embed_model
+from src.contextual_retrieval.manifest import MANIFEST_FILE_NAME
+from src.contextual_retrieval.tokenizer import chinese_tokenizer, tokenize_query, tokenizer_version, warm_start
+from src.db.fusion import DEFAULT_RRF_K, FUSION_METHODS, fuse
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.retrievers.bm25 import BM25Retriever
 from llama_index.core import QueryBundle
-from llama_index.core.schema import NodeWithScore
+from llama_index.core.schema import NodeWithScore, TextNode
+from llama_index.core.vector_stores.utils import legacy_metadata_dict_to_node, metadata_dict_to_node
 from llama_index.core.retrievers import BaseRetriever
+import bm25s
 import chromadb
-import Stemmer
-from typing import List
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+import asyncio
+import contextvars
+import hashlib
+import math
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 load_dotenv()
 
+# Shared pool for the CPU/IO-bound retrieval stages (Chroma query, BM25 scoring)
+_RETRIEVE_POOL = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RETRIEVE_THREADS", "8")),
+    thread_name_prefix="hybrid-retrieve",
+)
+
+# Per-stage timings of the retrieve call running in the current context (thread / asyncio task).
+# The retriever instance is shared across concurrent requests, so timings must not live on it.
+_TIMINGS: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "retrieve_timings", default=None
+)
+
+
+# Pool threads do not inherit the caller's context; stages run in a copy of it so they
+# record into the same timings dict
+def _submit(fn, *args):
+    return _RETRIEVE_POOL.submit(contextvars.copy_context().run, fn, *args)
+
+
+def _run_in_pool(fn, *args):
+    return asyncio.get_running_loop().run_in_executor(_RETRIEVE_POOL, contextvars.copy_context().run, fn, *args)
+
+
+def index_version(vector_db_path: str = None, bm25_db_path: str = None) -> str:
+    """
+    On-disk index version: a fingerprint that changes whenever a build rewrites either database.
+    BM25 files are only written by builds, so their mtimes are used; Chroma's sqlite file can be
+    touched by readers, so only entry names/sizes plus the ingest manifest mtime count there.
+    """
+    vector_db_path = vector_db_path or os.getenv("VECTOR_DB_PATH")
+    bm25_db_path = bm25_db_path or os.getenv("BM25_DB_PATH")
+    parts = []
+    for path, use_mtime in ((vector_db_path, False), (bm25_db_path, True)):
+        if not path or not os.path.isdir(path):
+            parts.append(f"{path}:missing")
+            continue
+        for entry in sorted(os.scandir(path), key=lambda e: e.name):
+            st = entry.stat()
+            size = st.st_size if entry.is_file() else 0
+            mtime = st.st_mtime_ns if (use_mtime or entry.name == MANIFEST_FILE_NAME) else 0
+            parts.append(f"{entry.name}:{size}:{mtime}")
+    return hashlib.md5("|".join(parts).encode("utf-8")).hexdigest()[:16]
 
-def chinese_tokenizer(text: str):
-    """Tokenizer consistent with save_bm25.py (jieba search mode + simple expansion)."""
-    import jieba
-    tokens = list(jieba.cut_for_search(text))
-    enhanced_tokens = []
-    for token in tokens:
-        enhanced_tokens.append(token)
-        if "包" in token:
-            enhanced_tokens.append("包")
-            enhanced_tokens.append("包子")
-    return enhanced_tokens
 
 class SemanticBM25Retriever(BaseRetriever):
     def __init__(self, collection_name: str = "default", mode: str = "OR") -> None:
 
         self._mode = mode
+        self.collection_name = collection_name
 
         # Path to database directories
         VECTOR_DB_PATH = os.getenv("VECTOR_DB_PATH")
         BM25_DB_PATH = os.getenv("BM25_DB_PATH")
 
         # Embedding Model (must match build)
-        self._embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-zh-v1.5")
+        self._embed_model = get_embed_model()
 
         # Weights / thresholds
         self._vector_weight = float(os.getenv("VECTOR_WEIGHT", "1.0"))
@@ -45,16 +89,23 @@ class SemanticBM25Retriever(BaseRetriever):
         self._merged_min_score = float(os.getenv("MERGED_MIN_SCORE", "0.0"))
         self._vector_top_k = int(os.getenv("VECTOR_TOP_K", "8"))
         self._bm25_top_k = int(os.getenv("BM25_TOP_K", "8"))
+        self._fusion_method = os.getenv("FUSION_METHOD", "raw")
+        self._rrf_k = float(os.getenv("FUSION_RRF_K", str(DEFAULT_RRF_K)))
+        if self._fusion_method not in FUSION_METHODS:
+            raise ValueError(f"FUSION_METHOD must be one of {FUSION_METHODS}, got '{self._fusion_method}'")
+
+        # Fingerprint taken before loading, so a rebuild racing the load is picked up next check
+        self.index_version = index_version(VECTOR_DB_PATH, BM25_DB_PATH)
 
         # Read stored Vector Database
         if not VECTOR_DB_PATH:
             raise ValueError("VECTOR_DB_PATH is not set")
         self._vectordb = chromadb.PersistentClient(path=VECTOR_DB_PATH)
         # Do not auto-create; fail fast if collection is missing
-        _chroma_collection = self._vectordb.get_collection(collection_name)
-        if _chroma_collection.count() == 0:
+        self._chroma_collection = self._vectordb.get_collection(collection_name)
+        if self._chroma_collection.count() == 0:
             raise ValueError(f"Chroma collection '{collection_name}' is empty")
-        self._vector_store = ChromaVectorStore(chroma_collection=_chroma_collection)
+        self._vector_store = ChromaVectorStore(chroma_collection=self._chroma_collection)
         self._index = VectorStoreIndex.from_vector_store(
             self._vector_store,
             embed_model=self._embed_model,
@@ -65,51 +116,275 @@ class SemanticBM25Retriever(BaseRetriever):
         # Read stored BM25 Database
         if not BM25_DB_PATH:
             raise ValueError("BM25_DB_PATH is not set")
-        self._bm25_retriever = BM25Retriever.from_persist_dir(BM25_DB_PATH)
-        try:
-            self._bm25_retriever._tokenizer = chinese_tokenizer
-        except Exception:
-            pass
-        try:
-            self._bm25_retriever._similarity_top_k = self._bm25_top_k
-        except Exception:
-            pass
+        # Load jieba's prefix dictionary now (from the snapshot next to the index when present)
+        # so the first query does not pay for building it
+        warm_start(BM25_DB_PATH)
+        # Project-owned memory-mapped BM25 index when the build wrote one; llama-index format otherwise
+        self._bm25_index = None
+        self._bm25_retriever = None
+        if BM25Index.exists(BM25_DB_PATH):
+            k1, b = os.getenv("BM25_K1"), os.getenv("BM25_B")
+            self._bm25_index = BM25Index.load(
+                BM25_DB_PATH,
+                k1=float(k1) if k1 else None,
+                b=float(b) if b else None,
+            )
+            if self._bm25_index.tokenizer_version != tokenizer_version():
+                raise ValueError(
+                    f"BM25 index at {BM25_DB_PATH} was built with tokenizer "
+                    f"'{self._bm25_index.tokenizer_version or 'unknown'}', current is '{tokenizer_version()}'; "
+                    "rebuild it with rebuild_bm25_db.py"
+                )
+            self._bm25_top_k = min(self._bm25_top_k, self._bm25_index.num_docs)
+        else:
+            self._bm25_retriever = BM25Retriever.from_persist_dir(BM25_DB_PATH)
+            try:
+                self._bm25_retriever._tokenizer = chinese_tokenizer
+            except Exception:
+                pass
+            # bm25s-backed BM25Retriever reads similarity_top_k; k may not exceed the corpus size
+            bm25 = getattr(self._bm25_retriever, "bm25", None)
+            if isinstance(bm25, bm25s.BM25):
+                num_docs = int(bm25.scores.get("num_docs", self._bm25_top_k))
+                self._bm25_retriever.similarity_top_k = min(self._bm25_top_k, num_docs)
+            try:
+                self._bm25_retriever._similarity_top_k = self._bm25_top_k
+            except Exception:
+                pass
 
 
-    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
-
-        # Retrieving Nodes from Database
-        vector_nodes = [
+    def _search_vector(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        start = time.perf_counter()
+        nodes = [
             n for n in self._chromadb_retriever.retrieve(query_bundle)
             if (n.score or 0.0) >= self._vector_min_score
         ]
-        bm25_nodes = [
+        self._record("vector", start)
+        return nodes
+
+    def _native_bm25(self, doc_indexes: np.ndarray, scores: np.ndarray) -> List[NodeWithScore]:
+        # Node text is read from the mapped nodes.jsonl only for the returned top-k
+        return [
+            NodeWithScore(node=self._bm25_index.node(int(idx)), score=float(score))
+            for idx, score in zip(doc_indexes, scores)
+            if float(score) >= self._bm25_min_score
+        ]
+
+    def _search_bm25(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if self._bm25_index is not None:
+            return self._search_bm25_many([query_bundle.query_str])[0]
+        start = time.perf_counter()
+        nodes = [
             n for n in self._bm25_retriever.retrieve(query_bundle)
             if (n.score or 0.0) >= self._bm25_min_score
         ]
+        self._record("bm25", start)
+        return nodes
+
+    def _embed_query(self, query_bundle: QueryBundle) -> QueryBundle:
+        start = time.perf_counter()
+        embedding = self._embed_model.get_query_embedding(query_bundle.query_str)
+        self._record("embed", start)
+        return QueryBundle(query_str=query_bundle.query_str, embedding=embedding)
+
+    def _record(self, stage: str, start: float) -> None:
+        timings = _TIMINGS.get()
+        if timings is not None:
+            timings[stage] = (time.perf_counter() - start) * 1000.0
+
+    @property
+    def last_timings(self) -> Dict[str, float]:
+        """
+        Per-stage latency (ms) of the most recent retrieve call made from the current
+        thread / asyncio task: embed / vector / bm25 / merge / total.
+        """
+        return dict(_TIMINGS.get() or {})
+
+    def _merge(self, vector_nodes: List[NodeWithScore], bm25_nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        # Fuse the two candidate lists on arrays (see src/db/fusion.py)
+        nodes = {}
+        for n in vector_nodes + bm25_nodes:
+            nodes.setdefault(n.node.node_id, n.node)
+        node_ids, scores = fuse(
+            [[n.node.node_id for n in vector_nodes], [n.node.node_id for n in bm25_nodes]],
+            [[n.score or 0.0 for n in vector_nodes], [n.score or 0.0 for n in bm25_nodes]],
+            method=self._fusion_method,
+            weights=[self._vector_weight, self._bm25_weight],
+            rrf_k=self._rrf_k,
+        )
+        # MERGED_MIN_SCORE is on the raw weighted-sum scale; other methods have their own scale
+        min_score = self._merged_min_score if self._fusion_method == "raw" else float("-inf")
+        return [
+            NodeWithScore(node=nodes[nid], score=float(score))
+            for nid, score in zip(node_ids, scores)
+            if score >= min_score
+        ]
 
-        # Merge with weighted scores
-        combined = {}
-        for n in vector_nodes:
-            nid = n.node.node_id
-            entry = combined.get(nid, {"node": n.node, "vec": 0.0, "bm": 0.0})
-            entry["vec"] = max(entry["vec"], n.score or 0.0)
-            combined[nid] = entry
-        for n in bm25_nodes:
-            nid = n.node.node_id
-            entry = combined.get(nid, {"node": n.node, "vec": 0.0, "bm": 0.0})
-            entry["bm"] = max(entry["bm"], n.score or 0.0)
-            combined[nid] = entry
-
-        merged_nodes: List[NodeWithScore] = []
-        for entry in combined.values():
-            score = self._vector_weight * entry["vec"] + self._bm25_weight * entry["bm"]
-            if score >= self._merged_min_score:
-                merged_nodes.append(NodeWithScore(node=entry["node"], score=score))
-
-        merged_nodes.sort(key=lambda n: n.score or 0.0, reverse=True)
+    def _finish(self, vector_nodes: List[NodeWithScore], bm25_nodes: List[NodeWithScore],
+                start: float) -> List[NodeWithScore]:
+        merge_start = time.perf_counter()
+        merged_nodes = self._merge(vector_nodes, bm25_nodes)
+        self._record("merge", merge_start)
+        self._record("total", start)
         return merged_nodes
 
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        # Embedding + vector search run on the pool while BM25 scores in this thread
+        start = time.perf_counter()
+        _TIMINGS.set({})
+        vector_future = _submit(lambda: self._search_vector(self._embed_query(query_bundle)))
+        bm25_nodes = self._search_bm25(query_bundle)
+        vector_nodes = vector_future.result()
+        return self._finish(vector_nodes, bm25_nodes, start)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        # Query embedding (dynamic batcher), vector search and BM25 scoring overlap;
+        # latency approaches max(embed + vector, bm25) instead of the sum.
+        start = time.perf_counter()
+        _TIMINGS.set({})
+        bm25_task = _run_in_pool(self._search_bm25, query_bundle)
+
+        embed_start = time.perf_counter()
+        embedding = await self._embed_model.aget_query_embedding(query_bundle.query_str)
+        self._record("embed", embed_start)
+        embedded = QueryBundle(query_str=query_bundle.query_str, embedding=embedding)
+        vector_nodes = await _run_in_pool(self._search_vector, embedded)
+
+        bm25_nodes = await bm25_task
+        return self._finish(vector_nodes, bm25_nodes, start)
+
+
+    # ── Batch retrieval over query rewrites ─────────────────────────
+
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        embed_batch = getattr(self._embed_model, "get_query_embedding_batch", None)
+        if embed_batch is not None:
+            embeddings = embed_batch(queries)
+        else:
+            embeddings = [self._embed_model.get_query_embedding(q) for q in queries]
+        self._record("embed", start)
+        return embeddings
+
+    def _search_vector_many(self, embeddings: List[List[float]]) -> List[List[NodeWithScore]]:
+        # One Chroma call for all variants; node/score conversion mirrors ChromaVectorStore._query
+        start = time.perf_counter()
+        results = self._chroma_collection.query(
+            query_embeddings=embeddings, n_results=self._vector_top_k
+        )
+        batches: List[List[NodeWithScore]] = []
+        for ids, texts, metadatas, distances in zip(
+            results["ids"], results["documents"], results["metadatas"], results["distances"]
+        ):
+            nodes = []
+            for node_id, text, metadata, distance in zip(ids, texts, metadatas, distances):
+                score = math.exp(-distance)
+                if score < self._vector_min_score:
+                    continue
+                try:
+                    node = metadata_dict_to_node(metadata, text=text)
+                except Exception:
+                    metadata, node_info, relationships = legacy_metadata_dict_to_node(metadata)
+                    node = TextNode(
+                        text=text or "",
+                        id_=node_id,
+                        metadata=metadata,
+                        start_char_idx=node_info.get("start", None),
+                        end_char_idx=node_info.get("end", None),
+                        relationships=relationships,
+                    )
+                nodes.append(NodeWithScore(node=node, score=score))
+            batches.append(nodes)
+        self._record("vector", start)
+        return batches
+
+    def _search_bm25_many(self, queries: List[str]) -> List[List[NodeWithScore]]:
+        start = time.perf_counter()
+        if self._bm25_index is not None:
+            # Sparse-matrix scoring of all variants in one pass (src/contextual_retrieval/bm25_index.py)
+            results = self._bm25_index.top_k_batch([tokenize_query(q) for q in queries], self._bm25_top_k)
+            batches = [self._native_bm25(indexes, scores) for indexes, scores in results]
+            self._record("bm25", start)
+            return batches
+
+        retriever = self._bm25_retriever
+        bm25 = getattr(retriever, "bm25", None)
+        if not isinstance(bm25, bm25s.BM25):
+            # Not the bm25s-backed retriever: fall back to one call per variant
+            batches = [
+                [n for n in retriever.retrieve(q) if (n.score or 0.0) >= self._bm25_min_score]
+                for q in queries
+            ]
+            self._record("bm25", start)
+            return batches
+
+        # Same tokenization as BM25Retriever._retrieve, scored in one vectorized pass
+        tokenized = bm25s.tokenize(
+            queries,
+            stemmer=retriever.stemmer if not retriever.skip_stemming else None,
+            token_pattern=retriever.token_pattern,
+            show_progress=False,
+        )
+        # corpus_weight_mask only exists on newer llama-index-retrievers-bm25 releases
+        weight_mask = getattr(retriever, "corpus_weight_mask", None)
+        indexes, scores = bm25.retrieve(
+            tokenized,
+            k=retriever.similarity_top_k,
+            show_progress=False,
+            weight_mask=np.array(weight_mask) if weight_mask else None,
+        )
+        batches = []
+        for row_indexes, row_scores in zip(indexes, scores):
+            nodes = []
+            for idx, score in zip(row_indexes, row_scores):
+                if float(score) < self._bm25_min_score:
+                    continue
+                node_dict = idx if isinstance(idx, dict) else retriever.corpus[int(idx)]
+                nodes.append(NodeWithScore(node=metadata_dict_to_node(node_dict), score=float(score)))
+            batches.append(nodes)
+        self._record("bm25", start)
+        return batches
+
+    def _fuse_variants(self, vector_batches: List[List[NodeWithScore]],
+                       bm25_batches: List[List[NodeWithScore]], start: float) -> List[NodeWithScore]:
+        # Merge each variant as in _retrieve, then dedupe across variants keeping the best score
+        merge_start = time.perf_counter()
+        best: Dict[str, NodeWithScore] = {}
+        for vector_nodes, bm25_nodes in zip(vector_batches, bm25_batches):
+            for n in self._merge(vector_nodes, bm25_nodes):
+                nid = n.node.node_id
+                if nid not in best or (n.score or 0.0) > (best[nid].score or 0.0):
+                    best[nid] = n
+        fused = sorted(best.values(), key=lambda n: n.score or 0.0, reverse=True)
+        self._record("merge", merge_start)
+        self._record("total", start)
+        return fused
+
+    def retrieve_many(self, queries: Sequence[str]) -> List[NodeWithScore]:
+        """
+        Retrieve for several query variants at once: one batched embedding call,
+        one Chroma multi-query call and one BM25 pass, fused and deduplicated.
+        """
+        queries = list(queries)
+        if not queries:
+            return []
+        start = time.perf_counter()
+        _TIMINGS.set({})
+        bm25_future = _submit(self._search_bm25_many, queries)
+        vector_batches = self._search_vector_many(self._embed_queries(queries))
+        return self._fuse_variants(vector_batches, bm25_future.result(), start)
+
+    async def aretrieve_many(self, queries: Sequence[str]) -> List[NodeWithScore]:
+        queries = list(queries)
+        if not queries:
+            return []
+        start = time.perf_counter()
+        _TIMINGS.set({})
+        bm25_task = _run_in_pool(self._search_bm25_many, queries)
+        embeddings = await _run_in_pool(self._embed_queries, queries)
+        vector_batches = await _run_in_pool(self._search_vector_many, embeddings)
+        return self._fuse_variants(vector_batches, await bm25_task, start)
+
 
 if __name__ == "__main__":
 
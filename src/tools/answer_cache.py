@@ -0,0 +1,158 @@
+"""
+语义答案缓存（synthesize 阶段）
+同一批证据下的近似问法（“杨家横水库汛限水位是多少” / “杨家横水库的汛限水位？”）直接返回上次的答案，
+不再让 gemma3:12b 重新 CompactAndRefine。
+
+命中条件（同时满足）：
+  - 检索到的节点 id 集合完全相同（证据一致，答案才可复用）
+  - 查询嵌入余弦相似度 >= ANSWER_CACHE_THRESHOLD
+
+  - 条目按 LRU 淘汰，超过 ANSWER_CACHE_TTL 秒视为过期
+  - 答案在流式输出完整结束后才写入；中途断开 / 超时的回答不缓存
+  - 单次请求可跳过查找（StartEvent use_cache=False / POST /rag-chat "use_cache": false），新答案仍会写回
+
+环境变量：
+  ANSWER_CACHE_SIZE        最大条目数（0 = 关闭）
+  ANSWER_CACHE_THRESHOLD   相似度阈值
+  ANSWER_CACHE_TTL         条目存活秒数
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import AsyncGenerator, Dict, FrozenSet, Iterable, List, Optional, Set
+
+import numpy as np
+
+
+@dataclass
+class _Entry:
+    embedding: np.ndarray
+    node_ids: FrozenSet[str]
+    answer: str
+    stored_at: float
+
+
+def _unit(embedding: Iterable[float]) -> np.ndarray:
+    vec = np.asarray(embedding, dtype=np.float32)
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm > 0 else vec
+
+
+class SemanticAnswerCache:
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        threshold: Optional[float] = None,
+        ttl: Optional[float] = None,
+    ) -> None:
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("ANSWER_CACHE_SIZE", "256"))
+        self.threshold = threshold if threshold is not None else float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        # 节点 id 集合 → 条目编号：只在证据相同的条目里比较相似度
+        self._by_nodes: Dict[FrozenSet[str], Set[int]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evicted = 0
+        self.expired = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def node_key(node_ids: Iterable[str]) -> FrozenSet[str]:
+        return frozenset(node_ids)
+
+    def _drop(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        group = self._by_nodes.get(entry.node_ids)
+        if group is not None:
+            group.discard(entry_id)
+            if not group:
+                del self._by_nodes[entry.node_ids]
+
+    def lookup(self, embedding: List[float], node_ids: Iterable[str]) -> Optional[str]:
+        """返回同证据下最相似且超过阈值的答案"""
+        if not self.enabled:
+            return None
+        key = self.node_key(node_ids)
+        query = _unit(embedding)
+        now = time.monotonic()
+        with self._lock:
+            best_id, best_sim = None, self.threshold
+            for entry_id in list(self._by_nodes.get(key, ())):
+                entry = self._entries[entry_id]
+                if now - entry.stored_at > self.ttl:
+                    self._drop(entry_id)
+                    self.expired += 1
+                    continue
+                sim = float(np.dot(query, entry.embedding))
+                if sim >= best_sim:
+                    best_id, best_sim = entry_id, sim
+            if best_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id].answer
+
+    def bypass(self) -> None:
+        with self._lock:
+            self.bypassed += 1
+
+    def store(self, embedding: List[float], node_ids: Iterable[str], answer: str) -> None:
+        if not self.enabled or not answer:
+            return
+        key = self.node_key(node_ids)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(_unit(embedding), key, answer, time.monotonic())
+            self._by_nodes.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evicted += 1
+
+    async def record(
+        self, gen: AsyncGenerator[str, None], embedding: List[float], node_ids: Iterable[str]
+    ) -> AsyncGenerator[str, None]:
+        """透传 token 流，完整结束后把拼好的答案写入缓存"""
+        node_ids = list(node_ids)
+        tokens: List[str] = []
+        try:
+            async for token in gen:
+                tokens.append(token)
+                yield token
+        finally:
+            await gen.aclose()
+        self.store(embedding, node_ids, "".join(tokens))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_nodes.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "bypassed": self.bypassed,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
+
+
+async def replay(answer: str) -> AsyncGenerator[str, None]:
+    """缓存命中时以单个 token 的流返回答案，接口与 LLM 流式输出一致"""
+    yield answer
@@ -0,0 +1,101 @@
+"""
+分阶段并发控制（检索 / LLM 生成各自限流）
+
+  - 每个阶段一个信号量，最多 max_concurrency 个请求同时执行
+  - 等待队列超过 max_queue 时直接拒绝（StageOverloaded → HTTP 503，负载削减）
+  - 排队与执行都受请求截止时间约束（DeadlineExceeded → HTTP 504）
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, Optional
+
+
+class StageOverloaded(Exception):
+    """阶段排队已满，请求被拒绝"""
+
+
+class DeadlineExceeded(Exception):
+    """请求超过截止时间"""
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """距截止时间（time.monotonic() 时间轴）的剩余秒数；None 表示不限时"""
+    if deadline is None:
+        return None
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded("deadline exceeded")
+    return left
+
+
+class StageSlot:
+    """已获得的执行名额；release() 可重复调用"""
+
+    def __init__(self, limiter: "StageLimiter") -> None:
+        self._limiter = limiter
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._limiter._release()
+
+
+class StageLimiter:
+    def __init__(self, name: str, max_concurrency: int, max_queue: int) -> None:
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def acquire(self, deadline: Optional[float] = None) -> StageSlot:
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise StageOverloaded(f"{self.name} stage overloaded ({self.waiting} waiting)")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), remaining(deadline))
+        except (asyncio.TimeoutError, DeadlineExceeded):
+            self.timed_out += 1
+            raise DeadlineExceeded(f"deadline exceeded while queued for {self.name}")
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return StageSlot(self)
+
+    def _release(self) -> None:
+        self.active -= 1
+        self.completed += 1
+        self._semaphore.release()
+
+    async def run(self, awaitable: Awaitable[Any], deadline: Optional[float] = None) -> Any:
+        """排队获得名额后执行 awaitable，执行时间同样受截止时间约束"""
+        slot = None
+        try:
+            slot = await self.acquire(deadline)
+            return await asyncio.wait_for(awaitable, remaining(deadline))
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise DeadlineExceeded(f"deadline exceeded during {self.name}")
+        finally:
+            if slot is not None:
+                slot.release()
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()  # 被拒绝时协程从未执行，关闭以免 "never awaited" 警告
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
@@ -1,8 +1,15 @@
 """
 查询路由器：A 类走属性层，B 类走 KG，C 类走段落检索
+带数值阈值 / 区间的问题（“汛限水位高于 300 米的水库”“总库容在 1000 万到 5000 万方之间”）
+解析出字段与上下限后走属性层，由 query_range 在 SQL 里按规范单位比较
 """
+import os
 import re
-from typing import Dict
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+from src.attribute_store.extract import FIELD_PATTERNS
+from src.attribute_store.store import query_range
+from src.attribute_store.units import CANONICAL_UNITS, canonical_unit, canonicalize
 from src.tools.query_intent_parser import QueryIntentParser
 
 _INTENT_PARSER = QueryIntentParser()
@@ -20,10 +27,166 @@ ATTR_KEYWORDS = [
 ]
 
 
-def route_query(query: str) -> Dict[str, str]:
+# 属性层字段名（抽取时的 field），长名优先匹配；问法里的简称映射到字段名
+RANGE_FIELDS = sorted((name for name, _ in FIELD_PATTERNS), key=len, reverse=True)
+RANGE_FIELD_ALIASES = {
+    "汛限": "汛限水位",
+    "库容": "总库容",
+    "面积": "流域面积",
+    "日降雨量": "降雨量",
+    "雨量": "降雨量",
+    "泄量": "最大泄量",
+}
+
+# 数值 + 单位（问句先做 NFKC，m³ → m3、全角数字转半角，单位与 units.CANONICAL_UNITS 的键一致）
+# 单位可以省略，或只写数量级“万 / 亿”（“库容超过1亿”“1000万到5000万方”）
+_UNITS = "|".join(re.escape(u) for u in sorted(CANONICAL_UNITS, key=len, reverse=True))
+_NUM = r"(\d+(?:\.\d+)?)\s*(" + _UNITS + r"|万|亿)?"
+# 区间：X 到 Y / X 至 Y / X~Y / 介于 X 和 Y 之间
+RANGE_BETWEEN_PATTERN = re.compile(
+    _NUM + r"\s*(?:到|至|~|-|—)\s*" + _NUM
+    + r"|介于\s*" + _NUM + r"\s*(?:和|与|到|至)\s*" + _NUM
+)
+# 比较词在前：(比较词, 是否为下限, 是否含等号)，“不超过”须先于“超过”匹配
+RANGE_OPERATORS = {
+    "不低于": (True, True), "不少于": (True, True), "不小于": (True, True),
+    "至少": (True, True), "达到": (True, True),
+    "高于": (True, False), "超过": (True, False), "大于": (True, False), "多于": (True, False),
+    "不超过": (False, True), "不高于": (False, True), "不大于": (False, True),
+    "至多": (False, True), "最多": (False, True),
+    "低于": (False, False), "小于": (False, False), "少于": (False, False), "不足": (False, False),
+}
+RANGE_PREFIX_PATTERN = re.compile(
+    "(" + "|".join(sorted(RANGE_OPERATORS, key=len, reverse=True)) + r")\s*" + _NUM
+)
+# 比较词在后：300米以上 / 50mm以下 / 2小时以内
+RANGE_SUFFIX_PATTERN = re.compile(_NUM + r"\s*(及以上|以上|及以下|以下|以内)")
+
+# 只写数量级时的倍数，以及这些字段数量级所乘的基本单位（库容的规范单位 万m³ 本身带数量级）；
+# 其他字段的规范单位不带数量级，数值乘上倍数即可
+_MAGNITUDES = {"万": 1e4, "亿": 1e8}
+MAGNITUDE_BASE_UNITS = {"库容": "m3"}
+
+# 数值之后同一分句里出现“…时”是条件句（“超过50毫米时启动几级响应”“超过X时如何处置”），
+# 问的不是哪些设施满足阈值；“小时”“时间”“时限”不算
+_PROCESS_CLAUSE = re.compile(r"\d[^，。,；;？?]*(?<!小)时(?![间限段刻])")
+
+
+def _field_units() -> Dict[str, str]:
+    """字段 → 规范单位：取字段正则里全部分支都能折算到同一规范单位的那组单位"""
+    units: Dict[str, str] = {}
+    for name, pat in FIELD_PATTERNS:
+        for group in re.findall(r"\(([^()]*)\)", pat.pattern):
+            found = [canonical_unit(u) for u in group.split("|")]
+            canonical = {f[0] for f in found if f}
+            if len(canonical) == 1 and all(found):
+                units[name] = canonical.pop()
+                break
+    return units
+
+
+FIELD_UNITS = _field_units()
+
+
+def _range_field(query: str) -> Optional[str]:
+    for name in RANGE_FIELDS:
+        if name in query:
+            return name
+    for alias in sorted(RANGE_FIELD_ALIASES, key=len, reverse=True):
+        if alias in query:
+            return RANGE_FIELD_ALIASES[alias]
+    return None
+
+
+def _bound(field: str, number: str, unit: Optional[str]) -> Tuple[float, Optional[str]]:
+    """一个上 / 下限折算到规范单位，返回 (数值, 规范单位)；没有单位时数值按规范单位理解，单位为 None"""
+    value = float(number)
+    if unit in _MAGNITUDES:
+        value *= _MAGNITUDES[unit]
+        unit = next((base for kw, base in MAGNITUDE_BASE_UNITS.items() if kw in field), None)
+        if unit is None:
+            return value, None
+    if not unit:
+        return value, None
+    return canonicalize(value, unit)
+
+
+def _unit_matches(field: str, unit: Optional[str]) -> bool:
+    return unit is None or FIELD_UNITS.get(field, unit) == unit
+
+
+def _set_bound(cond: Dict[str, Any], is_lower: bool, inclusive: bool, value: float, unit: Optional[str]) -> None:
+    if not _unit_matches(cond["field"], unit):
+        return
+    bound = "min" if is_lower else "max"
+    cond[f"{bound}_value"] = value
+    cond[f"include_{bound}"] = inclusive
+    cond["unit"] = cond["unit"] or unit
+
+
+def extract_range_condition(query: str) -> Optional[Dict[str, Any]]:
+    """
+    从问句解析数值范围条件，返回 query_range 的参数：
+      field / min_value / max_value / unit / include_min / include_max
+    上下限已折算到规范单位（unit 为规范单位；问句没写单位时为 None，数值按规范单位理解）
+    单位与字段的规范单位不符的数值不属于该字段（“水位达到298米时的库容”），不作为上下限
+    没有字段或没有数值上下限时返回 None
+    """
+    text = unicodedata.normalize("NFKC", query)
+    field = _range_field(text)
+    if not field:
+        return None
+    cond: Dict[str, Any] = {
+        "field": field, "min_value": None, "max_value": None,
+        "unit": None, "include_min": True, "include_max": True,
+    }
+    m = RANGE_BETWEEN_PATTERN.search(text)
+    if m:
+        groups = m.groups()
+        low, low_unit, high, high_unit = groups[:4] if groups[0] else groups[4:]
+        # 只有一端写了单位时两端共用（数量级“万 / 亿”只属于写它的一端）
+        if not low_unit and high_unit not in _MAGNITUDES:
+            low_unit = high_unit
+        if not high_unit and low_unit not in _MAGNITUDES:
+            high_unit = low_unit
+        # 两端单位可能不同（“5000万到1亿方”），各自折算到规范单位
+        low_value, unit = _bound(field, low, low_unit)
+        high_value, high_canonical = _bound(field, high, high_unit)
+        if not _unit_matches(field, unit) or not _unit_matches(field, high_canonical):
+            return None
+        low_value, high_value = sorted([low_value, high_value])
+        cond.update(min_value=low_value, max_value=high_value, unit=unit or high_canonical)
+        return cond
+    for m in RANGE_PREFIX_PATTERN.finditer(text):
+        is_lower, inclusive = RANGE_OPERATORS[m.group(1)]
+        _set_bound(cond, is_lower, inclusive, *_bound(field, m.group(2), m.group(3)))
+    for m in RANGE_SUFFIX_PATTERN.finditer(text):
+        _set_bound(cond, m.group(3).endswith("以上"), True, *_bound(field, m.group(1), m.group(2)))
+    if cond["min_value"] is None and cond["max_value"] is None:
+        return None
+    return cond
+
+
+def answer_range_query(query: str, db_path: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    """数值阈值 / 区间问题直接查属性层，返回命中的事实（按折算后数值从大到小）"""
+    cond = extract_range_condition(query)
+    if cond is None:
+        return []
+    db_path = db_path or os.getenv("ATTRIBUTE_DB", "./src/db/attribute_store.sqlite")
+    return query_range(db_path, limit=limit, **cond)
+
+
+def route_query(query: str) -> Dict[str, Any]:
     intent = _INTENT_PARSER.parse(query)
     qtype = intent.get("query_type")
 
+    # 数值阈值 / 区间（“哪些水库汛限水位高于300米”）走属性层范围查询；
+    # C 类与“超过 X 时…”条件句不按范围回答，照常按意图路由
+    if qtype != "C" and not _PROCESS_CLAUSE.search(query):
+        cond = extract_range_condition(query)
+        if cond:
+            return {"route": "attribute", "reason": "数值范围", "range": cond}
+
     # 强制 A 类走属性层
     if qtype == "A":
         return {"route": "attribute", "reason": "A-数值属性"}
@@ -1,4 +1,4 @@
-import os
+import asyncio
 from llama_index.core.response_synthesizers import CompactAndRefine
 from llama_index.core.workflow import (
     Context,
@@ -11,8 +11,11 @@ from llama_index.core.workflow import (
 from llama_index.core import PromptTemplate
 from llama_index.core.workflow import Event
 from llama_index.core.schema import NodeWithScore
-from llama_index.llms.ollama import Ollama
-from src.db.read_db import SemanticBM25Retriever
+from llama_index.core.base.response.schema import AsyncStreamingResponse
+from typing import AsyncGenerator, Optional
+from src.tools.answer_cache import replay
+from src.tools.limits import StageLimiter, StageSlot, remaining
+from src.tools.resources import get_registry
 from src.tools.query_intent_parser import QueryIntentParser, format_intent_summary
 
 # 全局 intent parser（单例复用）
@@ -35,9 +38,35 @@ template = (
 
 qa_template = PromptTemplate(template)
 
+async def _release_after(gen: AsyncGenerator[str, None], slot: StageSlot,
+                         deadline: Optional[float]) -> AsyncGenerator[str, None]:
+    """流式输出结束（或被中断）时归还 LLM 名额；截止时间同样约束每个 token 的等待"""
+    try:
+        while True:
+            try:
+                token = await asyncio.wait_for(gen.__anext__(), remaining(deadline))
+            except StopAsyncIteration:
+                break
+            yield token
+    finally:
+        slot.release()
+        await gen.aclose()
+
+
 # RAG using workflow
 class RAGWorkflow(Workflow):
 
+    def __init__(
+        self,
+        retrieval_limiter: Optional[StageLimiter] = None,
+        llm_limiter: Optional[StageLimiter] = None,
+        **kwargs,
+    ) -> None:
+        # 限流器由服务层传入（src/tools/server.py）；脚本直接使用时不限流
+        super().__init__(**kwargs)
+        self._retrieval_limiter = retrieval_limiter
+        self._llm_limiter = llm_limiter
+
     @step
     async def ingest(self, ctx: Context, ev: StartEvent) -> StopEvent | None:
 
@@ -45,7 +74,8 @@ class RAGWorkflow(Workflow):
         if not collection_name:
             return None
 
-        retriever = SemanticBM25Retriever(collection_name=collection_name)
+        # 常驻检索器：同一集合只加载一次，索引重建后自动热更新
+        retriever = get_registry().retriever(collection_name)
 
         return StopEvent(result=retriever)
 
@@ -69,27 +99,37 @@ class RAGWorkflow(Workflow):
               f"属性={intent['attribute'] or intent['action_type'] or '-'}")
         print(f"[扩写查询] {rewritten_queries}")
 
+        deadline = ev.get("deadline")
         await ctx.set("query", query)
         await ctx.set("intent", intent)
+        await ctx.set("deadline", deadline)
+        await ctx.set("use_cache", ev.get("use_cache", True))
 
         if retriever is None:
             print("Index is empty, load some documents before querying!")
             return None
 
-        # ── 多路检索（原始查询 + 扩写查询，合并去重） ────────
-        seen_ids: set = set()
-        merged_nodes: list[NodeWithScore] = []
-
-        for rq in rewritten_queries:
-            nodes = await retriever.aretrieve(rq)
-            for node in nodes:
-                node_id = node.node.node_id
-                if node_id not in seen_ids:
-                    seen_ids.add(node_id)
-                    merged_nodes.append(node)
+        # ── 检索结果缓存（归一化查询 + 索引版本） ────────
+        cache = get_registry().result_cache
+        cache_key = cache.key(
+            getattr(retriever, "collection_name", ""),
+            getattr(retriever, "index_version", ""),
+            query,
+        )
+        merged_nodes = cache.get(cache_key)
+        if merged_nodes is not None:
+            print(f"[检索缓存] 命中，{len(merged_nodes)} 个节点")
+            return RetrieverEvent(nodes=merged_nodes)
+
+        # ── 多路检索（原始查询 + 扩写查询，一次批量检索后合并去重） ────────
+        if self._retrieval_limiter is not None:
+            merged_nodes = await self._retrieval_limiter.run(
+                retriever.aretrieve_many(rewritten_queries), deadline
+            )
+        else:
+            merged_nodes = await retriever.aretrieve_many(rewritten_queries)
+        cache.put(cache_key, merged_nodes)
 
-        # 按得分降序排列
-        merged_nodes.sort(key=lambda n: n.score or 0.0, reverse=True)
         print(f"[检索合并] {len(merged_nodes)} 个去重节点（来自 {len(rewritten_queries)} 路查询）")
 
         return RetrieverEvent(nodes=merged_nodes)
@@ -97,16 +137,49 @@ class RAGWorkflow(Workflow):
     @step
     async def synthesize(self, ctx: Context, ev: RetrieverEvent) -> StopEvent:
 
-        ollama_base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-        llm = Ollama(
-            model="gemma3:12b",
-            base_url=ollama_base_url,
-            request_timeout=120.0
-        )
-        summarizer = CompactAndRefine(llm=llm, streaming=True, verbose=True, text_qa_template=qa_template)
+        registry = get_registry()
         query = await ctx.get("query", default=None)
-
-        response = await summarizer.asynthesize(query, nodes=ev.nodes)
+        deadline = await ctx.get("deadline", default=None)
+
+        # ── 语义答案缓存（证据节点集合相同 + 查询嵌入相似） ────────
+        cache = registry.answer_cache
+        node_ids = [n.node.node_id for n in ev.nodes]
+        embedding = None
+        if cache.enabled:
+            embedding = await registry.embed_model().aget_query_embedding(query)
+            if await ctx.get("use_cache", default=True):
+                answer = cache.lookup(embedding, node_ids)
+                if answer is not None:
+                    print(f"[答案缓存] 命中（{len(node_ids)} 个证据节点）")
+                    return StopEvent(result=AsyncStreamingResponse(
+                        response_gen=replay(answer), source_nodes=ev.nodes
+                    ))
+            else:
+                cache.bypass()
+
+        summarizer = CompactAndRefine(llm=registry.llm(), streaming=True, verbose=True, text_qa_template=qa_template)
+
+        if self._llm_limiter is None:
+            response = await summarizer.asynthesize(query, nodes=ev.nodes)
+            if embedding is not None and hasattr(response, "response_gen"):
+                response.response_gen = cache.record(response.response_gen, embedding, node_ids)
+            return StopEvent(result=response)
+
+        # LLM 名额一直占用到流式输出结束
+        slot = await self._llm_limiter.acquire(deadline)
+        try:
+            response = await asyncio.wait_for(
+                summarizer.asynthesize(query, nodes=ev.nodes), remaining(deadline)
+            )
+        except BaseException:
+            slot.release()
+            raise
+        if hasattr(response, "response_gen"):
+            gen = response.response_gen
+            if embedding is not None:
+                gen = cache.record(gen, embedding, node_ids)
+            response.response_gen = _release_after(gen, slot, deadline)
+        else:
+            slot.release()
 
         return StopEvent(result=response)
-
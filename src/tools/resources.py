@@ -0,0 +1,140 @@
+"""
+常驻资源注册表
+进程内只加载一次：每个集合的 SemanticBM25Retriever、共享嵌入模型、Ollama 客户端。
+RAGWorkflow 每次运行都从这里取，不再逐请求重开 Chroma / 重载 BM25 / 重建 LLM 客户端。
+
+  - 热更新：取检索器时（最多每 RESOURCE_RELOAD_INTERVAL 秒一次）比对磁盘 index_version，
+    变化则由发现变化的那个请求加载新实例后替换；其余请求在此期间继续使用旧实例
+  - 检索结果缓存：result_cache（见 result_cache.py），热更新时清掉对应集合的条目
+  - 语义答案缓存：answer_cache（见 answer_cache.py），热更新时整体清空
+  - 预热：warm_up() 在进程启动时加载检索器并跑一次查询嵌入，可选地让 Ollama 预先载入模型
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.llms import LLM
+from llama_index.llms.ollama import Ollama
+
+from src.contextual_retrieval.embedding import get_embed_model
+from src.db.read_db import SemanticBM25Retriever, index_version
+from src.tools.answer_cache import SemanticAnswerCache
+from src.tools.result_cache import QueryResultCache
+
+DEFAULT_LLM_MODEL = "gemma3:12b"
+
+
+class ResourceRegistry:
+    def __init__(self, reload_interval: Optional[float] = None) -> None:
+        self.reload_interval = (
+            reload_interval if reload_interval is not None
+            else float(os.getenv("RESOURCE_RELOAD_INTERVAL", "5"))
+        )
+        self._lock = threading.Lock()
+        # 每个集合一把锁：同一集合只加载一次，不同集合互不阻塞
+        self._collection_locks: Dict[str, threading.Lock] = {}
+        self._retrievers: Dict[str, SemanticBM25Retriever] = {}
+        self._last_check: Dict[str, float] = {}
+        self._pinned: Set[str] = set()
+        self._llm: Optional[LLM] = None
+        self.result_cache = QueryResultCache()
+        self.answer_cache = SemanticAnswerCache()
+        self.reloads = 0
+
+    def _collection_lock(self, collection_name: str) -> threading.Lock:
+        with self._lock:
+            return self._collection_locks.setdefault(collection_name, threading.Lock())
+
+    def embed_model(self) -> BaseEmbedding:
+        return get_embed_model()
+
+    def llm(self) -> LLM:
+        with self._lock:
+            if self._llm is None:
+                self._llm = Ollama(
+                    model=os.getenv("LLM_MODEL", DEFAULT_LLM_MODEL),
+                    base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"),
+                    request_timeout=float(os.getenv("RAG_LLM_TIMEOUT", "120")),
+                )
+            return self._llm
+
+    def _is_stale(self, collection_name: str, retriever: SemanticBM25Retriever) -> bool:
+        now = time.monotonic()
+        if now - self._last_check.get(collection_name, 0.0) < self.reload_interval:
+            return False
+        self._last_check[collection_name] = now
+        return index_version() != retriever.index_version
+
+    def retriever(self, collection_name: str) -> SemanticBM25Retriever:
+        """返回集合的常驻检索器；磁盘索引重建后自动换成新实例"""
+        retriever = self._retrievers.get(collection_name)
+        if retriever is not None and (
+            collection_name in self._pinned or not self._is_stale(collection_name, retriever)
+        ):
+            return retriever
+
+        with self._collection_lock(collection_name):
+            current = self._retrievers.get(collection_name)
+            if current is not None and current is not retriever:
+                return current  # 其他线程刚完成加载
+            if current is not None:
+                print(f"[资源] 集合 {collection_name} 索引已变化，重新加载检索器")
+                self.reloads += 1
+                self.result_cache.invalidate(collection_name)
+                self.answer_cache.clear()
+            loaded = SemanticBM25Retriever(collection_name=collection_name)
+            self._retrievers[collection_name] = loaded
+            self._last_check[collection_name] = time.monotonic()
+            return loaded
+
+    def register(self, collection_name: str, retriever) -> None:
+        """注入现成的检索器（压测 / 调试用），不参与索引版本检查"""
+        with self._collection_lock(collection_name):
+            self._retrievers[collection_name] = retriever
+            self._pinned.add(collection_name)
+
+    def set_llm(self, llm: LLM) -> None:
+        with self._lock:
+            self._llm = llm
+
+    def reload(self, collection_name: str) -> SemanticBM25Retriever:
+        """强制重新加载（例如重建脚本结束后主动通知）"""
+        with self._collection_lock(collection_name):
+            self._retrievers.pop(collection_name, None)
+            self._pinned.discard(collection_name)
+        self.result_cache.invalidate(collection_name)
+        self.answer_cache.clear()
+        return self.retriever(collection_name)
+
+    def warm_up(self, collection_names: Iterable[str], ping_llm: bool = False) -> Dict[str, float]:
+        """进程启动时调用：加载检索器、预热嵌入模型，返回各项耗时（秒）"""
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+        self.embed_model().get_query_embedding("预热")
+        timings["embed_model"] = time.perf_counter() - start
+        for name in collection_names:
+            start = time.perf_counter()
+            self.retriever(name).retrieve("预热")
+            timings[f"retriever:{name}"] = time.perf_counter() - start
+        if ping_llm:
+            # 让 Ollama 把模型载入显存，首个真实请求不再承担加载耗时
+            start = time.perf_counter()
+            self.llm().complete("你好")
+            timings["llm"] = time.perf_counter() - start
+        return timings
+
+
+_REGISTRY: Optional[ResourceRegistry] = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_registry() -> ResourceRegistry:
+    """进程级单例"""
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            _REGISTRY = ResourceRegistry()
+        return _REGISTRY
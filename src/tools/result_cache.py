@@ -0,0 +1,111 @@
+"""
+检索结果缓存（LRU + TTL）
+汛期值班人员会反复问同一批问题，命中时直接返回上次的合并节点，跳过嵌入、Chroma 与 BM25。
+
+缓存键 = (集合名, index_version, 归一化查询)：
+  - 归一化：全角转半角、去空白与标点（数字间的 . 和 : 保留）、entity_fusion 别名替换（防指 / 区防汛指挥部 → 防汛指挥部），
+    同义问法命中同一条目
+  - index_version 随磁盘索引变化，重建后旧条目自然失效；ResourceRegistry 热更新时还会主动清掉该集合
+
+环境变量：
+  QUERY_CACHE_SIZE   最大条目数（0 = 关闭）
+  QUERY_CACHE_TTL    条目存活秒数
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from llama_index.core.schema import NodeWithScore
+
+from src.contextual_retrieval.entity_fusion import normalize_entity
+
+CacheKey = Tuple[str, str, str]
+
+_IGNORED_CHARS = re.compile(r"[\s?？。!！,，、;；\"'“”‘’()（）【】\[\]]+")
+# 小数点与时间冒号（29.5米、8:30）保留，其余位置的 . 和 : 当作标点去掉
+_IGNORED_SEPARATORS = re.compile(r"(?<!\d)[.:：]|[.:：](?!\d)")
+
+
+def normalize_query(query: str) -> str:
+    """查询归一化：按路径分隔符分段做实体归一（normalize_entity 会把含 / 的文本当作路径截断）"""
+    parts = [normalize_entity(part) for part in re.split(r"[\\/]", query)]
+    text = _IGNORED_CHARS.sub("", "/".join(parts))
+    return _IGNORED_SEPARATORS.sub("", text).lower()
+
+
+class QueryResultCache:
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None) -> None:
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("QUERY_CACHE_SIZE", "512"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("QUERY_CACHE_TTL", "3600"))
+        self._entries: "OrderedDict[CacheKey, Tuple[float, List[NodeWithScore]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.invalidated = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def key(collection_name: str, index_version: str, query: str) -> CacheKey:
+        return (collection_name, index_version, normalize_query(query))
+
+    def get(self, key: CacheKey) -> Optional[List[NodeWithScore]]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, nodes = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(nodes)
+
+    def put(self, key: CacheKey, nodes: List[NodeWithScore]) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), list(nodes))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def invalidate(self, collection_name: Optional[str] = None) -> int:
+        """清掉某个集合（或全部）的条目，返回清除数量"""
+        with self._lock:
+            if collection_name is None:
+                stale = list(self._entries)
+            else:
+                stale = [k for k in self._entries if k[0] == collection_name]
+            for k in stale:
+                del self._entries[k]
+            self.invalidated += len(stale)
+            return len(stale)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "invalidated": self.invalidated,
+            }
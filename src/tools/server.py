@@ -0,0 +1,149 @@
+"""
+RAG HTTP 服务（FastAPI）
+
+  POST /rag-chat   {"query": "...", "collection_name": "...", "stream": true, "use_cache": true}
+                   stream=true 返回逐 token 的 text/plain 流；stream=false 返回 JSON（答案 + 来源 + 耗时）
+                   use_cache=false 跳过语义答案缓存（强制重新生成）
+  GET  /health     各阶段限流器状态、检索结果 / 答案缓存命中率
+
+并发控制（见 src/tools/limits.py）：
+  RETRIEVAL_MAX_CONCURRENCY / RETRIEVAL_MAX_QUEUE   检索阶段并发上限 / 排队上限
+  LLM_MAX_CONCURRENCY / LLM_MAX_QUEUE               生成阶段并发上限 / 排队上限（建议与 OLLAMA_NUM_PARALLEL 一致）
+  REQUEST_DEADLINE                                  单个请求的截止时间（秒），排队 + 检索 + 生成都计入
+排队已满返回 503（附 Retry-After），超过截止时间返回 504；流式输出中途超时则截断并附提示。
+
+启动：
+  uvicorn src.tools.server:app --host 127.0.0.1 --port 8000
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+from src.tools.limits import DeadlineExceeded, StageLimiter, StageOverloaded
+from src.tools.rag_workflow import RAGWorkflow
+from src.tools.resources import get_registry
+
+load_dotenv()
+
+DEFAULT_COLLECTION = os.getenv("COLLECTION_NAME", "flood_prevention_collection")
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "60"))
+
+
+class ChatRequest(BaseModel):
+    query: str
+    collection_name: Optional[str] = None
+    stream: bool = True
+    use_cache: bool = True
+
+
+def create_app(warm_up: Optional[bool] = None) -> FastAPI:
+    if warm_up is None:
+        warm_up = os.getenv("SERVER_WARM_UP", "1") == "1"
+
+    @asynccontextmanager
+    async def lifespan(_: FastAPI):
+        if warm_up:
+            timings = await asyncio.to_thread(get_registry().warm_up, [DEFAULT_COLLECTION])
+            print(f"[服务] 预热完成: {', '.join(f'{k}={v:.2f}s' for k, v in timings.items())}")
+        yield
+
+    app = FastAPI(title="Flood Prevention RAG", lifespan=lifespan)
+    retrieval_limiter = StageLimiter(
+        "retrieval",
+        int(os.getenv("RETRIEVAL_MAX_CONCURRENCY", "8")),
+        int(os.getenv("RETRIEVAL_MAX_QUEUE", "64")),
+    )
+    llm_limiter = StageLimiter(
+        "llm",
+        int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+        int(os.getenv("LLM_MAX_QUEUE", "32")),
+    )
+    # 截止时间由限流器按请求控制，workflow 自身不再设超时
+    workflow = RAGWorkflow(retrieval_limiter=retrieval_limiter, llm_limiter=llm_limiter, timeout=None)
+
+    @app.get("/health")
+    async def health() -> dict:
+        return {
+            "status": "ok",
+            "retrieval": retrieval_limiter.stats(),
+            "llm": llm_limiter.stats(),
+            "result_cache": get_registry().result_cache.stats(),
+            "answer_cache": get_registry().answer_cache.stats(),
+        }
+
+    @app.post("/rag-chat")
+    async def rag_chat(request: ChatRequest):
+        start = time.monotonic()
+        deadline = start + REQUEST_DEADLINE
+        collection_name = request.collection_name or DEFAULT_COLLECTION
+        try:
+            retriever = await asyncio.to_thread(get_registry().retriever, collection_name)
+            response = await workflow.run(
+                query=request.query, retriever=retriever, deadline=deadline, use_cache=request.use_cache
+            )
+        except Exception as e:
+            # workflow 把步骤内的异常包装成 WorkflowRuntimeError，按原始原因映射状态码
+            cause = _root_cause(e)
+            if isinstance(cause, StageOverloaded):
+                return JSONResponse({"error": str(cause)}, status_code=503, headers={"Retry-After": "1"})
+            if isinstance(cause, (DeadlineExceeded, asyncio.TimeoutError)):
+                return JSONResponse({"error": "deadline exceeded"}, status_code=504)
+            raise
+
+        if request.stream:
+            return StreamingResponse(_stream(response), media_type="text/plain; charset=utf-8")
+
+        try:
+            answer = "".join([token async for token in response.async_response_gen()])
+        except (DeadlineExceeded, asyncio.TimeoutError):
+            return JSONResponse({"error": "deadline exceeded"}, status_code=504)
+        finally:
+            await _close(response)
+        return {
+            "answer": answer,
+            "sources": [
+                {"node_id": n.node.node_id, "score": n.score, "text": n.node.get_content()[:200]}
+                for n in response.source_nodes
+            ],
+            "latency_ms": (time.monotonic() - start) * 1000.0,
+        }
+
+    return app
+
+
+def _root_cause(exc: BaseException) -> BaseException:
+    while True:
+        if isinstance(exc, (StageOverloaded, DeadlineExceeded, asyncio.TimeoutError)):
+            return exc
+        nested = exc.__cause__ or exc.__context__
+        if nested is None:
+            return exc
+        exc = nested
+
+
+async def _close(response) -> None:
+    # 提前结束（客户端断开 / 超时）时显式关闭底层 token 流，LLM 名额立即归还而不是等 GC
+    gen = getattr(response, "response_gen", None)
+    if gen is not None and hasattr(gen, "aclose"):
+        await gen.aclose()
+
+
+async def _stream(response):
+    try:
+        async for token in response.async_response_gen():
+            yield token
+    except (DeadlineExceeded, asyncio.TimeoutError):
+        yield "\n\n[回答超时，已截断]"
+    finally:
+        await _close(response)
+
+
+app = create_app()